@@ -456,6 +456,8 @@ async def shutdown_event():
     print("🛑 Shutting down BHIV Integrator Core...")
     await event_broker.stop()
     print("✅ Event Broker stopped")
+    await unified_logger.sink.close()
+    print("✅ Unified logs flushed")
 
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8005))
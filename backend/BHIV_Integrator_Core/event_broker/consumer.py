@@ -0,0 +1,121 @@
+"""
+Concurrent Queue Consumers for BHIV Integrator Core
+Worker pools per system queue with prefetch, in-order processing per
+partition key and graceful drain on shutdown.
+"""
+
+import asyncio
+import json
+import zlib
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from event_broker.transport import BrokerTransport, TransportMessage
+
+# Payload fields that identify the entity an event is about, most specific first
+DEFAULT_PARTITION_FIELDS = ("order_id", "shipment_id", "task_id", "opportunity_id", "lead_id", "account_id")
+
+
+def event_partition_key(body: bytes, fields: Sequence[str] = DEFAULT_PARTITION_FIELDS) -> str:
+    """Ordering key of an event message.
+
+    The first of ``fields`` present in the payload, else the correlation id,
+    else the event id; events sharing a key are processed in order.
+    """
+    try:
+        event = json.loads(body)
+    except ValueError:
+        return ""
+    payload = event.get("payload") or {}
+    for field in fields:
+        if payload.get(field) is not None:
+            return f"{field}:{payload[field]}"
+    return str(event.get("correlation_id") or event.get("event_id") or "")
+
+
+class PartitionedConsumer:
+    """Consumes one queue with ``concurrency`` workers.
+
+    A reader pulls up to ``prefetch`` unacknowledged messages from the
+    transport and routes each to a worker by a stable hash of its partition
+    key, so messages with the same key are handled one at a time in queue
+    order while different keys run in parallel. A message is acked after
+    its handler returns and rejected (not requeued) if it raises.
+
+    ``stop`` stops reading, lets the workers finish what they already hold
+    for up to ``drain_timeout`` seconds, then requeues anything left.
+    """
+
+    def __init__(self, transport: BrokerTransport, queue_name: str,
+                 handler: Callable[[bytes], Awaitable[Any]], concurrency: int = 8, prefetch: int = 32,
+                 partition_key: Optional[Callable[[bytes], str]] = None):
+        self.transport = transport
+        self.queue_name = queue_name
+        self.handler = handler
+        self.concurrency = max(1, concurrency)
+        self.prefetch = max(prefetch, self.concurrency)
+        self.partition_key = partition_key or event_partition_key
+        self.processed = 0
+        self.failed = 0
+        self._inboxes: List[asyncio.Queue] = []
+        self._reader: Optional[asyncio.Task] = None
+        self._workers: List[asyncio.Task] = []
+
+    def start(self):
+        self._inboxes = [asyncio.Queue() for _ in range(self.concurrency)]
+        self._workers = [asyncio.create_task(self._work(inbox)) for inbox in self._inboxes]
+        self._reader = asyncio.create_task(self._read())
+
+    async def _read(self):
+        try:
+            async for message in self.transport.consume(self.queue_name, prefetch=self.prefetch):
+                key = self.partition_key(message.body)
+                self._inboxes[zlib.crc32(key.encode("utf-8")) % self.concurrency].put_nowait(message)
+        except Exception as e:
+            print(f"❌ Error consuming messages for {self.queue_name}: {str(e)}")
+
+    async def _work(self, inbox: asyncio.Queue):
+        while True:
+            message: TransportMessage = await inbox.get()
+            try:
+                await self.handler(message.body)
+            except asyncio.CancelledError:
+                await message.reject(requeue=True)
+                raise
+            except Exception as e:
+                self.failed += 1
+                await message.reject()
+                print(f"❌ Error processing message from {self.queue_name}: {str(e)}")
+            else:
+                self.processed += 1
+                await message.ack()
+            finally:
+                inbox.task_done()
+
+    async def stop(self, drain_timeout: float = 10.0):
+        if self._reader is None:
+            return
+        self._reader.cancel()
+        await asyncio.gather(self._reader, return_exceptions=True)
+        self._reader = None
+
+        try:
+            await asyncio.wait_for(asyncio.gather(*(inbox.join() for inbox in self._inboxes)), drain_timeout)
+        except asyncio.TimeoutError:
+            print(f"⚠️ {self.queue_name} did not drain in {drain_timeout}s, requeueing the rest")
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        for inbox in self._inboxes:
+            while not inbox.empty():
+                await inbox.get_nowait().reject(requeue=True)
+        self._workers = []
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "prefetch": self.prefetch,
+            "buffered": sum(inbox.qsize() for inbox in self._inboxes),
+            "processed": self.processed,
+            "failed": self.failed
+        }
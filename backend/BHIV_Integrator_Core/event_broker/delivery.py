@@ -0,0 +1,328 @@
+"""
+Reliable Webhook Delivery for BHIV Integrator Core
+Durable per-subscriber delivery queues with batched POSTs, exponential backoff
+with jitter, a dead-letter store and redrive.
+"""
+
+import asyncio
+import json
+import random
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from event_broker.http_pool import AsyncHTTPPool
+
+# Responses worth retrying; any other 4xx means the subscriber rejected the event
+RETRYABLE_STATUSES = {408, 425, 429}
+
+
+class DeliveryQueue:
+    """SQLite-backed store of pending and dead-lettered webhook deliveries.
+
+    One row per (subscriber, event). ``enqueue`` commits all rows of an event
+    in one transaction with ``synchronous=FULL``, so once it returns the
+    deliveries survive a crash. Rows leave the queue when acknowledged or
+    when moved to the dead-letter table, and ``redrive`` moves them back.
+    """
+
+    def __init__(self, path: str):
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS deliveries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                subscriber TEXT NOT NULL,
+                event_id TEXT,
+                event TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                last_error TEXT,
+                enqueued_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS ix_deliveries_due ON deliveries (subscriber, next_attempt_at, id);
+            CREATE TABLE IF NOT EXISTS dead_letters (
+                id INTEGER PRIMARY KEY,
+                subscriber TEXT NOT NULL,
+                event_id TEXT,
+                event TEXT NOT NULL,
+                attempts INTEGER NOT NULL,
+                last_error TEXT,
+                enqueued_at REAL NOT NULL,
+                dead_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS ix_dead_letters_subscriber ON dead_letters (subscriber, id);
+        """)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # === Writes ===
+
+    def enqueue(self, subscribers: List[str], event: Dict[str, Any]) -> int:
+        """Durably queue ``event`` for each subscriber; returns rows written"""
+        if not subscribers:
+            return 0
+        body = json.dumps(event, separators=(",", ":"), default=str)
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT INTO deliveries (subscriber, event_id, event, next_attempt_at, enqueued_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [(name, event.get("event_id"), body, now, now) for name in subscribers]
+                )
+        return len(subscribers)
+
+    def ack(self, ids: List[int]):
+        with self._lock:
+            with self._conn:
+                self._conn.executemany("DELETE FROM deliveries WHERE id = ?", [(i,) for i in ids])
+
+    def retry(self, ids: List[int], next_attempt_at: float, error: str):
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "UPDATE deliveries SET attempts = attempts + 1, next_attempt_at = ?, last_error = ? "
+                    "WHERE id = ?",
+                    [(next_attempt_at, error, i) for i in ids]
+                )
+
+    def dead_letter(self, ids: List[int], error: str):
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                for i in ids:
+                    self._conn.execute(
+                        "INSERT INTO dead_letters (id, subscriber, event_id, event, attempts, last_error, "
+                        "enqueued_at, dead_at) SELECT id, subscriber, event_id, event, attempts + 1, ?, "
+                        "enqueued_at, ? FROM deliveries WHERE id = ?",
+                        (error, now, i)
+                    )
+                    self._conn.execute("DELETE FROM deliveries WHERE id = ?", (i,))
+
+    def redrive(self, subscriber: Optional[str] = None, ids: Optional[List[int]] = None) -> List[str]:
+        """Move dead letters back to the queue with a fresh attempt budget.
+
+        Filters by subscriber and/or dead-letter ids; with neither, redrives
+        everything. Returns the subscriber of each redriven delivery.
+        """
+        clauses, params = [], []
+        if subscriber is not None:
+            clauses.append("subscriber = ?")
+            params.append(subscriber)
+        if ids:
+            clauses.append(f"id IN ({','.join('?' * len(ids))})")
+            params.extend(ids)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                rows = self._conn.execute(f"SELECT id, subscriber FROM dead_letters{where}", params).fetchall()
+                self._conn.execute(
+                    "INSERT INTO deliveries (id, subscriber, event_id, event, attempts, next_attempt_at, "
+                    "last_error, enqueued_at) SELECT id, subscriber, event_id, event, 0, ?, last_error, "
+                    f"enqueued_at FROM dead_letters{where}",
+                    [now] + params
+                )
+                self._conn.execute(f"DELETE FROM dead_letters{where}", params)
+        return [name for _, name in rows]
+
+    # === Reads ===
+
+    def due(self, subscriber: str, now: float, limit: int) -> List[Dict[str, Any]]:
+        """Oldest deliveries for ``subscriber`` whose next attempt is due"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, attempts, event FROM deliveries WHERE subscriber = ? AND next_attempt_at <= ? "
+                "ORDER BY id LIMIT ?",
+                (subscriber, now, limit)
+            ).fetchall()
+        return [{"id": i, "attempts": attempts, "event": json.loads(event)} for i, attempts, event in rows]
+
+    def next_attempt_at(self, subscriber: str) -> Optional[float]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(next_attempt_at) FROM deliveries WHERE subscriber = ?", (subscriber,)
+            ).fetchone()
+        return row[0]
+
+    def subscribers_pending(self) -> List[str]:
+        with self._lock:
+            return [name for (name,) in self._conn.execute("SELECT DISTINCT subscriber FROM deliveries")]
+
+    def dead_letters(self, subscriber: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recent dead letters, optionally for one subscriber"""
+        query = "SELECT id, subscriber, event, attempts, last_error, enqueued_at, dead_at FROM dead_letters"
+        params: List[Any] = []
+        if subscriber is not None:
+            query += " WHERE subscriber = ?"
+            params.append(subscriber)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY id DESC LIMIT ?", params + [limit]).fetchall()
+        return [
+            {"id": i, "subscriber": name, "event": json.loads(event), "attempts": attempts,
+             "last_error": error, "enqueued_at": enqueued_at, "dead_at": dead_at}
+            for i, name, event, attempts, error, enqueued_at, dead_at in rows
+        ]
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = dict(self._conn.execute(
+                "SELECT subscriber, COUNT(*) FROM deliveries GROUP BY subscriber").fetchall())
+            dead = dict(self._conn.execute(
+                "SELECT subscriber, COUNT(*) FROM dead_letters GROUP BY subscriber").fetchall())
+        return {"pending": pending, "dead_letters": dead}
+
+
+class WebhookDelivery:
+    """Delivers queued events to subscriber webhooks in the background.
+
+    Each subscriber has one worker that POSTs its due deliveries in order:
+    a single event as the request body, or up to ``max_batch_size`` events
+    as ``{"events": [...]}`` when the subscription sets one. A 2xx acks the
+    batch. Timeouts, connection errors, 5xx, 408 and 429 are retried after
+    a full-jitter exponential backoff (``Retry-After`` is honoured); other
+    4xx responses and deliveries that exhaust ``max_attempts`` go to the
+    dead-letter store. Delivery is at-least-once; a retried event may
+    arrive after later ones.
+    """
+
+    def __init__(self, queue: DeliveryQueue, http: AsyncHTTPPool, subscriptions: Dict[str, Dict[str, Any]],
+                 max_attempts: int = 8, base_delay: float = 1.0, max_delay: float = 300.0,
+                 max_batch_size: int = 100):
+        self.queue = queue
+        self.http = http
+        self.subscriptions = subscriptions
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_batch_size = max_batch_size
+        self.stats = {"delivered": 0, "retried": 0, "dead_lettered": 0, "requests": 0}
+        self._workers: Dict[str, asyncio.Task] = {}
+        self._wakeups: Dict[str, asyncio.Event] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def matching_subscribers(self, event: Dict[str, Any]) -> List[str]:
+        return [name for name, subscription in list(self.subscriptions.items())
+                if subscription.get("active", True) and event["event_type"] in subscription["event_types"]]
+
+    def enqueue(self, event: Dict[str, Any]) -> int:
+        """Durably queue ``event`` for every matching subscriber and wake their workers"""
+        subscribers = self.matching_subscribers(event)
+        queued = self.queue.enqueue(subscribers, event)
+        for name in subscribers:
+            self.wake(name)
+        return queued
+
+    def redrive(self, subscriber: Optional[str] = None, ids: Optional[List[int]] = None) -> int:
+        subscribers = self.queue.redrive(subscriber, ids)
+        for name in set(subscribers):
+            self.wake(name)
+        return len(subscribers)
+
+    def backoff(self, attempts: int) -> float:
+        """Full-jitter delay before retry number ``attempts``"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempts))
+
+    # === Workers ===
+
+    def start(self):
+        """Resume workers for deliveries left pending by a previous run"""
+        for name in self.queue.subscribers_pending():
+            self.wake(name)
+
+    def wake(self, subscriber: str):
+        """Start or nudge the subscriber's worker; a no-op outside an event loop"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if self._loop is not loop:
+            self._loop, self._workers, self._wakeups = loop, {}, {}
+        if subscriber not in self._wakeups:
+            self._wakeups[subscriber] = asyncio.Event()
+        self._wakeups[subscriber].set()
+        worker = self._workers.get(subscriber)
+        if worker is None or worker.done():
+            self._workers[subscriber] = loop.create_task(self._run(subscriber))
+
+    async def stop(self):
+        """Cancel the workers; undelivered rows stay queued for the next start"""
+        workers = list(self._workers.values())
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        self._workers = {}
+
+    async def _run(self, subscriber: str):
+        wakeup = self._wakeups[subscriber]
+        while True:
+            subscription = self.subscriptions.get(subscriber)
+            if not subscription or not subscription.get("active", True):
+                return
+            wakeup.clear()
+            batch_size = max(1, min(int(subscription.get("max_batch_size") or 1), self.max_batch_size))
+            rows = self.queue.due(subscriber, time.time(), batch_size)
+            if rows:
+                await self._deliver(subscriber, subscription, rows)
+                continue
+
+            next_attempt_at = self.queue.next_attempt_at(subscriber)
+            if next_attempt_at is None:
+                timeout = None
+            else:
+                timeout = max(0.0, next_attempt_at - time.time())
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _deliver(self, subscriber: str, subscription: Dict[str, Any], rows: List[Dict[str, Any]]):
+        ids = [row["id"] for row in rows]
+        if (subscription.get("max_batch_size") or 1) > 1:
+            body = {"events": [row["event"] for row in rows]}
+        else:
+            body = rows[0]["event"]
+
+        retry_after = None
+        self.stats["requests"] += 1
+        try:
+            response = await self.http.post(subscription["webhook_url"], json=body)
+        except Exception as e:
+            error, retryable = f"{type(e).__name__}: {e}", True
+        else:
+            if 200 <= response.status_code < 300:
+                self.queue.ack(ids)
+                self.stats["delivered"] += len(ids)
+                return
+            error = f"HTTP {response.status_code}"
+            retryable = response.status_code >= 500 or response.status_code in RETRYABLE_STATUSES
+            try:
+                retry_after = float(response.headers.get("retry-after", ""))
+            except ValueError:
+                pass
+
+        attempts = max(row["attempts"] for row in rows) + 1
+        if not retryable or attempts >= self.max_attempts:
+            self.queue.dead_letter(ids, error)
+            self.stats["dead_lettered"] += len(ids)
+            print(f"☠️ Dead-lettered {len(ids)} deliveries for {subscriber}: {error}")
+            return
+
+        delay = max(self.backoff(attempts), min(retry_after or 0.0, self.max_delay))
+        self.queue.retry(ids, time.time() + delay, error)
+        self.stats["retried"] += len(ids)
+        print(f"🔁 Delivery to {subscriber} failed ({error}), retry {attempts} in {delay:.1f}s")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.queue.get_stats(), **self.stats,
+                "workers": sum(1 for worker in self._workers.values() if not worker.done())}
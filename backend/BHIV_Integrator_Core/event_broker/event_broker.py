@@ -8,13 +8,19 @@ from pydantic import BaseModel
 from typing import Dict, Any, List, Optional
 import asyncio
 import json
+import time
 import uuid
 from datetime import datetime
-import requests
-import aio_pika
-import pika
 from config.settings import settings
 from unified_logging.logger import UnifiedLogger
+from event_broker.event_log import SegmentedEventLog
+from event_broker.event_index import EventIndex
+from event_broker.http_pool import AsyncHTTPPool
+from event_broker.delivery import DeliveryQueue, WebhookDelivery
+from event_broker.transport import create_transport
+from event_broker.dispatcher import BackpressureError, PriorityDispatcher
+from event_broker.consumer import PartitionedConsumer, event_partition_key
+from event_broker.rules import RulesEngine, rules_from_triggers
 
 router = APIRouter()
 logger = UnifiedLogger()
@@ -34,35 +40,136 @@ class Subscription(BaseModel):
     event_types: List[str]
     webhook_url: str
     active: bool = True
-
-# In-memory storage (replace with Redis/DB in production)
-event_store = []
+    max_batch_size: int = 1
+
+class RedriveRequest(BaseModel):
+    subscriber: Optional[str] = None
+    ids: Optional[List[int]] = None
+
+def open_event_log() -> SegmentedEventLog:
+    """Durable event log configured from settings"""
+    return SegmentedEventLog(
+        settings["event_log_dir"],
+        segment_bytes=settings["event_log_segment_mb"] * 1024 * 1024,
+        fsync_every=settings["event_log_fsync_every"],
+        fsync_interval=settings["event_log_fsync_interval_ms"] / 1000,
+        retention_bytes=settings["event_log_retention_mb"] * 1024 * 1024,
+        retention_seconds=settings["event_log_retention_hours"] * 3600
+    )
+
+# Published events survive restarts in the on-disk log
+event_store = open_event_log()
+event_index = EventIndex(event_store)
 subscriptions = {}
 
+# Shared by every broker instance: keep-alive connections, per-host limits
+http_pool = AsyncHTTPPool(
+    max_connections=settings["http_pool_max_connections"],
+    per_host_limit=settings["http_pool_per_host"],
+    timeout=settings["http_timeout_seconds"]
+)
+
+# Message transport (RabbitMQ, in-process or SQLite), shared like the event log
+transport = create_transport(settings["broker_transport"], settings)
+
+# Subscriber webhooks go through durable per-subscriber queues
+delivery = WebhookDelivery(
+    DeliveryQueue(settings["delivery_db_path"]),
+    http_pool,
+    subscriptions,
+    max_attempts=settings["delivery_max_attempts"],
+    base_delay=settings["delivery_base_delay_seconds"],
+    max_delay=settings["delivery_max_delay_seconds"],
+    max_batch_size=settings["delivery_max_batch_size"]
+)
+
+# Trigger action name -> EventBroker coroutine method that performs it
+TRIGGER_ACTIONS = {
+    "create_crm_lead": "_create_crm_lead_from_order",
+    "create_task": "_create_task_from_event",
+    "escalate_task": "_escalate_task",
+    "update_crm_opportunity": "_update_crm_opportunity",
+    "compliance_check": "_perform_compliance_check",
+    "send_slack_alert": "_send_slack_alert",
+    "send_teams_alert": "_send_teams_alert"
+}
+
+# Trigger rules from EVENT_RULES_PATH (hot reloaded), else from EVENT_TRIGGERS
+trigger_rules = RulesEngine(
+    settings["event_rules_path"] or None,
+    default_rules=rules_from_triggers(settings["event_triggers"]),
+    known_actions=TRIGGER_ACTIONS,
+    reload_interval=settings["event_rules_reload_seconds"]
+)
+
+# Queue worker pools of the running broker, by system
+consumers: Dict[str, PartitionedConsumer] = {}
+
+# Trigger actions run from bounded priority lanes after their publish returns
+dispatcher = PriorityDispatcher(
+    workers=settings["dispatch_workers"],
+    lane_capacity=settings["dispatch_lane_capacity"],
+    weights=settings["dispatch_lane_weights"],
+    backpressure=settings["dispatch_backpressure"],
+    block_timeout=settings["dispatch_block_timeout_seconds"]
+)
+
 class EventBroker:
     def __init__(self):
         self.subscriptions = subscriptions
         self.event_store = event_store
+        self.event_index = event_index
+        self.http = http_pool
+        self.delivery = delivery
+        self.dispatcher = dispatcher
+        self.rules = trigger_rules
         self.logger = logger
-        self.rabbitmq_connection = None
-        self.rabbitmq_channel = None
-        self.rabbitmq_exchange = None
+        self.transport = transport
+        self.consumers = consumers
+        self._log_sync_task = None
 
     async def start(self):
         """Start the event broker"""
         print("🎯 Event Broker starting...")
-        # Initialize RabbitMQ connection
-        await self._initialize_rabbitmq()
+        # Connect the message transport
+        await self._initialize_transport()
         # Initialize default subscriptions
         await self._initialize_subscriptions()
         # Start consumer tasks
         await self._start_consumers()
+        # Resume webhook deliveries left over from the last run
+        self.delivery.start()
+        # Fsync the event log on its interval even when publishing goes quiet
+        self._log_sync_task = asyncio.create_task(self._sync_event_log())
 
     async def stop(self):
         """Stop the event broker"""
         print("🛑 Event Broker stopping...")
-        if self.rabbitmq_connection:
-            await self.rabbitmq_connection.close()
+        if self._log_sync_task is not None:
+            self._log_sync_task.cancel()
+            await asyncio.gather(self._log_sync_task, return_exceptions=True)
+            self._log_sync_task = None
+        # Finish the messages consumers already hold, then the trigger actions and
+        # deliveries they queued; all of them may still use the HTTP pool
+        await asyncio.gather(*(consumer.stop(settings["consumer_drain_timeout_seconds"])
+                               for consumer in self.consumers.values()))
+        self.consumers.clear()
+        await self.drain()
+        await self.dispatcher.stop()
+        await self.delivery.stop()
+        await self.http.aclose()
+        await self.transport.close()
+        self.event_store.sync()
+
+    async def _sync_event_log(self):
+        """Sync records left unsynced for longer than the log's fsync interval"""
+        interval = max(self.event_store.fsync_interval, 0.001)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.event_store.sync_if_due)
+            except Exception as e:
+                print(f"❌ Event log sync failed: {str(e)}")
 
     async def _initialize_subscriptions(self):
         """Initialize default system subscriptions"""
@@ -100,7 +207,13 @@ class EventBroker:
             await self._declare_queue(name)
 
     async def publish_event(self, event: EventMessage) -> Dict[str, Any]:
-        """Publish an event to subscribed systems"""
+        """Publish an event to subscribed systems.
+
+        Raises ``BackpressureError`` when the event's priority lane is full
+        and the dispatcher's policy refuses it; nothing is stored then.
+        """
+        if isinstance(event, dict):
+            event = EventMessage(**event)
         if not event.event_id:
             event.event_id = str(uuid.uuid4())
         if not event.timestamp:
@@ -108,9 +221,13 @@ class EventBroker:
         if not event.correlation_id:
             event.correlation_id = event.event_id
 
-        # Store event
+        # Queue trigger processing first, so a full lane refuses the event
+        # before anything is stored
+        lane = await self.dispatcher.submit(event.priority, lambda: self._process_event_triggers(event))
+
+        # Store and index event
         event_dict = event.dict()
-        self.event_store.append(event_dict)
+        offset = self.event_index.append(event_dict)
 
         # Log event
         await self.logger.log_event({
@@ -125,48 +242,53 @@ class EventBroker:
             "compliance_flag": self._check_compliance(event)
         })
 
-        # Trigger event processing
-        await self._process_event_triggers(event)
-
-        # Publish to RabbitMQ
-        await self._publish_to_rabbitmq(event)
+        # Publish to the message transport
+        await self._publish_to_transport(event)
 
-        # Notify subscribers via HTTP (fallback)
-        await self._notify_subscribers(event)
+        # Queue webhook deliveries durably; workers POST them in the background
+        deliveries = self.delivery.enqueue(event_dict)
 
         return {
             "event_id": event.event_id,
+            "offset": offset,
             "status": "published",
+            "deliveries_enqueued": deliveries,
+            "dispatch_lane": lane,
             "subscribers_notified": len(event.target_systems)
         }
 
-    async def _process_event_triggers(self, event: EventMessage):
-        """Process event triggers based on configuration"""
-        triggers = settings.get("event_triggers", {})
-        trigger_actions = triggers.get(event.event_type, [])
+    async def drain(self):
+        """Wait for queued and running trigger dispatches"""
+        await self.dispatcher.join()
 
-        for action in trigger_actions:
-            await self._execute_trigger_action(event, action)
+    async def _process_event_triggers(self, event: EventMessage):
+        """Run the actions of every trigger rule the event matches.
+
+        An action named by several matching rules runs once, for the first.
+        """
+        runs, seen = [], set()
+        for rule in self.rules.match(event.dict()):
+            actions = [action for action in rule.actions if action not in seen]
+            seen.update(actions)
+            if actions:
+                runs.append(self._run_rule_actions(rule, event, actions))
+
+        await asyncio.gather(*runs)
+
+    async def _run_rule_actions(self, rule, event: EventMessage, actions: List[str]):
+        started = time.perf_counter()
+        results = await asyncio.gather(*[self._execute_trigger_action(event, action) for action in actions],
+                                       return_exceptions=True)
+        rule.record_run((time.perf_counter() - started) * 1000,
+                        failed=any(isinstance(result, Exception) for result in results))
 
     async def _execute_trigger_action(self, event: EventMessage, action: str):
         """Execute a trigger action"""
         print(f"🎯 Executing trigger: {action} for event {event.event_type}")
 
-        # Example trigger actions
-        if action == "create_crm_lead":
-            await self._create_crm_lead_from_order(event)
-        elif action == "create_task":
-            await self._create_task_from_event(event)
-        elif action == "escalate_task":
-            await self._escalate_task(event)
-        elif action == "update_crm_opportunity":
-            await self._update_crm_opportunity(event)
-        elif action == "compliance_check":
-            await self._perform_compliance_check(event)
-        elif action == "send_slack_alert":
-            await self._send_slack_alert(event)
-        elif action == "send_teams_alert":
-            await self._send_teams_alert(event)
+        method = TRIGGER_ACTIONS.get(action)
+        if method:
+            await getattr(self, method)(event)
 
     async def _create_crm_lead_from_order(self, event: EventMessage):
         """Create CRM lead from order event"""
@@ -179,10 +301,9 @@ class EventBroker:
             }
 
             # Call CRM API
-            response = requests.post(
+            response = await self.http.post(
                 f"{settings['crm_base_url']}/leads",
-                json=crm_payload,
-                timeout=5
+                json=crm_payload
             )
             print(f"✅ CRM Lead created: {response.status_code}")
 
@@ -200,10 +321,9 @@ class EventBroker:
                 "reference_id": event.event_id
             }
 
-            response = requests.post(
+            response = await self.http.post(
                 f"{settings['task_base_url']}/tasks",
-                json=task_payload,
-                timeout=5
+                json=task_payload
             )
             print(f"✅ Task created: {response.status_code}")
 
@@ -227,10 +347,9 @@ class EventBroker:
             }
 
             # Update task via Task API
-            response = requests.put(
+            response = await self.http.put(
                 f"{settings['task_base_url']}/tasks/{task_id}",
-                json=escalation_payload,
-                timeout=5
+                json=escalation_payload
             )
 
             if response.status_code == 200:
@@ -264,10 +383,9 @@ class EventBroker:
                 update_payload["probability"] = 90
 
             # Update opportunity via CRM API
-            response = requests.put(
+            response = await self.http.put(
                 f"{settings['crm_base_url']}/opportunities/{opportunity_id}",
-                json=update_payload,
-                timeout=5
+                json=update_payload
             )
 
             if response.status_code == 200:
@@ -310,7 +428,8 @@ class EventBroker:
                         "original_event": event.dict(),
                         "violation_details": result
                     },
-                    "priority": "high"
+                    "priority": "critical",
+                    "correlation_id": event.correlation_id
                 })
 
         except Exception as e:
@@ -365,7 +484,7 @@ class EventBroker:
                 ]
             }
 
-            response = requests.post(slack_webhook, json=alert_message, timeout=5)
+            response = await self.http.post(slack_webhook, json=alert_message)
             if response.status_code == 200:
                 print(f"✅ Slack alert sent for event {event.event_id}")
             else:
@@ -422,7 +541,7 @@ class EventBroker:
                 ]
             }
 
-            response = requests.post(teams_webhook, json=alert_message, timeout=5)
+            response = await self.http.post(teams_webhook, json=alert_message)
             if response.status_code == 200:
                 print(f"✅ Teams alert sent for event {event.event_id}")
             else:
@@ -431,27 +550,6 @@ class EventBroker:
         except Exception as e:
             print(f"❌ Teams alert error: {str(e)}")
 
-    async def _notify_subscribers(self, event: EventMessage):
-        """Notify subscribed systems"""
-        notified = 0
-        for system_name, subscription in self.subscriptions.items():
-            if subscription["active"] and event.event_type in subscription["event_types"]:
-                try:
-                    response = requests.post(
-                        subscription["webhook_url"],
-                        json=event.dict(),
-                        timeout=5
-                    )
-                    if response.status_code == 200:
-                        notified += 1
-                        print(f"📡 Notified {system_name}: {response.status_code}")
-                    else:
-                        print(f"⚠️ Failed to notify {system_name}: {response.status_code}")
-                except Exception as e:
-                    print(f"❌ Error notifying {system_name}: {str(e)}")
-
-        print(f"📊 Event {event.event_id} notified {notified} subscribers")
-
     def _calculate_dhi_score(self, event: EventMessage) -> float:
         """Calculate DHI score for the event"""
         # Simplified DHI score calculation
@@ -459,7 +557,7 @@ class EventBroker:
         base_score = 0.5  # Base score
 
         # Adjust based on event type priority
-        if event.priority == "high":
+        if event.priority in ("high", "critical"):
             base_score += 0.3
         elif event.priority == "low":
             base_score -= 0.1
@@ -476,47 +574,46 @@ class EventBroker:
         # Simplified compliance check
         return flags.get("audit_trail", True)
 
-    async def _initialize_rabbitmq(self):
-        """Initialize RabbitMQ connection and exchange"""
+    async def _initialize_transport(self):
+        """Connect the message transport (exchange and queues live there)"""
         try:
-            self.rabbitmq_connection = await aio_pika.connect_robust(settings["rabbitmq_url"])
-            self.rabbitmq_channel = await self.rabbitmq_connection.channel()
-            self.rabbitmq_exchange = await self.rabbitmq_channel.declare_exchange(
-                settings["rabbitmq_exchange"], aio_pika.ExchangeType.TOPIC, durable=True
-            )
-            print("🐰 RabbitMQ connection established")
+            await self.transport.connect()
+            print(f"🐰 {self.transport.name} transport connected")
         except Exception as e:
-            print(f"❌ Failed to initialize RabbitMQ: {str(e)}")
+            print(f"❌ Failed to initialize {self.transport.name} transport: {str(e)}")
 
     async def _declare_queue(self, system_name: str):
         """Declare queue for a system"""
         try:
             queue_name = f"{settings['rabbitmq_queue_prefix']}{system_name}"
-            queue = await self.rabbitmq_channel.declare_queue(queue_name, durable=True)
-
             # Bind queue to exchange with routing key
-            await queue.bind(self.rabbitmq_exchange, routing_key=f"*.{system_name}")
+            await self.transport.declare_queue(queue_name, f"*.{system_name}")
             print(f"📋 Declared queue: {queue_name}")
         except Exception as e:
             print(f"❌ Failed to declare queue for {system_name}: {str(e)}")
 
     async def _start_consumers(self):
-        """Start consumer tasks for each subscribed system"""
+        """Start a worker pool for each subscribed system"""
         for system_name in self.subscriptions.keys():
-            asyncio.create_task(self._consume_messages(system_name))
-
-    async def _consume_messages(self, system_name: str):
-        """Consume messages for a specific system"""
-        try:
-            queue_name = f"{settings['rabbitmq_queue_prefix']}{system_name}"
-            queue = await self.rabbitmq_channel.declare_queue(queue_name, durable=True)
-
-            async with queue.iterator() as queue_iter:
-                async for message in queue_iter:
-                    async with message.process():
-                        await self._process_message(system_name, message.body)
-        except Exception as e:
-            print(f"❌ Error consuming messages for {system_name}: {str(e)}")
+            self._start_consumer(system_name)
+
+    def _start_consumer(self, system_name: str):
+        """Consume a system's queue; events with the same partition key stay in order"""
+        partition_fields = settings["consumer_partition_fields"]
+
+        async def handle(body: bytes):
+            await self._process_message(system_name, body)
+
+        consumer = PartitionedConsumer(
+            self.transport,
+            f"{settings['rabbitmq_queue_prefix']}{system_name}",
+            handle,
+            concurrency=settings["consumer_concurrency"],
+            prefetch=settings["broker_prefetch"],
+            partition_key=lambda body: event_partition_key(body, partition_fields)
+        )
+        consumer.start()
+        self.consumers[system_name] = consumer
 
     async def _process_message(self, system_name: str, message_body: bytes):
         """Process incoming message"""
@@ -546,43 +643,52 @@ class EventBroker:
         except Exception as e:
             print(f"❌ Error processing message: {str(e)}")
 
-    async def _publish_to_rabbitmq(self, event: EventMessage):
-        """Publish event to RabbitMQ"""
+    async def _publish_to_transport(self, event: EventMessage):
+        """Publish event to each target system's queue"""
         try:
             message_body = json.dumps(event.dict()).encode()
             for target_system in event.target_systems:
                 routing_key = f"{event.event_type}.{target_system}"
-                await self.rabbitmq_exchange.publish(
-                    aio_pika.Message(body=message_body, delivery_mode=aio_pika.DeliveryMode.PERSISTENT),
-                    routing_key=routing_key
-                )
-            print(f"🐰 Published event {event.event_id} to RabbitMQ")
+                await self.transport.publish(routing_key, message_body)
+            print(f"🐰 Published event {event.event_id} to {self.transport.name}")
         except Exception as e:
-            print(f"❌ Failed to publish to RabbitMQ: {str(e)}")
+            print(f"❌ Failed to publish to {self.transport.name}: {str(e)}")
 
     async def subscribe(self, subscription: Subscription) -> Dict[str, Any]:
         """Subscribe a system to events"""
         self.subscriptions[subscription.system_name] = subscription.dict()
+        self.delivery.wake(subscription.system_name)
         return {"status": "subscribed", "system": subscription.system_name}
 
     async def get_events(self, system_name: str = None, event_type: str = None, limit: int = 50) -> List[Dict]:
-        """Get events from store"""
-        events = self.event_store[-limit:]  # Get last N events
-
-        if system_name:
-            events = [e for e in events if system_name in e.get("target_systems", [])]
-
-        if event_type:
-            events = [e for e in events if e.get("event_type") == event_type]
-
-        return events
+        """Latest ``limit`` matching events across the whole log, oldest first"""
+        page = await self.query_events(system_name=system_name, event_type=event_type, limit=limit)
+        return page["events"][::-1]
+
+    async def query_events(self, system_name: str = None, event_type: str = None,
+                           correlation_id: str = None, since: str = None, until: str = None,
+                           cursor: int = None, limit: int = 50) -> Dict[str, Any]:
+        """One page of matching events, newest first, answered from the indexes"""
+        return self.event_index.query(
+            event_type=event_type, target_system=system_name, correlation_id=correlation_id,
+            since=datetime.fromisoformat(since).timestamp() if since else None,
+            until=datetime.fromisoformat(until).timestamp() if until else None,
+            cursor=cursor, limit=limit
+        )
+
+    async def trace(self, correlation_id: str) -> List[Dict]:
+        """All events sharing a correlation id, in publish order"""
+        return self.event_index.trace(correlation_id)
 
 # API Endpoints
 @router.post("/publish")
 async def publish_event(event: EventMessage, background_tasks: BackgroundTasks):
     """Publish an event"""
     broker = EventBroker()
-    result = await broker.publish_event(event)
+    try:
+        result = await broker.publish_event(event)
+    except BackpressureError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
     return result
 
 @router.post("/subscribe")
@@ -593,17 +699,64 @@ async def subscribe_system(subscription: Subscription):
     return result
 
 @router.get("/events")
-async def get_events(system_name: str = None, event_type: str = None, limit: int = 50):
-    """Get recent events"""
+async def get_events(system_name: str = None, event_type: str = None, correlation_id: str = None,
+                     since: str = None, until: str = None, cursor: int = None, limit: int = 50):
+    """Get events, newest first; pass next_cursor back as cursor for the next page"""
     broker = EventBroker()
-    events = await broker.get_events(system_name, event_type, limit)
-    return {"events": events, "count": len(events)}
+    try:
+        return await broker.query_events(system_name, event_type, correlation_id, since, until, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid time range: {e}")
+
+@router.get("/events/trace/{correlation_id}")
+async def trace_events(correlation_id: str):
+    """Full chain of events that share a correlation id"""
+    broker = EventBroker()
+    events = await broker.trace(correlation_id)
+    if not events:
+        raise HTTPException(status_code=404, detail="No events for this correlation id")
+    return {"correlation_id": correlation_id, "events": events, "count": len(events)}
 
 @router.get("/subscriptions")
 async def get_subscriptions():
     """Get all subscriptions"""
     return {"subscriptions": subscriptions}
 
+@router.get("/deliveries")
+async def get_delivery_stats():
+    """Pending and dead-lettered webhook deliveries per subscriber"""
+    return delivery.get_stats()
+
+@router.get("/deliveries/dead-letters")
+async def get_dead_letters(subscriber: str = None, limit: int = 50):
+    """Deliveries that were rejected or ran out of retries, newest first"""
+    dead_letters = delivery.queue.dead_letters(subscriber, limit)
+    return {"dead_letters": dead_letters, "count": len(dead_letters)}
+
+@router.post("/deliveries/redrive")
+async def redrive_dead_letters(request: RedriveRequest):
+    """Requeue dead letters, by subscriber and/or id, with a fresh retry budget"""
+    return {"redriven": delivery.redrive(request.subscriber, request.ids)}
+
+@router.get("/rules")
+async def get_trigger_rules():
+    """Active trigger rules with hit counters and action timings"""
+    return trigger_rules.get_stats()
+
+@router.post("/rules/reload")
+async def reload_trigger_rules():
+    """Recompile the trigger rules now; the old rules stay active on error"""
+    reloaded = trigger_rules.reload()
+    stats = trigger_rules.get_stats()
+    if not reloaded:
+        raise HTTPException(status_code=400, detail=stats["last_error"])
+    return {"reloaded": True, "rules": stats["rules"], "unknown_actions": stats["unknown_actions"]}
+
+@router.get("/dispatch")
+async def get_dispatch_metrics():
+    """Queue depth, shed/rejected counts and latency per priority lane"""
+    return dispatcher.get_stats()
+
 @router.get("/health")
 async def event_broker_health():
     """Event broker health check"""
@@ -611,5 +764,11 @@ async def event_broker_health():
         "status": "healthy",
         "subscribers": len(subscriptions),
         "events_stored": len(event_store),
+        "event_log": event_store.get_stats(),
+        "event_index": event_index.get_stats(),
+        "dispatch_queue_depth": dispatcher.depth,
+        "consumers": {name: consumer.get_stats() for name, consumer in consumers.items()},
+        "deliveries": delivery.get_stats(),
+        "transport": transport.get_stats(),
         "timestamp": datetime.now().isoformat()
     }
\ No newline at end of file
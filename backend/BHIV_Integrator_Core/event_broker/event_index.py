@@ -0,0 +1,141 @@
+"""
+Secondary Indexes for the BHIV Event Log
+Posting lists of log offsets by event type, target system and correlation id,
+maintained on publish, with paginated queries and correlation traces.
+"""
+
+import threading
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional
+
+from event_broker.event_log import SegmentedEventLog
+
+
+class EventIndex:
+    """Indexes a ``SegmentedEventLog`` and answers filtered queries.
+
+    Each index maps a key to an ascending array of offsets. A query picks the
+    shortest posting list among its filters, narrows it to the time range
+    (turned into an offset range by the log's append-time index) and to the
+    page cursor with bisection, and only reads the events it returns, so a
+    page costs O(limit) reads no matter how far back the matches are. A
+    correlation trace reads exactly the k events of the chain.
+
+    Indexes live in memory and are rebuilt from the log on start. Offsets
+    dropped by log retention are trimmed when segments are removed.
+    """
+
+    def __init__(self, log: SegmentedEventLog):
+        self.log = log
+        self.by_type: Dict[str, array] = {}
+        self.by_target: Dict[str, array] = {}
+        self.by_correlation: Dict[str, array] = {}
+        self._lock = threading.RLock()
+        self._indexed_from = log.first_offset
+
+        for offset, event in log.scan():
+            self._add(offset, event)
+
+    @staticmethod
+    def _post(index: Dict[str, array], key: Optional[str], offset: int):
+        if key is not None:
+            postings = index.get(key)
+            if postings is None:
+                postings = index[key] = array("Q")
+            postings.append(offset)
+
+    def _add(self, offset: int, event: Dict[str, Any]):
+        self._post(self.by_type, event.get("event_type"), offset)
+        for target in event.get("target_systems") or ():
+            self._post(self.by_target, target, offset)
+        self._post(self.by_correlation, event.get("correlation_id"), offset)
+
+    # === Writes ===
+
+    def append(self, event: Dict[str, Any]) -> int:
+        """Append an event to the log and index it; returns its offset"""
+        with self._lock:
+            offset = self.log.append(event)
+            self._add(offset, event)
+            if self.log.first_offset > self._indexed_from:
+                self._trim(self.log.first_offset)
+            return offset
+
+    def _trim(self, first_offset: int):
+        for index in (self.by_type, self.by_target, self.by_correlation):
+            for key in list(index):
+                postings = index[key]
+                cut = bisect_left(postings, first_offset)
+                if cut == len(postings):
+                    del index[key]
+                elif cut:
+                    del postings[:cut]
+        self._indexed_from = first_offset
+
+    # === Reads ===
+
+    def query(self, event_type: Optional[str] = None, target_system: Optional[str] = None,
+              correlation_id: Optional[str] = None, since: Optional[float] = None,
+              until: Optional[float] = None, cursor: Optional[int] = None,
+              limit: int = 50, newest_first: bool = True) -> Dict[str, Any]:
+        """One page of matching events.
+
+        ``since``/``until`` are epoch seconds of the append time (inclusive).
+        ``cursor`` is the ``next_cursor`` of the previous page; ``None`` in
+        the result means there are no more pages.
+        """
+        with self._lock:
+            low = max(self.log.first_offset, self.log.offset_at(since) if since is not None else 0)
+            high = self.log.offset_at(until + 1e-6) if until is not None else self.log.next_offset
+            if cursor is not None:
+                if newest_first:
+                    high = min(high, cursor)
+                else:
+                    low = max(low, cursor + 1)
+
+            filters = [(self.by_type, event_type), (self.by_target, target_system),
+                       (self.by_correlation, correlation_id)]
+            postings = [index.get(key, array("Q")) for index, key in filters if key is not None]
+            if postings:
+                candidates = min(postings, key=len)
+                others = [p for p in postings if p is not candidates]
+                start, stop = bisect_left(candidates, low), bisect_left(candidates, high)
+            else:
+                candidates, others = range(low, max(low, high)), []
+                start, stop = 0, len(candidates)
+            positions = range(stop - 1, start - 1, -1) if newest_first else range(start, stop)
+
+            events, last, next_cursor = [], None, None
+            for position in positions:
+                offset = candidates[position]
+                if others and not all(self._contains(p, offset) for p in others):
+                    continue
+                if len(events) == limit:
+                    next_cursor = last
+                    break
+                events.append(self.log.read(offset))
+                last = offset
+
+            return {"events": events, "count": len(events), "next_cursor": next_cursor}
+
+    @staticmethod
+    def _contains(postings: array, offset: int) -> bool:
+        i = bisect_left(postings, offset)
+        return i < len(postings) and postings[i] == offset
+
+    def trace(self, correlation_id: str) -> List[Dict[str, Any]]:
+        """Every retained event of a correlation chain, in publish order"""
+        with self._lock:
+            postings = self.by_correlation.get(correlation_id, array("Q"))
+            start = bisect_left(postings, self.log.first_offset)
+            return [dict(self.log.read(offset), offset=offset) for offset in postings[start:]]
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "event_types": len(self.by_type),
+                "target_systems": len(self.by_target),
+                "correlation_ids": len(self.by_correlation),
+                "indexed_from": self._indexed_from
+            }
@@ -0,0 +1,351 @@
+"""
+Durable Event Log for BHIV Integrator Core
+Append-only, segmented on-disk log of published events with batched fsync,
+segment rotation, retention and memory-mapped reads.
+"""
+
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# Record framing: payload length, CRC32 of the payload and append time (epoch
+# seconds, never decreasing), then the JSON payload
+RECORD_HEADER = struct.Struct("<IId")
+SEGMENT_SUFFIX = ".log"
+
+
+class _Segment:
+    """One log file holding the records from ``base_offset`` onwards"""
+
+    def __init__(self, path: Path, base_offset: int):
+        self.path = path
+        self.base_offset = base_offset
+        self.positions = array("Q")  # byte position of each record
+        self.times = array("d")  # append time of each record
+        self.size = 0
+        self._map: Optional[mmap.mmap] = None
+        self._mapped_size = 0
+
+    @property
+    def next_offset(self) -> int:
+        return self.base_offset + len(self.positions)
+
+    def recover(self) -> int:
+        """Index the records in the file, truncating a torn or corrupt tail.
+
+        Returns the number of bytes dropped.
+        """
+        file_size = self.path.stat().st_size
+        with open(self.path, "rb") as f:
+            data = f.read()
+        position = 0
+        while position + RECORD_HEADER.size <= len(data):
+            length, checksum, appended_at = RECORD_HEADER.unpack_from(data, position)
+            end = position + RECORD_HEADER.size + length
+            if end > len(data) or zlib.crc32(data[position + RECORD_HEADER.size:end]) != checksum:
+                break
+            self.positions.append(position)
+            self.times.append(appended_at)
+            position = end
+        self.size = position
+        if position < file_size:
+            with open(self.path, "r+b") as f:
+                f.truncate(position)
+        return file_size - position
+
+    def view(self) -> Optional[mmap.mmap]:
+        """Read-only map of the segment, remapped when the file has grown"""
+        if self.size == 0:
+            return None
+        if self._map is None or self._mapped_size != self.size:
+            self.unmap()
+            with open(self.path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), self.size, access=mmap.ACCESS_READ)
+            self._mapped_size = self.size
+        return self._map
+
+    def read(self, index: int) -> Dict[str, Any]:
+        view = self.view()
+        position = self.positions[index]
+        length, _, _ = RECORD_HEADER.unpack_from(view, position)
+        start = position + RECORD_HEADER.size
+        return json.loads(view[start:start + length])
+
+    def unmap(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+            self._mapped_size = 0
+
+
+class SegmentedEventLog:
+    """Durable append-only event log split into fixed-size segments.
+
+    Every event gets a monotonically increasing offset. Records are written
+    through a buffered file and fsynced in batches: after ``fsync_every``
+    records or ``fsync_interval`` seconds, whichever comes first; the time
+    limit relies on the owner calling ``sync_if_due`` periodically. A crash can
+    lose at most that unsynced tail; a torn last record is detected by its
+    CRC and truncated on the next start. When the active segment reaches
+    ``segment_bytes`` it is sealed and a new one started, and the oldest
+    sealed segments are deleted to stay within ``retention_bytes`` and
+    ``retention_seconds``.
+
+    Reads go through read-only memory maps of the segment files, using a
+    per-segment in-memory array of record positions, so reading an offset
+    or scanning backwards never parses unrelated records. Each record also
+    carries its append time, so ``offset_at`` maps a time to an offset by
+    bisection.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = 64 * 1024 * 1024,
+                 fsync_every: int = 1000, fsync_interval: float = 0.05,
+                 retention_bytes: Optional[int] = None, retention_seconds: Optional[float] = None):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.retention_bytes = retention_bytes
+        self.retention_seconds = retention_seconds
+
+        self._lock = threading.RLock()
+        self._segments: List[_Segment] = []
+        self._writer = None
+        self._unsynced = 0
+        self._unflushed = False
+        self._last_sync = time.monotonic()
+        self._last_time = 0.0
+        self.recovered_bytes = 0
+
+        self._open()
+
+    # === Lifecycle ===
+
+    def _segment_path(self, base_offset: int) -> Path:
+        return self.directory / f"{base_offset:020d}{SEGMENT_SUFFIX}"
+
+    def _open(self):
+        paths = sorted(self.directory.glob(f"*{SEGMENT_SUFFIX}"))
+        for path in paths:
+            segment = _Segment(path, int(path.stem))
+            self.recovered_bytes += segment.recover()
+            self._segments.append(segment)
+        if not self._segments:
+            self._segments.append(_Segment(self._segment_path(0), 0))
+            self._segments[0].path.touch()
+        self._last_time = max((s.times[-1] for s in self._segments if s.times), default=0.0)
+        self._writer = open(self._active.path, "ab")
+
+    @property
+    def _active(self) -> _Segment:
+        return self._segments[-1]
+
+    def close(self):
+        with self._lock:
+            if self._writer is not None:
+                self.sync()
+                self._writer.close()
+                self._writer = None
+            for segment in self._segments:
+                segment.unmap()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    # === Writes ===
+
+    def append(self, event: Dict[str, Any]) -> int:
+        """Append an event and return its offset"""
+        return self.append_many([event])[0]
+
+    def append_many(self, events: List[Dict[str, Any]]) -> List[int]:
+        """Append several events with a single write; returns their offsets"""
+        payloads = [json.dumps(event, separators=(",", ":"), default=str).encode("utf-8") for event in events]
+        with self._lock:
+            offsets = []
+            chunk = bytearray()
+            self._last_time = max(self._last_time, time.time())
+            for payload in payloads:
+                if self._active.size + len(chunk) >= self.segment_bytes and self._active.positions:
+                    self._write(chunk)
+                    chunk = bytearray()
+                    self._rotate()
+                segment = self._active
+                offsets.append(segment.next_offset)
+                segment.positions.append(segment.size + len(chunk))
+                segment.times.append(self._last_time)
+                chunk += RECORD_HEADER.pack(len(payload), zlib.crc32(payload), self._last_time)
+                chunk += payload
+            self._write(chunk)
+
+            self._unsynced += len(events)
+            if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+                self.sync()
+            return offsets
+
+    def _write(self, chunk: bytearray):
+        if chunk:
+            self._writer.write(chunk)
+            self._active.size += len(chunk)
+            self._unflushed = True
+
+    def _flush(self):
+        if self._unflushed:
+            self._writer.flush()
+            self._unflushed = False
+
+    def sync(self):
+        """Flush buffered records and fsync the active segment"""
+        with self._lock:
+            if self._writer is None:
+                return
+            self._flush()
+            if self._unsynced:
+                os.fsync(self._writer.fileno())
+            self._unsynced = 0
+            self._last_sync = time.monotonic()
+
+    def sync_if_due(self) -> bool:
+        """Sync when records have waited ``fsync_interval`` seconds; returns True if it did.
+
+        ``append_many`` only checks the deadline when the next batch comes
+        in, so a writer that goes quiet relies on this being called on a timer.
+        """
+        with self._lock:
+            if not self._unsynced or time.monotonic() - self._last_sync < self.fsync_interval:
+                return False
+            self.sync()
+            return True
+
+    def _rotate(self):
+        self.sync()
+        self._writer.close()
+        segment = _Segment(self._segment_path(self._active.next_offset), self._active.next_offset)
+        self._segments.append(segment)
+        self._writer = open(segment.path, "ab")
+        self.enforce_retention()
+
+    def enforce_retention(self) -> int:
+        """Delete sealed segments beyond the retention limits; returns how many"""
+        with self._lock:
+            removed = 0
+            now = time.time()
+            while len(self._segments) > 1:
+                oldest = self._segments[0]
+                total = sum(segment.size for segment in self._segments)
+                too_big = self.retention_bytes is not None and total > self.retention_bytes
+                too_old = (self.retention_seconds is not None
+                           and now - oldest.path.stat().st_mtime > self.retention_seconds)
+                if not (too_big or too_old):
+                    break
+                oldest.unmap()
+                oldest.path.unlink()
+                self._segments.pop(0)
+                removed += 1
+            return removed
+
+    # === Reads ===
+
+    @property
+    def first_offset(self) -> int:
+        return self._segments[0].base_offset
+
+    @property
+    def next_offset(self) -> int:
+        return self._active.next_offset
+
+    def __len__(self) -> int:
+        return self.next_offset - self.first_offset
+
+    def _locate(self, offset: int) -> Tuple[_Segment, int]:
+        for segment in reversed(self._segments):
+            if offset >= segment.base_offset:
+                return segment, offset - segment.base_offset
+        raise KeyError(offset)
+
+    def read(self, offset: int) -> Dict[str, Any]:
+        """Event at ``offset``; KeyError if it was never written or has expired"""
+        with self._lock:
+            if not self.first_offset <= offset < self.next_offset:
+                raise KeyError(offset)
+            self._flush()
+            segment, index = self._locate(offset)
+            return segment.read(index)
+
+    def timestamp(self, offset: int) -> float:
+        """Append time of the event at ``offset``"""
+        with self._lock:
+            if not self.first_offset <= offset < self.next_offset:
+                raise KeyError(offset)
+            segment, index = self._locate(offset)
+            return segment.times[index]
+
+    def offset_at(self, timestamp: float) -> int:
+        """First offset appended at or after ``timestamp`` (``next_offset`` if none)"""
+        with self._lock:
+            for segment in self._segments:
+                if segment.times and segment.times[-1] >= timestamp:
+                    return segment.base_offset + bisect_left(segment.times, timestamp)
+            return self.next_offset
+
+    def scan(self, start: Optional[int] = None, reverse: bool = False) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """(offset, event) pairs from ``start``, oldest first or newest first.
+
+        A forward scan also yields events appended while it runs; events
+        removed by retention meanwhile are skipped.
+        """
+        with self._lock:
+            if reverse:
+                offset = self.next_offset - 1 if start is None else min(start, self.next_offset - 1)
+            else:
+                offset = self.first_offset if start is None else start
+        step = -1 if reverse else 1
+        while True:
+            with self._lock:
+                if offset < self.first_offset:
+                    if reverse:
+                        return
+                    offset = self.first_offset
+                if offset >= self.next_offset:
+                    return
+                self._flush()
+                segment, index = self._locate(offset)
+                event = segment.read(index)
+            yield offset, event
+            offset += step
+
+    def query(self, predicate: Optional[Callable[[Dict[str, Any]], bool]] = None,
+              limit: Optional[int] = 50, newest_first: bool = True) -> List[Dict[str, Any]]:
+        """Up to ``limit`` matching events, scanning the whole retained history"""
+        results = []
+        for _, event in self.scan(reverse=newest_first):
+            if predicate is None or predicate(event):
+                results.append(event)
+                if limit is not None and len(results) >= limit:
+                    break
+        return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "directory": str(self.directory),
+                "segments": len(self._segments),
+                "events": len(self),
+                "first_offset": self.first_offset,
+                "next_offset": self.next_offset,
+                "bytes": sum(segment.size for segment in self._segments),
+                "unsynced_events": self._unsynced,
+                "recovered_bytes": self.recovered_bytes
+            }
@@ -0,0 +1,75 @@
+"""
+Shared Async HTTP Pool for BHIV Integrator Core
+One keep-alive ``httpx.AsyncClient`` per event loop with a cap on concurrent
+requests per host, used for webhooks and trigger actions.
+"""
+
+import asyncio
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+
+class AsyncHTTPPool:
+    """Pooled async HTTP client with per-host concurrency limits.
+
+    httpx only limits connections for the whole client, so each host also
+    gets a semaphore of ``per_host_limit``; a slow host can tie up at most
+    that many connections while requests to other hosts carry on. The
+    client is created lazily for the running event loop and recreated if a
+    new loop starts using the pool.
+    """
+
+    def __init__(self, max_connections: int = 100, per_host_limit: int = 10,
+                 keepalive_expiry: float = 30.0, timeout: float = 5.0,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.max_connections = max_connections
+        self.per_host_limit = per_host_limit
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+
+    def _ensure_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections,
+                                    keepalive_expiry=self.keepalive_expiry),
+                transport=self.transport
+            )
+            self._loop = loop
+            self._host_limits = {}
+        return self._client
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        limit = self._host_limits.get(host)
+        if limit is None:
+            limit = self._host_limits[host] = asyncio.Semaphore(self.per_host_limit)
+        return limit
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        client = self._ensure_client()
+        async with self._host_limit(url):
+            return await client.request(method, url, **kwargs)
+
+    async def post(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def put(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("PUT", url, **kwargs)
+
+    async def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._loop = None
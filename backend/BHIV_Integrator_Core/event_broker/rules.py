@@ -0,0 +1,313 @@
+"""
+Trigger Rules Engine for BHIV Integrator Core
+Declarative rules (event type + payload predicates -> actions) compiled into
+an indexed dispatch table, with hot reload and per-rule hit counters.
+"""
+
+import json
+import operator
+import os
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+WILDCARD = "*"
+_MISSING = object()
+
+
+def _getter(path: str) -> Callable[[Dict[str, Any]], Any]:
+    """Compile a dotted field path (``payload.amount``) into a lookup"""
+    keys = tuple(path.split("."))
+    if len(keys) == 1:
+        key = keys[0]
+        return lambda event: event.get(key, _MISSING)
+
+    def get(event):
+        value = event
+        for key in keys:
+            if not isinstance(value, dict):
+                return _MISSING
+            value = value.get(key, _MISSING)
+            if value is _MISSING:
+                return _MISSING
+        return value
+    return get
+
+
+def _ordered(compare: Callable[[Any, Any], bool], expected: Any) -> Callable[[Any], bool]:
+    def test(value):
+        if value is _MISSING or value is None:
+            return False
+        try:
+            return compare(value, expected)
+        except TypeError:
+            return False
+    return test
+
+
+def _test_for(op: str, expected: Any) -> Callable[[Any], bool]:
+    """Compile one comparison; the returned function takes the field value"""
+    if op == "eq":
+        return lambda value: value == expected
+    if op == "ne":
+        return lambda value: value != expected
+    if op in ("gt", "gte", "lt", "lte"):
+        return _ordered(getattr(operator, op.replace("gte", "ge").replace("lte", "le")), expected)
+    if op in ("in", "not_in"):
+        try:
+            choices = frozenset(expected)
+        except TypeError:
+            choices = tuple(expected)
+        if op == "in":
+            return lambda value: value is not _MISSING and _safe_in(value, choices)
+        return lambda value: value is _MISSING or not _safe_in(value, choices)
+    if op == "contains":
+        return lambda value: value is not _MISSING and value is not None and _safe_in(expected, value)
+    if op == "regex":
+        pattern = re.compile(expected)
+        return lambda value: value is not _MISSING and value is not None and pattern.search(str(value)) is not None
+    if op == "exists":
+        present = bool(expected) if expected is not None else True
+        return lambda value: (value is not _MISSING and value is not None) == present
+    raise ValueError(f"Unknown operator: {op}")
+
+
+def _safe_in(item: Any, container: Any) -> bool:
+    try:
+        return item in container
+    except TypeError:
+        return False
+
+
+def _all_of(checks: List[Tuple[Callable, Callable]]) -> Callable[[Dict[str, Any]], bool]:
+    """One predicate over the event from (getter, test) pairs"""
+    if not checks:
+        return lambda event: True
+    if len(checks) == 1:
+        get, test = checks[0]
+        return lambda event: test(get(event))
+
+    def predicate(event):
+        for get, test in checks:
+            if not test(get(event)):
+                return False
+        return True
+    return predicate
+
+
+class CompiledRule:
+    """A rule with its conditions compiled, plus its counters"""
+
+    def __init__(self, order: int, spec: Dict[str, Any]):
+        self.order = order
+        self.name = spec.get("name") or f"rule_{order}"
+        self.event_types = spec.get("event_type", WILDCARD)
+        if isinstance(self.event_types, str):
+            self.event_types = [self.event_types]
+        self.actions = list(spec.get("actions", []))
+        self.conditions = list(spec.get("when", []))
+
+        # The first equality/membership test on a hashable value becomes the
+        # index key; the rest are checked on the candidates the index returns
+        self.index_field: Optional[str] = None
+        self.index_values: Tuple[Any, ...] = ()
+        checks = []
+        for condition in self.conditions:
+            field, op, expected = condition["field"], condition.get("op", "eq"), condition.get("value")
+            if self.index_field is None and op in ("eq", "in"):
+                values = (expected,) if op == "eq" else tuple(dict.fromkeys(expected))
+                try:
+                    [hash(v) for v in values]
+                except TypeError:
+                    pass
+                else:
+                    self.index_field, self.index_values = field, values
+                    continue
+            checks.append((_getter(field), _test_for(op, expected)))
+        self.test = _all_of(checks)
+
+        self.evaluations = 0
+        self.hits = 0
+        self.action_runs = 0
+        self.action_errors = 0
+        self.action_ms = 0.0
+
+    def record_run(self, elapsed_ms: float, failed: bool):
+        self.action_runs += 1
+        self.action_ms += elapsed_ms
+        if failed:
+            self.action_errors += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "event_types": self.event_types,
+            "when": self.conditions,
+            "actions": self.actions,
+            "evaluations": self.evaluations,
+            "hits": self.hits,
+            "action_runs": self.action_runs,
+            "action_errors": self.action_errors,
+            "avg_action_ms": round(self.action_ms / self.action_runs, 3) if self.action_runs else 0.0
+        }
+
+
+class _Bucket:
+    """Rules for one event type: equality indexes plus a scan list"""
+
+    def __init__(self):
+        self.scan: List[CompiledRule] = []
+        self.indexes: Dict[str, Tuple[Callable, Dict[Any, List[CompiledRule]]]] = {}
+
+    def add(self, rule: CompiledRule):
+        if rule.index_field is None:
+            self.scan.append(rule)
+            return
+        if rule.index_field not in self.indexes:
+            self.indexes[rule.index_field] = (_getter(rule.index_field), {})
+        by_value = self.indexes[rule.index_field][1]
+        for value in rule.index_values:
+            by_value.setdefault(value, []).append(rule)
+
+    def match(self, event: Dict[str, Any]) -> List[CompiledRule]:
+        matched = []
+        for rule in self.scan:
+            rule.evaluations += 1
+            if rule.test(event):
+                matched.append(rule)
+        for get, by_value in self.indexes.values():
+            try:
+                candidates = by_value.get(get(event))
+            except TypeError:
+                continue
+            for rule in candidates or ():
+                rule.evaluations += 1
+                if rule.test(event):
+                    matched.append(rule)
+        if self.indexes and len(matched) > 1:
+            matched.sort(key=lambda rule: rule.order)
+        return matched
+
+
+class RuleSet:
+    """Rules compiled into a dispatch table keyed by event type.
+
+    Wildcard rules are copied into every type's bucket at compile time, so
+    matching an event is one dict lookup, one index probe per indexed field
+    and the residual predicates of the candidates found; rules that cannot
+    be indexed are scanned. Matches come back in rule order.
+    """
+
+    def __init__(self, specs: Iterable[Dict[str, Any]], known_actions: Optional[Iterable[str]] = None):
+        self.rules = [CompiledRule(order, spec) for order, spec in enumerate(specs)
+                      if spec.get("enabled", True)]
+        known = set(known_actions) if known_actions is not None else None
+        self.unknown_actions = sorted({action for rule in self.rules for action in rule.actions
+                                       if known is not None and action not in known})
+
+        self._default = _Bucket()
+        self._table: Dict[str, _Bucket] = {event_type: _Bucket() for rule in self.rules
+                                           for event_type in rule.event_types if event_type != WILDCARD}
+        for rule in self.rules:
+            if WILDCARD in rule.event_types:
+                buckets = [self._default, *self._table.values()]
+            else:
+                buckets = [self._table[event_type] for event_type in set(rule.event_types)]
+            for bucket in buckets:
+                bucket.add(rule)
+
+    def match(self, event: Dict[str, Any]) -> List[CompiledRule]:
+        matched = self._table.get(event.get("event_type"), self._default).match(event)
+        for rule in matched:
+            rule.hits += 1
+        return matched
+
+
+def rules_from_triggers(triggers: Dict[str, List[str]]) -> List[Dict[str, Any]]:
+    """One unconditional rule per event type of an ``EVENT_TRIGGERS`` mapping"""
+    return [{"name": event_type, "event_type": event_type, "actions": list(actions)}
+            for event_type, actions in triggers.items()]
+
+
+class RulesEngine:
+    """Holds the active ``RuleSet`` and swaps in a new one on reload.
+
+    Rules come from the JSON file at ``path`` (a list of rules, or an object
+    with a ``rules`` list) when it exists, else from ``default_rules``. The
+    file's mtime is checked at most every ``reload_interval`` seconds while
+    matching; a file that fails to compile leaves the current rules active
+    and is reported in ``get_stats``.
+    """
+
+    def __init__(self, path: Optional[str] = None, default_rules: Optional[List[Dict[str, Any]]] = None,
+                 known_actions: Optional[Iterable[str]] = None, reload_interval: float = 2.0):
+        self.path = path
+        self.default_rules = default_rules or []
+        self.known_actions = list(known_actions) if known_actions is not None else None
+        self.reload_interval = reload_interval
+        self.ruleset = RuleSet([], self.known_actions)
+        self.events = 0
+        self.match_ns = 0
+        self.reloads = 0
+        self.last_error: Optional[str] = None
+        self._mtime: Optional[float] = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+
+    def _load_specs(self) -> List[Dict[str, Any]]:
+        if self.path and os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data["rules"] if isinstance(data, dict) else data
+        return self.default_rules
+
+    def reload(self) -> bool:
+        """Compile the rules again; returns False (keeping the old rules) on error"""
+        with self._lock:
+            try:
+                mtime = os.path.getmtime(self.path) if self.path and os.path.exists(self.path) else None
+                ruleset = RuleSet(self._load_specs(), self.known_actions)
+            except (OSError, ValueError, KeyError, TypeError, re.error) as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                print(f"❌ Trigger rules not reloaded: {self.last_error}")
+                return False
+            self.ruleset, self._mtime, self.last_error = ruleset, mtime, None
+            self.reloads += 1
+            if ruleset.unknown_actions:
+                print(f"⚠️ Trigger rules name unknown actions: {', '.join(ruleset.unknown_actions)}")
+            return True
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if not self.path or now < self._next_check:
+            return
+        self._next_check = now + self.reload_interval
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = None
+        if mtime != self._mtime:
+            self.reload()
+
+    def match(self, event: Dict[str, Any]) -> List[CompiledRule]:
+        """Rules that fire for ``event``, in rule order"""
+        self._maybe_reload()
+        started = time.perf_counter_ns()
+        matched = self.ruleset.match(event)
+        self.match_ns += time.perf_counter_ns() - started
+        self.events += 1
+        return matched
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "source": self.path if self._mtime is not None else "defaults",
+            "rules": len(self.ruleset.rules),
+            "events": self.events,
+            "avg_match_us": round(self.match_ns / self.events / 1000, 3) if self.events else 0.0,
+            "reloads": self.reloads,
+            "last_error": self.last_error,
+            "unknown_actions": self.ruleset.unknown_actions,
+            "rule_stats": [rule.to_dict() for rule in self.ruleset.rules]
+        }
@@ -0,0 +1,404 @@
+"""
+Broker Transports for BHIV Integrator Core
+Topic-routed message queues behind one interface: RabbitMQ via aio_pika, an
+in-process asyncio backend and a durable SQLite backend.
+"""
+
+import asyncio
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Deque, Dict, List, Set, Tuple
+
+
+def topic_matches(pattern: str, routing_key: str) -> bool:
+    """AMQP topic matching: ``*`` is exactly one word, ``#`` zero or more"""
+    return _match(pattern.split("."), routing_key.split("."))
+
+
+def _match(pattern: List[str], words: List[str]) -> bool:
+    if not pattern:
+        return not words
+    head, rest = pattern[0], pattern[1:]
+    if head == "#":
+        return any(_match(rest, words[i:]) for i in range(len(words) + 1))
+    if not words:
+        return False
+    return (head == "*" or head == words[0]) and _match(rest, words[1:])
+
+
+class TransportMessage:
+    """A delivered message; ack it, reject it, or wrap handling in ``process``"""
+
+    def __init__(self, body: bytes, routing_key: str, redelivered: bool = False):
+        self.body = body
+        self.routing_key = routing_key
+        self.redelivered = redelivered
+        self._settled = False
+
+    async def ack(self):
+        if not self._settled:
+            self._settled = True
+            await self._ack()
+
+    async def reject(self, requeue: bool = False):
+        if not self._settled:
+            self._settled = True
+            await self._reject(requeue)
+
+    @asynccontextmanager
+    async def process(self, requeue: bool = False):
+        """Ack when the block succeeds, reject when it raises (as aio_pika does)"""
+        try:
+            yield self
+        except BaseException:
+            await self.reject(requeue)
+            raise
+        else:
+            await self.ack()
+
+    async def _ack(self):
+        raise NotImplementedError
+
+    async def _reject(self, requeue: bool):
+        raise NotImplementedError
+
+
+class BrokerTransport:
+    """Topic exchange with named queues.
+
+    ``declare_queue`` binds a queue to a routing-key pattern, ``publish``
+    copies a message to every bound queue, and ``consume`` yields messages
+    from one queue with at most ``prefetch`` of them handed out and not yet
+    acked or rejected.
+    """
+
+    name = "base"
+
+    async def connect(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def declare_queue(self, queue_name: str, routing_key: str):
+        raise NotImplementedError
+
+    async def publish(self, routing_key: str, body: bytes):
+        raise NotImplementedError
+
+    def consume(self, queue_name: str, prefetch: int = 1) -> AsyncIterator[TransportMessage]:
+        raise NotImplementedError
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"transport": self.name}
+
+
+class _Credit:
+    """Per-consumer count of unsettled messages, gating delivery at ``prefetch``"""
+
+    def __init__(self, prefetch: int):
+        self.prefetch = max(1, prefetch)
+        self.unsettled = 0
+        self.freed = asyncio.Event()
+
+    async def wait_for_room(self) -> int:
+        """Wait until another message may be handed out; returns how many"""
+        while self.unsettled >= self.prefetch:
+            self.freed.clear()
+            await self.freed.wait()
+        return self.prefetch - self.unsettled
+
+    def take(self):
+        self.unsettled += 1
+
+    def release(self):
+        self.unsettled -= 1
+        self.freed.set()
+
+
+# === In-process ===
+
+class _MemoryMessage(TransportMessage):
+    def __init__(self, queue: "_MemoryQueue", credit: _Credit, body: bytes, routing_key: str, redelivered: bool):
+        super().__init__(body, routing_key, redelivered)
+        self._queue = queue
+        self._credit = credit
+
+    async def _ack(self):
+        self._credit.release()
+
+    async def _reject(self, requeue: bool):
+        if requeue:
+            self._queue.put((self.body, self.routing_key, True), front=True)
+        self._credit.release()
+
+
+class _MemoryQueue:
+    def __init__(self):
+        self.messages: Deque[Tuple[bytes, str, bool]] = deque()
+        self.ready = asyncio.Event()
+
+    def put(self, item: Tuple[bytes, str, bool], front: bool = False):
+        if front:
+            self.messages.appendleft(item)
+        else:
+            self.messages.append(item)
+        self.ready.set()
+
+    async def get(self) -> Tuple[bytes, str, bool]:
+        while not self.messages:
+            self.ready.clear()
+            await self.ready.wait()
+        return self.messages.popleft()
+
+
+class InProcessTransport(BrokerTransport):
+    """Asyncio queues in this process; fast, ordered per queue, not durable"""
+
+    name = "memory"
+
+    def __init__(self):
+        self.queues: Dict[str, _MemoryQueue] = {}
+        self.bindings: Dict[str, Set[str]] = {}
+        self.published = 0
+
+    async def declare_queue(self, queue_name: str, routing_key: str):
+        if queue_name not in self.queues:
+            self.queues[queue_name] = _MemoryQueue()
+        self.bindings.setdefault(routing_key, set()).add(queue_name)
+
+    def _route(self, routing_key: str) -> Set[str]:
+        return {queue for pattern, queues in self.bindings.items()
+                if topic_matches(pattern, routing_key) for queue in queues}
+
+    async def publish(self, routing_key: str, body: bytes):
+        for queue_name in self._route(routing_key):
+            self.queues[queue_name].put((body, routing_key, False))
+        self.published += 1
+
+    async def consume(self, queue_name: str, prefetch: int = 1) -> AsyncIterator[TransportMessage]:
+        queue = self.queues[queue_name]
+        credit = _Credit(prefetch)
+        while True:
+            await credit.wait_for_room()
+            body, routing_key, redelivered = await queue.get()
+            credit.take()
+            yield _MemoryMessage(queue, credit, body, routing_key, redelivered)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"transport": self.name, "published": self.published,
+                "queue_depth": {name: len(q.messages) for name, q in self.queues.items()}}
+
+
+# === SQLite ===
+
+class _SQLiteMessage(TransportMessage):
+    def __init__(self, transport: "SQLiteTransport", credit: _Credit, queue_name: str, message_id: int,
+                 body: bytes, routing_key: str, redelivered: bool):
+        super().__init__(body, routing_key, redelivered)
+        self._transport = transport
+        self._credit = credit
+        self.queue_name = queue_name
+        self.message_id = message_id
+
+    async def _ack(self):
+        self._transport._settle(self.queue_name, self.message_id, requeue=False)
+        self._credit.release()
+
+    async def _reject(self, requeue: bool):
+        self._transport._settle(self.queue_name, self.message_id, requeue=requeue)
+        self._credit.release()
+
+
+class SQLiteTransport(BrokerTransport):
+    """Durable queues in one SQLite file.
+
+    Published messages are committed before ``publish`` returns and deleted
+    on ack. A message handed to a consumer is marked as leased; leases left
+    by a previous process are released on ``connect``, so unacked messages
+    are redelivered (with ``redelivered`` set) after a crash. Consumers in
+    this process are woken on publish; ``poll_interval`` covers publishers
+    in other processes.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str, poll_interval: float = 0.5, synchronous: str = "NORMAL"):
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"PRAGMA synchronous={synchronous}")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS bindings (
+                queue TEXT NOT NULL,
+                pattern TEXT NOT NULL,
+                PRIMARY KEY (queue, pattern)
+            );
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                queue TEXT NOT NULL,
+                routing_key TEXT NOT NULL,
+                body BLOB NOT NULL,
+                leased INTEGER NOT NULL DEFAULT 0,
+                redelivered INTEGER NOT NULL DEFAULT 0,
+                published_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS ix_messages_ready ON messages (queue, leased, id);
+        """)
+        self.bindings: Dict[str, Set[str]] = {}
+        for queue, pattern in self._conn.execute("SELECT queue, pattern FROM bindings"):
+            self.bindings.setdefault(pattern, set()).add(queue)
+        self._ready: Dict[str, asyncio.Event] = {}
+        self.published = 0
+
+    async def connect(self):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE messages SET leased = 0, redelivered = 1 WHERE leased = 1")
+
+    async def close(self):
+        with self._lock:
+            self._conn.close()
+
+    async def declare_queue(self, queue_name: str, routing_key: str):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR IGNORE INTO bindings (queue, pattern) VALUES (?, ?)",
+                               (queue_name, routing_key))
+        self.bindings.setdefault(routing_key, set()).add(queue_name)
+
+    async def publish(self, routing_key: str, body: bytes):
+        queues = {queue for pattern, names in self.bindings.items()
+                  if topic_matches(pattern, routing_key) for queue in names}
+        if queues:
+            now = time.time()
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    "INSERT INTO messages (queue, routing_key, body, published_at) VALUES (?, ?, ?, ?)",
+                    [(queue, routing_key, body, now) for queue in sorted(queues)]
+                )
+            for queue in queues:
+                if queue in self._ready:
+                    self._ready[queue].set()
+        self.published += 1
+
+    def _lease(self, queue_name: str, limit: int) -> List[Tuple[int, str, bytes, int]]:
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT id, routing_key, body, redelivered FROM messages "
+                "WHERE queue = ? AND leased = 0 ORDER BY id LIMIT ?",
+                (queue_name, limit)
+            ).fetchall()
+            self._conn.executemany("UPDATE messages SET leased = 1 WHERE id = ?", [(row[0],) for row in rows])
+        return rows
+
+    def _settle(self, queue_name: str, message_id: int, requeue: bool):
+        with self._lock, self._conn:
+            if requeue:
+                self._conn.execute("UPDATE messages SET leased = 0, redelivered = 1 WHERE id = ?", (message_id,))
+            else:
+                self._conn.execute("DELETE FROM messages WHERE id = ?", (message_id,))
+        if requeue and queue_name in self._ready:
+            self._ready[queue_name].set()
+
+    async def consume(self, queue_name: str, prefetch: int = 1) -> AsyncIterator[TransportMessage]:
+        ready = self._ready.setdefault(queue_name, asyncio.Event())
+        credit = _Credit(prefetch)
+        while True:
+            room = await credit.wait_for_room()
+            ready.clear()
+            rows = self._lease(queue_name, room)
+            if not rows:
+                try:
+                    await asyncio.wait_for(ready.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            for message_id, routing_key, body, redelivered in rows:
+                credit.take()
+                yield _SQLiteMessage(self, credit, queue_name, message_id, body, routing_key, bool(redelivered))
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            depth = dict(self._conn.execute(
+                "SELECT queue, COUNT(*) FROM messages WHERE leased = 0 GROUP BY queue").fetchall())
+        return {"transport": self.name, "published": self.published, "queue_depth": depth}
+
+
+# === RabbitMQ ===
+
+class _RabbitMQMessage(TransportMessage):
+    def __init__(self, message):
+        super().__init__(message.body, message.routing_key, bool(message.redelivered))
+        self._message = message
+
+    async def _ack(self):
+        await self._message.ack()
+
+    async def _reject(self, requeue: bool):
+        await self._message.reject(requeue=requeue)
+
+
+class RabbitMQTransport(BrokerTransport):
+    """Durable topic exchange on RabbitMQ through ``aio_pika``"""
+
+    name = "rabbitmq"
+
+    def __init__(self, url: str, exchange_name: str):
+        self.url = url
+        self.exchange_name = exchange_name
+        self.connection = None
+        self.exchange = None
+        self._channels: List[Any] = []
+
+    async def connect(self):
+        import aio_pika
+
+        self.connection = await aio_pika.connect_robust(self.url)
+        channel = await self.connection.channel()
+        self._channels.append(channel)
+        self.exchange = await channel.declare_exchange(self.exchange_name, aio_pika.ExchangeType.TOPIC, durable=True)
+
+    async def close(self):
+        if self.connection:
+            await self.connection.close()
+            self.connection = None
+
+    async def declare_queue(self, queue_name: str, routing_key: str):
+        queue = await self._channels[0].declare_queue(queue_name, durable=True)
+        await queue.bind(self.exchange, routing_key=routing_key)
+
+    async def publish(self, routing_key: str, body: bytes):
+        import aio_pika
+
+        await self.exchange.publish(
+            aio_pika.Message(body=body, delivery_mode=aio_pika.DeliveryMode.PERSISTENT),
+            routing_key=routing_key
+        )
+
+    async def consume(self, queue_name: str, prefetch: int = 1) -> AsyncIterator[TransportMessage]:
+        # Prefetch is per channel, so every consumer gets its own
+        channel = await self.connection.channel()
+        self._channels.append(channel)
+        await channel.set_qos(prefetch_count=prefetch)
+        queue = await channel.declare_queue(queue_name, durable=True)
+        async with queue.iterator() as queue_iter:
+            async for message in queue_iter:
+                yield _RabbitMQMessage(message)
+
+
+def create_transport(name: str, settings: Dict[str, Any]) -> BrokerTransport:
+    """Transport for ``name``: ``rabbitmq``, ``memory`` or ``sqlite``"""
+    if name == "rabbitmq":
+        return RabbitMQTransport(settings["rabbitmq_url"], settings["rabbitmq_exchange"])
+    if name == "memory":
+        return InProcessTransport()
+    if name == "sqlite":
+        return SQLiteTransport(settings["broker_sqlite_path"])
+    raise ValueError(f"Unknown broker transport: {name}")
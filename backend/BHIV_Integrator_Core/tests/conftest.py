@@ -0,0 +1,13 @@
+"""
+Keep broker state written by tests out of the working tree
+"""
+
+import os
+import tempfile
+
+_data_dir = tempfile.mkdtemp(prefix="bhiv_tests_")
+os.environ.setdefault("EVENT_LOG_DIR", os.path.join(_data_dir, "event_log"))
+os.environ.setdefault("DELIVERY_DB_PATH", os.path.join(_data_dir, "deliveries.db"))
+os.environ.setdefault("BROKER_SQLITE_PATH", os.path.join(_data_dir, "broker.db"))
+os.environ.setdefault("BROKER_TRANSPORT", "memory")
+os.environ.setdefault("LOG_SINK_DIR", os.path.join(_data_dir, "logs"))
@@ -0,0 +1,149 @@
+"""
+Tests for partitioned concurrent queue consumers
+"""
+
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from event_broker.consumer import PartitionedConsumer, event_partition_key
+from event_broker.transport import InProcessTransport
+
+
+def message(i, order_id=None):
+    payload = {"n": i}
+    if order_id:
+        payload["order_id"] = order_id
+    return json.dumps({"event_id": f"evt-{i}", "event_type": "order_updated", "payload": payload}).encode()
+
+
+async def fill(count, order_ids=None):
+    transport = InProcessTransport()
+    await transport.declare_queue("q_logistics", "*.logistics")
+    for i in range(count):
+        order_id = order_ids[i % len(order_ids)] if order_ids else None
+        await transport.publish("order_updated.logistics", message(i, order_id))
+    return transport
+
+
+async def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        await asyncio.sleep(0.005)
+
+
+class TestPartitionKey:
+    """Test which field orders an event"""
+
+    def test_first_known_payload_field_wins(self):
+        assert event_partition_key(message(1, "ORD-7")) == "order_id:ORD-7"
+        assert event_partition_key(message(1)) == "evt-1"
+        assert event_partition_key(b"not json") == ""
+
+
+class TestPartitionedConsumer:
+    """Test concurrency, per-key ordering and drain"""
+
+    def test_throughput_scales_with_concurrency(self):
+        async def run(concurrency):
+            transport = await fill(200)
+            handled = []
+
+            async def handler(body):
+                await asyncio.sleep(0.01)
+                handled.append(body)
+
+            consumer = PartitionedConsumer(transport, "q_logistics", handler, concurrency=concurrency, prefetch=64)
+            started = time.perf_counter()
+            consumer.start()
+            await wait_for(lambda: len(handled) == 200, timeout=10)
+            elapsed = time.perf_counter() - started
+            await consumer.stop()
+            return elapsed
+
+        sequential = asyncio.run(run(1))
+        concurrent = asyncio.run(run(16))
+        assert sequential / concurrent > 5
+
+    def test_events_of_one_order_are_processed_in_order(self):
+        seen = {}
+
+        async def run():
+            transport = await fill(300, order_ids=[f"ORD-{k}" for k in range(7)])
+
+            async def handler(body):
+                event = json.loads(body)
+                await asyncio.sleep(random.uniform(0, 0.003))
+                seen.setdefault(event["payload"]["order_id"], []).append(event["payload"]["n"])
+
+            consumer = PartitionedConsumer(transport, "q_logistics", handler, concurrency=4, prefetch=32)
+            consumer.start()
+            await wait_for(lambda: sum(map(len, seen.values())) == 300)
+            await consumer.stop()
+
+        asyncio.run(run())
+        assert len(seen) == 7
+        for numbers in seen.values():
+            assert numbers == sorted(numbers)
+
+    def test_prefetch_bounds_messages_held(self):
+        async def run():
+            transport = await fill(100)
+            gate = asyncio.Event()
+
+            async def handler(body):
+                await gate.wait()
+
+            consumer = PartitionedConsumer(transport, "q_logistics", handler, concurrency=4, prefetch=10)
+            consumer.start()
+            await asyncio.sleep(0.05)
+            held = consumer.get_stats()["buffered"] + 4
+            remaining = len(transport.queues["q_logistics"].messages)
+            gate.set()
+            await consumer.stop()
+            return held, remaining
+
+        held, remaining = asyncio.run(run())
+        assert held == 10
+        assert remaining == 90
+
+    def test_stop_drains_messages_already_taken(self):
+        async def run():
+            transport = await fill(40)
+            handled = []
+
+            async def handler(body):
+                await asyncio.sleep(0.01)
+                handled.append(body)
+
+            consumer = PartitionedConsumer(transport, "q_logistics", handler, concurrency=2, prefetch=20)
+            consumer.start()
+            await asyncio.sleep(0.02)
+            await consumer.stop(drain_timeout=5)
+            left = len(transport.queues["q_logistics"].messages)
+            return len(handled), left, consumer.get_stats()
+
+        handled, left, stats = asyncio.run(run())
+        assert handled + left == 40
+        assert stats["processed"] == handled and stats["buffered"] == 0
+
+    def test_undrained_messages_are_requeued(self):
+        async def run():
+            transport = await fill(10)
+
+            async def handler(body):
+                await asyncio.sleep(10)
+
+            consumer = PartitionedConsumer(transport, "q_logistics", handler, concurrency=2, prefetch=10)
+            consumer.start()
+            await asyncio.sleep(0.02)
+            await consumer.stop(drain_timeout=0.05)
+            return [json.loads(body)["event_id"] for body, _, _ in transport.queues["q_logistics"].messages]
+
+        requeued = asyncio.run(run())
+        assert sorted(requeued) == sorted(f"evt-{i}" for i in range(10))
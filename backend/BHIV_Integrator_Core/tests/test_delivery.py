@@ -0,0 +1,161 @@
+"""
+Tests for durable webhook delivery, retries and dead letters
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from event_broker.delivery import DeliveryQueue, WebhookDelivery
+from event_broker.http_pool import AsyncHTTPPool
+
+
+def make_event(i, event_type="order_created"):
+    return {"event_id": f"evt-{i}", "event_type": event_type, "source_system": "logistics",
+            "target_systems": ["crm"], "payload": {"n": i}}
+
+
+class Subscriber:
+    """Webhook endpoint answering with a scripted sequence of status codes"""
+
+    def __init__(self, statuses=(200,)):
+        self.statuses = list(statuses)
+        self.bodies = []
+
+    async def handler(self, request):
+        self.bodies.append(request.read())
+        status = self.statuses.pop(0) if len(self.statuses) > 1 else self.statuses[0]
+        return httpx.Response(status)
+
+
+def make_delivery(tmp_path, subscriber, batch_size=1, **kwargs):
+    subscriptions = {"crm": {"webhook_url": "http://crm/webhooks/events", "event_types": ["order_created"],
+                             "active": True, "max_batch_size": batch_size}}
+    pool = AsyncHTTPPool(transport=httpx.MockTransport(subscriber.handler))
+    kwargs.setdefault("base_delay", 0.01)
+    return WebhookDelivery(DeliveryQueue(str(tmp_path / "deliveries.db")), pool, subscriptions, **kwargs)
+
+
+async def settle(delivery, timeout=5.0):
+    """Wait until nothing is pending, then stop the workers"""
+    deadline = time.monotonic() + timeout
+    while delivery.queue.get_stats()["pending"] and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+    await delivery.stop()
+    await delivery.http.aclose()
+
+
+class TestDeliveryQueue:
+    """Test the durable queue itself"""
+
+    def test_enqueued_deliveries_survive_reopen(self, tmp_path):
+        queue = DeliveryQueue(str(tmp_path / "deliveries.db"))
+        assert queue.enqueue(["crm", "task_manager"], make_event(1)) == 2
+        queue.close()
+
+        reopened = DeliveryQueue(str(tmp_path / "deliveries.db"))
+        assert sorted(reopened.subscribers_pending()) == ["crm", "task_manager"]
+        rows = reopened.due("crm", time.time(), 10)
+        assert [row["event"]["event_id"] for row in rows] == ["evt-1"]
+
+    def test_retry_hides_row_until_due(self, tmp_path):
+        queue = DeliveryQueue(str(tmp_path / "deliveries.db"))
+        queue.enqueue(["crm"], make_event(1))
+        row = queue.due("crm", time.time(), 10)[0]
+        queue.retry([row["id"]], time.time() + 60, "HTTP 503")
+
+        assert queue.due("crm", time.time(), 10) == []
+        assert queue.due("crm", time.time() + 61, 10)[0]["attempts"] == 1
+
+
+class TestWebhookDelivery:
+    """Test the delivery workers"""
+
+    def test_single_event_delivered_as_body(self, tmp_path):
+        subscriber = Subscriber()
+        delivery = make_delivery(tmp_path, subscriber)
+
+        async def run():
+            assert delivery.enqueue(make_event(1)) == 1
+            assert delivery.enqueue(make_event(2, "lead_created")) == 0
+            await settle(delivery)
+
+        asyncio.run(run())
+        assert len(subscriber.bodies) == 1
+        assert b'"evt-1"' in subscriber.bodies[0]
+        assert delivery.stats["delivered"] == 1
+
+    def test_batches_in_order_when_subscriber_supports_it(self, tmp_path):
+        subscriber = Subscriber()
+        delivery = make_delivery(tmp_path, subscriber, batch_size=10)
+        for i in range(25):
+            delivery.queue.enqueue(["crm"], make_event(i))
+
+        async def run():
+            delivery.start()
+            await settle(delivery)
+
+        asyncio.run(run())
+        assert len(subscriber.bodies) == 3
+        ids = [e["event_id"] for body in subscriber.bodies for e in json.loads(body)["events"]]
+        assert ids == [f"evt-{i}" for i in range(25)]
+
+    def test_transient_failures_are_retried(self, tmp_path):
+        subscriber = Subscriber([503, 503, 200])
+        delivery = make_delivery(tmp_path, subscriber)
+
+        async def run():
+            delivery.enqueue(make_event(1))
+            await settle(delivery)
+
+        asyncio.run(run())
+        assert len(subscriber.bodies) == 3
+        assert delivery.stats["retried"] == 2
+        assert delivery.stats["delivered"] == 1
+        assert delivery.queue.dead_letters() == []
+
+    def test_exhausted_retries_dead_letter_then_redrive(self, tmp_path):
+        subscriber = Subscriber([500])
+        delivery = make_delivery(tmp_path, subscriber, max_attempts=3)
+
+        async def fail():
+            delivery.enqueue(make_event(1))
+            await settle(delivery)
+
+        asyncio.run(fail())
+        dead = delivery.queue.dead_letters("crm")
+        assert len(subscriber.bodies) == 3
+        assert dead[0]["attempts"] == 3 and dead[0]["last_error"] == "HTTP 500"
+
+        subscriber.statuses = [200]
+
+        async def redrive():
+            assert delivery.redrive("crm") == 1
+            await settle(delivery)
+
+        asyncio.run(redrive())
+        assert delivery.queue.dead_letters() == []
+        assert delivery.stats["delivered"] == 1
+
+    def test_rejected_event_dead_letters_without_retry(self, tmp_path):
+        subscriber = Subscriber([400])
+        delivery = make_delivery(tmp_path, subscriber)
+
+        async def run():
+            delivery.enqueue(make_event(1))
+            await settle(delivery)
+
+        asyncio.run(run())
+        assert len(subscriber.bodies) == 1
+        assert delivery.queue.dead_letters()[0]["attempts"] == 1
+
+    def test_backoff_is_capped_exponential(self, tmp_path):
+        delivery = make_delivery(tmp_path, Subscriber(), base_delay=1.0, max_delay=30.0)
+        for attempts in range(10):
+            assert 0 <= delivery.backoff(attempts) <= min(30.0, 2 ** attempts)
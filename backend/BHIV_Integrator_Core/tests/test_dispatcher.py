@@ -0,0 +1,184 @@
+"""
+Tests for priority lanes, weighted scheduling and backpressure
+"""
+
+import asyncio
+import os
+import sys
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from event_broker.dispatcher import BackpressureError, PriorityDispatcher, lane_for
+
+
+def recorder(order, lane, delay=0.0):
+    async def job():
+        if delay:
+            await asyncio.sleep(delay)
+        order.append(lane)
+    return job
+
+
+class TestPriorityDispatcher:
+    """Test lane selection, fairness and backpressure policies"""
+
+    def test_priorities_map_onto_lanes(self):
+        assert lane_for("critical") == "critical"
+        assert lane_for("HIGH") == "high"
+        assert lane_for("medium") == "normal"
+        assert lane_for(None) == "normal"
+        assert lane_for("whenever") == "normal"
+
+    def test_weighted_fair_share_across_busy_lanes(self):
+        order = []
+        dispatcher = PriorityDispatcher(workers=1)
+
+        async def run():
+            for lane in ("low", "normal", "high", "critical"):
+                for _ in range(30):
+                    await dispatcher.submit(lane, recorder(order, lane))
+            await dispatcher.join()
+            await dispatcher.stop()
+
+        asyncio.run(run())
+        first_round = order[:15]
+        assert {lane: first_round.count(lane) for lane in ("critical", "high", "normal", "low")} == \
+            {"critical": 8, "high": 4, "normal": 2, "low": 1}
+        assert len(order) == 120
+
+    def test_critical_event_overtakes_bulk_backlog(self):
+        order = []
+        dispatcher = PriorityDispatcher(workers=2)
+
+        async def run():
+            for _ in range(200):
+                await dispatcher.submit("low", recorder(order, "low", delay=0.001))
+            await dispatcher.submit("critical", recorder(order, "critical"))
+            await dispatcher.join()
+            await dispatcher.stop()
+
+        asyncio.run(run())
+        assert order.index("critical") < 5
+        assert dispatcher.get_stats()["lanes"]["critical"]["queue_wait_ms"]["max"] < \
+            dispatcher.get_stats()["lanes"]["low"]["queue_wait_ms"]["max"]
+
+    def test_reject_policy_refuses_when_full(self):
+        dispatcher = PriorityDispatcher(workers=1, lane_capacity=2, backpressure="reject")
+
+        async def run():
+            gate = asyncio.Event()
+
+            async def blocked():
+                await gate.wait()
+
+            await dispatcher.submit("normal", blocked)
+            await asyncio.sleep(0)  # worker takes the first job
+            await dispatcher.submit("normal", blocked)
+            await dispatcher.submit("normal", blocked)
+            with pytest.raises(BackpressureError):
+                await dispatcher.submit("normal", blocked)
+            assert await dispatcher.submit("high", blocked) == "high"
+            gate.set()
+            await dispatcher.join()
+            await dispatcher.stop()
+
+        asyncio.run(run())
+        assert dispatcher.get_stats()["lanes"]["normal"]["rejected"] == 1
+
+    def test_shed_policy_drops_low_and_blocks_critical(self):
+        dispatcher = PriorityDispatcher(workers=1, lane_capacity=1, backpressure="shed")
+
+        async def run():
+            gate = asyncio.Event()
+
+            async def blocked():
+                await gate.wait()
+
+            await dispatcher.submit("low", blocked)
+            await asyncio.sleep(0)
+            await dispatcher.submit("low", blocked)
+            assert await dispatcher.submit("low", blocked) is None
+
+            await dispatcher.submit("critical", blocked)
+            pending = asyncio.create_task(dispatcher.submit("critical", blocked))
+            await asyncio.sleep(0.05)
+            assert not pending.done()
+            gate.set()
+            assert await pending == "critical"
+            await dispatcher.join()
+            await dispatcher.stop()
+
+        asyncio.run(run())
+        assert dispatcher.get_stats()["lanes"]["low"]["shed"] == 1
+
+    def test_block_policy_times_out(self):
+        dispatcher = PriorityDispatcher(workers=1, lane_capacity=1, block_timeout=0.05)
+
+        async def run():
+            gate = asyncio.Event()
+
+            async def blocked():
+                await gate.wait()
+
+            await dispatcher.submit("high", blocked)
+            await asyncio.sleep(0)
+            await dispatcher.submit("high", blocked)
+            with pytest.raises(BackpressureError):
+                await dispatcher.submit("high", blocked)
+            gate.set()
+            await dispatcher.join()
+            await dispatcher.stop()
+
+        asyncio.run(run())
+
+    def test_failed_job_is_counted_and_workers_keep_going(self):
+        order = []
+        dispatcher = PriorityDispatcher(workers=1)
+
+        async def boom():
+            raise RuntimeError("trigger failed")
+
+        async def run():
+            await dispatcher.submit("normal", boom)
+            await dispatcher.submit("normal", recorder(order, "normal"))
+            await dispatcher.join()
+            await dispatcher.stop()
+
+        asyncio.run(run())
+        assert order == ["normal"]
+        assert dispatcher.get_stats()["lanes"]["normal"]["failed"] == 1
+
+
+class TestPublishBackpressure:
+    """Test that /publish answers 429 when the lane refuses the event"""
+
+    def test_publish_returns_429_when_lane_is_full(self):
+        from event_broker import event_broker as broker_module
+
+        original = broker_module.dispatcher
+        broker_module.dispatcher = PriorityDispatcher(workers=1, lane_capacity=0, backpressure="reject")
+        app = FastAPI()
+        app.include_router(broker_module.router)
+        events_before = len(broker_module.event_store)
+
+        async def publish():
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://broker") as client:
+                response = await client.post("/publish", json={"event_type": "inventory_updated",
+                                                               "source_system": "logistics",
+                                                               "target_systems": [], "payload": {},
+                                                               "priority": "low"})
+            await broker_module.dispatcher.stop()
+            return response
+
+        try:
+            response = asyncio.run(publish())
+        finally:
+            broker_module.dispatcher = original
+
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "1"
+        assert len(broker_module.event_store) == events_before
@@ -0,0 +1,96 @@
+"""
+Tests for event log secondary indexes
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from event_broker.event_log import SegmentedEventLog
+from event_broker.event_index import EventIndex
+
+
+def make_event(i, event_type="order_created", targets=("crm",), correlation_id=None):
+    return {"event_id": f"evt-{i}", "event_type": event_type, "source_system": "logistics",
+            "target_systems": list(targets), "payload": {"n": i},
+            "correlation_id": correlation_id or f"evt-{i}"}
+
+
+class TestEventIndex:
+    """Test indexed queries, pagination and traces"""
+
+    def test_rare_type_found_beyond_recent_window(self, tmp_path):
+        index = EventIndex(SegmentedEventLog(tmp_path))
+        index.append(make_event(0, "inventory_low"))
+        for i in range(1, 2000):
+            index.append(make_event(i))
+
+        page = index.query(event_type="inventory_low", limit=50)
+        assert [e["event_id"] for e in page["events"]] == ["evt-0"]
+        assert page["next_cursor"] is None
+
+    def test_pagination_covers_every_match_once(self, tmp_path):
+        index = EventIndex(SegmentedEventLog(tmp_path, segment_bytes=4000))
+        for i in range(300):
+            index.append(make_event(i, "task_created" if i % 3 else "order_created",
+                                    ("crm", "task_manager") if i % 2 else ("crm",)))
+
+        seen, cursor = [], None
+        while True:
+            page = index.query(event_type="task_created", target_system="task_manager",
+                               cursor=cursor, limit=25)
+            seen += [e["payload"]["n"] for e in page["events"]]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+        expected = [i for i in range(300) if i % 3 and i % 2][::-1]
+        assert seen == expected
+
+        oldest = index.query(target_system="crm", limit=3, newest_first=False)
+        assert [e["payload"]["n"] for e in oldest["events"]] == [0, 1, 2]
+
+    def test_time_range(self, tmp_path):
+        log = SegmentedEventLog(tmp_path)
+        index = EventIndex(log)
+        for i in range(5):
+            index.append(make_event(i))
+        time.sleep(0.02)
+        middle = time.time()
+        for i in range(5, 8):
+            index.append(make_event(i))
+        time.sleep(0.02)
+        end = time.time()
+        index.append(make_event(8))
+
+        page = index.query(since=middle, until=end, newest_first=False)
+        assert [e["payload"]["n"] for e in page["events"]] == [5, 6, 7]
+
+    def test_trace_returns_correlated_chain(self, tmp_path):
+        index = EventIndex(SegmentedEventLog(tmp_path))
+        index.append(make_event(0, "order_created", correlation_id="order-1"))
+        for i in range(1, 1000):
+            index.append(make_event(i))
+        index.append(make_event(1000, "task_created", correlation_id="order-1"))
+        index.append(make_event(1001, "task_escalated", correlation_id="order-1"))
+
+        chain = index.trace("order-1")
+        assert [e["event_type"] for e in chain] == ["order_created", "task_created", "task_escalated"]
+        assert [e["offset"] for e in chain] == [0, 1000, 1001]
+        assert index.trace("missing") == []
+
+    def test_rebuilt_on_restart_and_trimmed_by_retention(self, tmp_path):
+        with SegmentedEventLog(tmp_path, segment_bytes=2000, retention_bytes=6000) as log:
+            index = EventIndex(log)
+            for i in range(200):
+                index.append(make_event(i, "order_created" if i else "inventory_low"))
+            assert "inventory_low" not in index.by_type
+            assert index.by_type["order_created"][0] == log.first_offset
+
+        with SegmentedEventLog(tmp_path, segment_bytes=2000, retention_bytes=6000) as log:
+            index = EventIndex(log)
+            page = index.query(event_type="order_created", limit=1)
+            assert page["events"][0]["event_id"] == "evt-199"
+            assert len(index.by_type["order_created"]) == len(log)
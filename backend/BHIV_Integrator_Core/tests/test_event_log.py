@@ -0,0 +1,115 @@
+"""
+Tests for the durable segmented event log
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from event_broker.event_log import SegmentedEventLog
+
+
+def make_event(i, event_type="order_created", target="crm"):
+    return {"event_id": f"evt-{i}", "event_type": event_type, "source_system": "logistics",
+            "target_systems": [target], "payload": {"order_id": i}, "priority": "normal"}
+
+
+class TestSegmentedEventLog:
+    """Test appends, reads, recovery and retention"""
+
+    def test_offsets_and_reads(self, tmp_path):
+        with SegmentedEventLog(tmp_path) as log:
+            offsets = [log.append(make_event(i)) for i in range(5)]
+            offsets += log.append_many([make_event(i) for i in range(5, 8)])
+
+            assert offsets == list(range(8))
+            assert log.read(6)["event_id"] == "evt-6"
+            assert [o for o, _ in log.scan(start=5)] == [5, 6, 7]
+            assert [e["event_id"] for _, e in log.scan(reverse=True)][:2] == ["evt-7", "evt-6"]
+            with pytest.raises(KeyError):
+                log.read(8)
+
+    def test_history_survives_restart(self, tmp_path):
+        with SegmentedEventLog(tmp_path, segment_bytes=2000) as log:
+            for i in range(100):
+                log.append(make_event(i))
+            segments = log.get_stats()["segments"]
+
+        with SegmentedEventLog(tmp_path, segment_bytes=2000) as log:
+            assert segments > 1
+            assert len(log) == 100
+            assert log.read(42)["payload"] == {"order_id": 42}
+            assert log.append(make_event(100)) == 100
+
+    def test_torn_tail_is_truncated(self, tmp_path):
+        with SegmentedEventLog(tmp_path) as log:
+            for i in range(10):
+                log.append(make_event(i))
+        segment = next(tmp_path.glob("*.log"))
+        with open(segment, "r+b") as f:
+            f.truncate(segment.stat().st_size - 7)
+
+        with SegmentedEventLog(tmp_path) as log:
+            assert len(log) == 9
+            assert log.recovered_bytes > 0
+            assert log.append(make_event(9)) == 9
+            assert log.read(9)["event_id"] == "evt-9"
+
+    def test_quiet_log_is_synced_after_the_interval(self, tmp_path):
+        import asyncio
+        from event_broker.event_broker import EventBroker
+
+        broker = EventBroker()
+        with SegmentedEventLog(tmp_path, fsync_every=1000, fsync_interval=0.05) as log:
+            broker.event_store = log
+            segment = next(tmp_path.glob("*.log"))
+
+            async def append_then_wait():
+                syncer = asyncio.create_task(broker._sync_event_log())
+                log.append(make_event(0))
+                on_disk_right_away = segment.stat().st_size
+                await asyncio.sleep(0.3)
+                syncer.cancel()
+                return on_disk_right_away, segment.stat().st_size
+
+            before, after = asyncio.run(append_then_wait())
+            assert before == 0
+            assert after > 0
+            assert log.get_stats()["unsynced_events"] == 0
+
+    def test_retention_drops_oldest_segments(self, tmp_path):
+        with SegmentedEventLog(tmp_path, segment_bytes=1500, retention_bytes=4000) as log:
+            for i in range(200):
+                log.append(make_event(i))
+
+            assert log.first_offset > 0
+            assert log.next_offset == 200
+            assert log.get_stats()["bytes"] <= 4000 + 1500
+            assert log.read(log.first_offset)["event_id"] == f"evt-{log.first_offset}"
+            with pytest.raises(KeyError):
+                log.read(0)
+
+    def test_query_filters_whole_history(self, tmp_path):
+        with SegmentedEventLog(tmp_path) as log:
+            log.append(make_event(0, "inventory_low", "logistics"))
+            for i in range(1, 500):
+                log.append(make_event(i))
+
+            matches = log.query(lambda e: e["event_type"] == "inventory_low", limit=50)
+            assert [e["event_id"] for e in matches] == ["evt-0"]
+            assert len(log.query(limit=50)) == 50
+
+    def test_publish_throughput(self, tmp_path):
+        with SegmentedEventLog(tmp_path, segment_bytes=4 * 1024 * 1024) as log:
+            n = 20000
+            started = time.perf_counter()
+            for i in range(n):
+                log.append(make_event(i))
+            log.sync()
+            rate = n / (time.perf_counter() - started)
+
+        assert rate > 10000
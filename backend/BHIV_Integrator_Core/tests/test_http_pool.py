@@ -0,0 +1,122 @@
+"""
+Tests for the shared async HTTP pool and non-blocking broker dispatch
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from event_broker.http_pool import AsyncHTTPPool
+
+
+def slow_transport(delays, in_flight=None):
+    """Transport answering 200 after a per-host delay, tracking concurrency per host"""
+    in_flight = in_flight if in_flight is not None else {}
+
+    async def handler(request):
+        host = request.url.host
+        in_flight.setdefault(host, [0, 0])
+        in_flight[host][0] += 1
+        in_flight[host][1] = max(in_flight[host][1], in_flight[host][0])
+        await asyncio.sleep(delays.get(host, 0))
+        in_flight[host][0] -= 1
+        return httpx.Response(200, json={"ok": True})
+
+    return httpx.MockTransport(handler)
+
+
+class TestAsyncHTTPPool:
+    """Test concurrent fan-out, per-host limits and host isolation"""
+
+    def test_concurrent_posts_take_the_slowest_not_the_sum(self):
+        pool = AsyncHTTPPool(transport=slow_transport({"hook": 0.2}))
+
+        async def fan_out():
+            started = time.perf_counter()
+            responses = await asyncio.gather(*[pool.post(f"http://hook/{i}", json={}) for i in range(10)])
+            elapsed = time.perf_counter() - started
+            await pool.aclose()
+            return responses, elapsed
+
+        responses, elapsed = asyncio.run(fan_out())
+        assert all(r.status_code == 200 for r in responses)
+        assert elapsed < 1.0
+
+    def test_per_host_limit_caps_concurrency(self):
+        in_flight = {}
+        pool = AsyncHTTPPool(per_host_limit=3, transport=slow_transport({"hook": 0.02}, in_flight))
+
+        async def fan_out():
+            await asyncio.gather(*[pool.post("http://hook/", json={}) for _ in range(12)])
+            await pool.aclose()
+
+        asyncio.run(fan_out())
+        assert in_flight["hook"][1] == 3
+
+    def test_slow_host_does_not_block_other_hosts(self):
+        pool = AsyncHTTPPool(per_host_limit=2, transport=slow_transport({"slow": 1.0, "fast": 0.0}))
+
+        async def mixed():
+            slow = [asyncio.create_task(pool.post("http://slow/", json={})) for _ in range(6)]
+            await asyncio.sleep(0.01)
+            started = time.perf_counter()
+            await pool.post("http://fast/", json={})
+            elapsed = time.perf_counter() - started
+            for task in slow:
+                task.cancel()
+            await asyncio.gather(*slow, return_exceptions=True)
+            await pool.aclose()
+            return elapsed
+
+        assert asyncio.run(mixed()) < 0.2
+
+    def test_client_is_recreated_for_a_new_event_loop(self):
+        pool = AsyncHTTPPool(transport=slow_transport({}))
+        assert asyncio.run(pool.get("http://hook/")).status_code == 200
+        assert asyncio.run(pool.get("http://hook/")).status_code == 200
+
+
+class TestBrokerDispatch:
+    """Test that publishing does not wait for webhook delivery"""
+
+    def test_publish_returns_before_slow_webhooks(self, tmp_path):
+        from event_broker import event_broker as broker_module
+        from event_broker.delivery import DeliveryQueue
+
+        counts = {}
+        broker_module.http_pool.transport = slow_transport({"subscriber": 0.5}, counts)
+        broker_module.http_pool._client = None
+        original_queue = broker_module.delivery.queue
+        broker_module.delivery.queue = DeliveryQueue(str(tmp_path / "deliveries.db"))
+        broker = broker_module.EventBroker()
+        broker.subscriptions.clear()
+        for i in range(5):
+            broker.subscriptions[f"system_{i}"] = {"webhook_url": f"http://subscriber/{i}",
+                                                   "event_types": ["bench_event"], "active": True}
+
+        async def publish_and_deliver():
+            started = time.perf_counter()
+            result = await broker.publish_event({"event_type": "bench_event", "source_system": "test",
+                                                 "target_systems": [], "payload": {}})
+            published = time.perf_counter() - started
+            while broker.delivery.queue.get_stats()["pending"]:
+                await asyncio.sleep(0.01)
+            delivered = time.perf_counter() - started
+            await broker.stop()
+            return result, published, delivered
+
+        try:
+            result, published, delivered = asyncio.run(publish_and_deliver())
+        finally:
+            broker.subscriptions.clear()
+            broker_module.http_pool.transport = None
+            broker_module.delivery.queue = original_queue
+        assert result["deliveries_enqueued"] == 5
+        assert published < 0.2
+        assert 0.5 <= delivered < 1.5
+        assert counts["subscriber"][1] == 5
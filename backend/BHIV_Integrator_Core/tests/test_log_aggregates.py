@@ -0,0 +1,131 @@
+"""
+Tests for streaming compliance aggregates in the unified logger
+"""
+
+import asyncio
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import settings
+from unified_logging.aggregates import OTHER_KEY, LogAggregates
+from unified_logging.logger import UnifiedLogger
+from unified_logging.sink import BatchingLogSink
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def entry(system, event_type, compliant, dhi):
+    return {"system": system, "event_type": event_type, "compliance_flag": compliant, "dhi_score": dhi}
+
+
+def rescan(entries):
+    total = len(entries)
+    compliant = len([e for e in entries if e["compliance_flag"]])
+    return {"total_logs": total, "compliant_logs": compliant,
+            "compliance_rate": (compliant / total * 100) if total > 0 else 0,
+            "average_dhi_score": sum(e["dhi_score"] for e in entries) / total if total > 0 else 0}
+
+
+def test_running_totals_match_a_full_rescan():
+    rng = random.Random(7)
+    entries = [entry(rng.choice(["crm", "task", "logistics"]), rng.choice(["a", "b"]),
+                     rng.random() < 0.6, round(rng.random(), 2)) for _ in range(500)]
+    aggregates = LogAggregates()
+    for e in entries:
+        aggregates.add(e)
+
+    def close(a, b):
+        return all(abs(a[key] - b[key]) < 1e-9 for key in b)
+
+    assert close(aggregates.summary(), rescan(entries))
+    assert close(aggregates.summary(system="crm"), rescan([e for e in entries if e["system"] == "crm"]))
+    assert close(aggregates.summary(event_type="b"), rescan([e for e in entries if e["event_type"] == "b"]))
+    assert aggregates.summary(system="unknown")["total_logs"] == 0
+
+
+def test_sliding_windows_expire_old_entries():
+    clock = FakeClock()
+    aggregates = LogAggregates(windows=[60, 300], clock=clock)
+    aggregates.add(entry("crm", "a", True, 1.0))
+    clock.now += 120
+    aggregates.add(entry("crm", "a", False, 0.0))
+    aggregates.add(entry("crm", "a", False, 0.5))
+
+    windows = aggregates.window_summaries()
+    assert windows["60s"]["total_logs"] == 2 and windows["60s"]["compliant_logs"] == 0
+    assert windows["300s"]["total_logs"] == 3
+
+    clock.now += 400
+    windows = aggregates.window_summaries()
+    assert windows["60s"]["total_logs"] == 0 and windows["300s"]["total_logs"] == 0
+    assert aggregates.summary()["total_logs"] == 3
+
+
+def test_logger_summary_and_filtered_logs():
+    async def scenario():
+        logger = UnifiedLogger(sink=BatchingLogSink([], flush_interval=60))
+        for i in range(30):
+            await logger.log_event({"event_type": "order_created" if i % 3 else "shipment_created",
+                                    "event_id": str(i), "compliance_flag": i % 2 == 0, "dhi_score": 0.5})
+        await logger.log_api_call({"method": "GET", "endpoint": "/orders", "status_code": 200,
+                                   "request_id": "api-1"})
+        await logger.sink.close()
+        return logger
+
+    logger = asyncio.run(scenario())
+    summary = logger.get_compliance_summary()
+    assert summary["total_logs"] == 31
+    assert summary["compliant_logs"] == 15
+    assert summary["by_system"]["api_gateway"]["total_logs"] == 1
+    assert summary["by_event_type"]["shipment_created"]["total_logs"] == 10
+    assert summary["windows"]["60s"]["total_logs"] == 31
+
+    shipments = logger.get_logs(event_type="shipment_created", limit=3)
+    assert [log["reference_id"] for log in shipments] == ["21", "24", "27"]
+    both = logger.get_logs(system="bhiv_integrator", event_type="order_created", limit=2)
+    assert [log["reference_id"] for log in both] == ["28", "29"]
+    assert [log["reference_id"] for log in logger.get_logs(limit=2)] == ["29", "api-1"]
+
+
+def test_indexes_never_retain_more_than_the_log_store(monkeypatch):
+    monkeypatch.setitem(settings, "log_store_max", 100)
+    monkeypatch.setitem(settings, "log_index_max_keys", 20)
+
+    async def scenario():
+        logger = UnifiedLogger(sink=BatchingLogSink([], flush_interval=60))
+        for i in range(5000):
+            await logger.log_event({"event_type": f"type-{i % 50}", "event_id": str(i)})
+        await logger.sink.close()
+        return logger
+
+    logger = asyncio.run(scenario())
+    retained = {id(log) for log in logger.log_store}
+    for index in (logger._by_system, logger._by_event_type):
+        assert len(index) <= 20
+        indexed = [id(log) for bucket in index.values() for log in bucket]
+        assert len(indexed) <= 100 and set(indexed) <= retained
+    assert len(logger.log_store) == 100
+
+    recent = logger.get_logs(event_type="type-49", limit=5)
+    assert [log["reference_id"] for log in recent] == ["4949", "4999"]
+    assert [log["reference_id"] for log in logger.get_logs(event_type="type-3")] == ["4903", "4953"]
+    assert logger.get_logs(event_type="missing") == []
+
+
+def test_breakdowns_fold_keys_past_the_cap_into_other():
+    aggregates = LogAggregates(max_keys=3)
+    for i in range(10):
+        aggregates.add(entry("crm", f"type-{i}", True, 1.0))
+    breakdowns = aggregates.breakdowns()["by_event_type"]
+    assert set(breakdowns) == {"type-0", "type-1", "type-2", OTHER_KEY}
+    assert breakdowns[OTHER_KEY]["total_logs"] == 7
+    assert aggregates.summary()["total_logs"] == 10
@@ -0,0 +1,190 @@
+"""
+Tests for the batched unified log sink
+"""
+
+import asyncio
+import gzip
+import json
+import os
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from event_broker.http_pool import AsyncHTTPPool
+from unified_logging.logger import UnifiedLogger
+from unified_logging.sink import (BatchingLogSink, HTTPBatchExporter, JSONLSegmentExporter,
+                                  create_log_sink)
+
+
+class RecordingExporter:
+    def __init__(self, name="recording", forwarded_only=False, delay=0.0, fail=False):
+        self.name = name
+        self.forwarded_only = forwarded_only
+        self.delay = delay
+        self.fail = fail
+        self.batches = []
+
+    async def export(self, entries):
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("service down")
+        self.batches.append(list(entries))
+
+
+def test_flushes_by_size_and_by_time():
+    async def scenario():
+        exporter = RecordingExporter()
+        sink = BatchingLogSink([exporter], batch_size=3, flush_interval=0.05)
+        for i in range(3):
+            await sink.submit({"n": i})
+        await asyncio.sleep(0.01)
+        assert exporter.batches == [[{"n": 0}, {"n": 1}, {"n": 2}]]
+
+        await sink.submit({"n": 3})
+        await asyncio.sleep(0.01)
+        assert len(exporter.batches) == 1
+        await asyncio.sleep(0.1)
+        assert exporter.batches[-1] == [{"n": 3}]
+        await sink.close()
+        return sink.get_stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["exported"] == 4 and stats["batches"] == 2 and stats["buffered"] == 0
+
+
+def test_overflow_policies():
+    async def fill(policy):
+        exporter = RecordingExporter()
+        sink = BatchingLogSink([exporter], capacity=3, batch_size=100, flush_interval=60, overflow=policy)
+        for i in range(5):
+            await sink.submit({"n": i})
+        kept = [entry["n"] for entry, _ in sink.buffer]
+        await sink.close()
+        return kept, sink.get_stats()["dropped"]
+
+    assert asyncio.run(fill("drop_oldest")) == ([2, 3, 4], 2)
+    assert asyncio.run(fill("drop_newest")) == ([0, 1, 2], 2)
+
+
+def test_block_policy_waits_for_a_flush_instead_of_dropping():
+    async def scenario():
+        exporter = RecordingExporter(delay=0.01)
+        sink = BatchingLogSink([exporter], capacity=4, batch_size=4, flush_interval=60, overflow="block")
+        for i in range(20):
+            await sink.submit({"n": i})
+        await sink.close()
+        return exporter.batches, sink.get_stats()
+
+    batches, stats = asyncio.run(scenario())
+    assert [entry["n"] for batch in batches for entry in batch] == list(range(20))
+    assert stats["dropped"] == 0
+
+
+def test_forwarded_only_exporter_and_failures_are_isolated():
+    async def scenario():
+        database, core = RecordingExporter("database"), RecordingExporter("bhiv_core", forwarded_only=True)
+        broken = RecordingExporter("broken", fail=True)
+        sink = BatchingLogSink([database, core, broken], batch_size=10, flush_interval=60)
+        await sink.submit({"n": 1})
+        await sink.submit({"n": 2}, forward=False)
+        await sink.close()
+        return database.batches, core.batches, sink.get_stats()
+
+    database, core, stats = asyncio.run(scenario())
+    assert database == [[{"n": 1}, {"n": 2}]]
+    assert core == [[{"n": 1}]]
+    assert stats["export_errors"] == 1
+    assert stats["exporters"]["database"] == {"exported": 2, "failed": 0}
+    assert stats["exporters"]["bhiv_core"] == {"exported": 1, "failed": 0}
+    assert stats["exporters"]["broken"] == {"exported": 0, "failed": 2}
+    assert stats["exported"] == 0 and stats["failed"] == 2
+
+
+def test_failed_batches_are_not_reported_as_exported():
+    async def scenario():
+        sink = BatchingLogSink([RecordingExporter("database", fail=True)], capacity=3,
+                               batch_size=10, flush_interval=60)
+        for i in range(5):
+            await sink.submit({"n": i})
+        await sink.close()
+        return sink.get_stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["exported"] == 0
+    assert stats["failed"] == 3 and stats["dropped"] == 2
+    assert stats["exporters"]["database"] == {"exported": 0, "failed": 3}
+
+
+def test_http_exporter_posts_gzip_batches():
+    received = []
+
+    async def handler(request):
+        assert request.headers["Content-Encoding"] == "gzip"
+        received.append((request.url.path, json.loads(gzip.decompress(request.content))))
+        return httpx.Response(200)
+
+    async def scenario():
+        http = AsyncHTTPPool(transport=httpx.MockTransport(handler))
+        sink = create_log_sink({"log_sink": "http", "database_url": "sqlite:///x.db",
+                                "bhiv_core_url": "http://core", "database_service_url": "http://db",
+                                "bhiv_core_api_key": "key", "log_batch_size": 10}, http)
+        await sink.submit({"log_id": "a"})
+        await sink.submit({"log_id": "b"}, forward=False)
+        await sink.close()
+
+    asyncio.run(scenario())
+    by_path = dict(received)
+    assert by_path["/db/insert"] == {"table": "activity_log", "operation": "insert_many",
+                                     "data": [{"log_id": "a"}, {"log_id": "b"}]}
+    assert by_path["/logs/ingest"]["log_entries"] == [{"log_id": "a"}]
+
+
+def test_http_exporter_raises_on_error_status():
+    async def scenario():
+        http = AsyncHTTPPool(transport=httpx.MockTransport(lambda request: httpx.Response(503)))
+        exporter = HTTPBatchExporter("db", "http://db/insert", lambda entries: entries, http)
+        try:
+            await exporter.export([{"n": 1}])
+        except RuntimeError as e:
+            return str(e)
+
+    assert "503" in asyncio.run(scenario())
+
+
+def test_jsonl_segments_rotate(tmp_path):
+    async def scenario():
+        exporter = JSONLSegmentExporter(str(tmp_path), segment_bytes=200)
+        for batch in range(4):
+            await exporter.export([{"batch": batch, "n": i, "pad": "x" * 20} for i in range(3)])
+
+    asyncio.run(scenario())
+    segments = sorted(tmp_path.glob("logs-*.jsonl"))
+    assert len(segments) > 1
+    lines = [json.loads(line) for segment in segments for line in segment.read_text().splitlines()]
+    assert [(line["batch"], line["n"]) for line in lines] == [(b, i) for b in range(4) for i in range(3)]
+
+
+def test_logger_does_not_wait_on_the_network():
+    async def slow(request):
+        await asyncio.sleep(0.5)
+        return httpx.Response(200)
+
+    async def scenario():
+        http = AsyncHTTPPool(transport=httpx.MockTransport(slow))
+        sink = create_log_sink({"log_sink": "http", "database_url": "sqlite:///x.db",
+                                "bhiv_core_url": "http://core", "log_flush_interval_ms": 50}, http)
+        logger = UnifiedLogger(sink=sink)
+        started = time.perf_counter()
+        for i in range(50):
+            await logger.log_event({"event_type": "order_created", "event_id": str(i)})
+        elapsed = time.perf_counter() - started
+        await logger.flush()
+        return elapsed, logger
+
+    elapsed, logger = asyncio.run(scenario())
+    assert elapsed < 0.5
+    assert logger.get_sink_stats()["exported"] == 50
+    assert [log["reference_id"] for log in logger.get_logs(limit=3)] == ["47", "48", "49"]
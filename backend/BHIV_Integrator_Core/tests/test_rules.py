@@ -0,0 +1,148 @@
+"""
+Tests for the compiled trigger rules engine
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from event_broker.rules import RuleSet, RulesEngine, rules_from_triggers
+
+
+def event(event_type="order_created", **payload):
+    return {"event_type": event_type, "source_system": "logistics", "priority": "normal", "payload": payload}
+
+
+def names(rules):
+    return [rule.name for rule in rules]
+
+
+class TestRuleSet:
+    """Test compilation and matching"""
+
+    def test_triggers_become_unconditional_rules(self):
+        ruleset = RuleSet(rules_from_triggers({"order_created": ["create_crm_lead", "create_task"]}))
+        assert [r.actions for r in ruleset.match(event())] == [["create_crm_lead", "create_task"]]
+        assert ruleset.match(event("lead_created")) == []
+
+    def test_operators(self):
+        specs = [
+            {"name": "big", "event_type": "order_created", "when": [{"field": "payload.amount", "op": "gte", "value": 1000}]},
+            {"name": "vip", "event_type": "order_created", "when": [{"field": "payload.tier", "op": "in", "value": ["gold", "platinum"]}]},
+            {"name": "express", "event_type": "order_created", "when": [{"field": "payload.sku", "op": "regex", "value": "^EXP-"}]},
+            {"name": "no_email", "event_type": "order_created", "when": [{"field": "payload.email", "op": "exists", "value": False}]},
+            {"name": "not_internal", "event_type": "order_created", "when": [{"field": "source_system", "op": "ne", "value": "internal"}]},
+            {"name": "fragile", "event_type": "order_created", "when": [{"field": "payload.tags", "op": "contains", "value": "fragile"}]},
+        ]
+        ruleset = RuleSet(specs)
+        matched = names(ruleset.match(event(amount=1500, tier="gold", sku="EXP-1", email="a@b.c", tags=["fragile"])))
+        assert matched == ["big", "vip", "express", "not_internal", "fragile"]
+        assert names(ruleset.match(event(amount="n/a", tier=["gold"]))) == ["no_email", "not_internal"]
+
+    def test_wildcard_and_indexed_rules_keep_rule_order(self):
+        specs = [
+            {"name": "audit_all", "event_type": "*", "actions": ["log_compliance"]},
+            {"name": "delayed_north", "event_type": "delivery_delayed",
+             "when": [{"field": "payload.region", "value": "north"}, {"field": "payload.days", "op": "gt", "value": 2}]},
+            {"name": "delayed_any", "event_type": ["delivery_delayed", "delivery_failed"]},
+        ]
+        ruleset = RuleSet(specs)
+        assert names(ruleset.match(event("delivery_delayed", region="north", days=3))) == \
+            ["audit_all", "delayed_north", "delayed_any"]
+        assert names(ruleset.match(event("delivery_delayed", region="north", days=1))) == ["audit_all", "delayed_any"]
+        assert names(ruleset.match(event("delivery_failed"))) == ["audit_all", "delayed_any"]
+        assert names(ruleset.match(event("something_else"))) == ["audit_all"]
+
+    def test_disabled_rules_and_unknown_actions(self):
+        ruleset = RuleSet([{"name": "off", "event_type": "order_created", "enabled": False},
+                           {"name": "on", "event_type": "order_created", "actions": ["teleport"]}],
+                          known_actions=["create_task"])
+        assert names(ruleset.match(event())) == ["on"]
+        assert ruleset.unknown_actions == ["teleport"]
+
+    def test_hit_counters(self):
+        ruleset = RuleSet([{"name": "big", "event_type": "order_created",
+                            "when": [{"field": "payload.amount", "op": "gt", "value": 10}]}])
+        for amount in (5, 50, 500):
+            ruleset.match(event(amount=amount))
+        stats = ruleset.rules[0].to_dict()
+        assert stats["evaluations"] == 3 and stats["hits"] == 2
+
+    def test_thousands_of_rules_match_in_microseconds(self):
+        regions = [f"region_{i}" for i in range(100)]
+        specs = [{"name": f"{event_type}_{region}", "event_type": event_type,
+                  "when": [{"field": "payload.region", "value": region},
+                           {"field": "payload.amount", "op": "gt", "value": 100}],
+                  "actions": ["create_task"]}
+                 for event_type in (f"type_{t}" for t in range(50)) for region in regions]
+        ruleset = RuleSet(specs)
+        assert len(ruleset.rules) == 5000
+
+        events = [event(f"type_{i % 50}", region=regions[i % 100], amount=500) for i in range(2000)]
+        started = time.perf_counter()
+        matched = [ruleset.match(e) for e in events]
+        per_event_us = (time.perf_counter() - started) / len(events) * 1e6
+
+        assert all(len(m) == 1 for m in matched)
+        assert per_event_us < 50
+
+
+class TestRulesEngine:
+    """Test loading and hot reload"""
+
+    def test_hot_reload_from_file(self, tmp_path):
+        path = tmp_path / "rules.json"
+        path.write_text(json.dumps([{"name": "v1", "event_type": "order_created"}]))
+        engine = RulesEngine(str(path), reload_interval=0)
+        assert names(engine.match(event())) == ["v1"]
+
+        path.write_text(json.dumps({"rules": [{"name": "v2", "event_type": "order_created"}]}))
+        os.utime(path, (time.time() + 5, time.time() + 5))
+        assert names(engine.match(event())) == ["v2"]
+
+        path.write_text("{not json")
+        os.utime(path, (time.time() + 10, time.time() + 10))
+        assert names(engine.match(event())) == ["v2"]
+        assert engine.get_stats()["last_error"].startswith("JSONDecodeError")
+
+    def test_defaults_when_file_is_missing(self, tmp_path):
+        engine = RulesEngine(str(tmp_path / "missing.json"),
+                             default_rules=rules_from_triggers({"order_created": ["create_task"]}))
+        assert names(engine.match(event())) == ["order_created"]
+        assert engine.get_stats()["source"] == "defaults"
+
+
+class TestBrokerTriggers:
+    """Test that the broker runs matched rule actions once each"""
+
+    def test_shared_action_runs_once_and_is_timed(self):
+        from event_broker import event_broker as broker_module
+
+        broker = broker_module.EventBroker()
+        broker.rules = RulesEngine(default_rules=[
+            {"name": "alerts", "event_type": "inventory_low", "actions": ["send_slack_alert", "create_task"]},
+            {"name": "critical_stock", "event_type": "inventory_low",
+             "when": [{"field": "payload.quantity", "op": "lte", "value": 0}],
+             "actions": ["send_slack_alert", "escalate_task"]},
+        ], known_actions=broker_module.TRIGGER_ACTIONS)
+        calls = []
+
+        def record(action):
+            async def run(event):
+                calls.append(action)
+            return run
+
+        broker._send_slack_alert = record("send_slack_alert")
+        broker._create_task_from_event = record("create_task")
+        broker._escalate_task = record("escalate_task")
+
+        message = broker_module.EventMessage(event_type="inventory_low", source_system="logistics",
+                                             target_systems=[], payload={"quantity": 0})
+        asyncio.run(broker._process_event_triggers(message))
+
+        assert sorted(calls) == ["create_task", "escalate_task", "send_slack_alert"]
+        assert [r["action_runs"] for r in broker.rules.get_stats()["rule_stats"]] == [1, 1]
@@ -0,0 +1,221 @@
+"""
+Tests for the broker transports and the broker running on them
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from event_broker.transport import InProcessTransport, SQLiteTransport, topic_matches
+
+
+async def take(messages, count, timeout=1.0):
+    return [await asyncio.wait_for(messages.__anext__(), timeout) for _ in range(count)]
+
+
+class TestTopicRouting:
+    """Test AMQP-style routing key patterns"""
+
+    def test_patterns(self):
+        assert topic_matches("*.crm", "order_created.crm")
+        assert not topic_matches("*.crm", "order_created.task_manager")
+        assert not topic_matches("*.crm", "crm")
+        assert topic_matches("#.crm", "crm")
+        assert topic_matches("order.#", "order.created.crm")
+        assert topic_matches("order_created.crm", "order_created.crm")
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_transport(request, tmp_path):
+    def make():
+        if request.param == "memory":
+            return InProcessTransport()
+        return SQLiteTransport(str(tmp_path / "broker.db"), poll_interval=0.05)
+    return make
+
+
+class TestTransports:
+    """Behaviour both local transports share with RabbitMQ"""
+
+    def test_routes_by_system_in_order(self, make_transport):
+        async def run():
+            transport = make_transport()
+            await transport.connect()
+            await transport.declare_queue("q_crm", "*.crm")
+            await transport.declare_queue("q_tasks", "*.task_manager")
+            for i in range(20):
+                await transport.publish(f"event_{i}.crm", str(i).encode())
+            await transport.publish("task_created.task_manager", b"task")
+
+            messages = transport.consume("q_crm", prefetch=50)
+            received = await take(messages, 20)
+            for message in received:
+                await message.ack()
+            tasks = await take(transport.consume("q_tasks"), 1)
+            await transport.close()
+            return [m.body for m in received], tasks[0].body
+
+        crm, task = asyncio.run(run())
+        assert crm == [str(i).encode() for i in range(20)]
+        assert task == b"task"
+
+    def test_prefetch_limits_unacked_messages(self, make_transport):
+        async def run():
+            transport = make_transport()
+            await transport.declare_queue("q_crm", "*.crm")
+            for i in range(5):
+                await transport.publish("event.crm", str(i).encode())
+
+            received = []
+
+            async def collect():
+                async for message in transport.consume("q_crm", prefetch=2):
+                    received.append(message)
+
+            collector = asyncio.create_task(collect())
+            await asyncio.sleep(0.2)
+            held = len(received)
+            await received[0].ack()
+            await asyncio.sleep(0.2)
+            collector.cancel()
+            await asyncio.gather(collector, return_exceptions=True)
+            await transport.close()
+            return held, [m.body for m in received]
+
+        held, bodies = asyncio.run(run())
+        assert held == 2
+        assert bodies == [b"0", b"1", b"2"]
+
+    def test_rejected_message_is_requeued_first(self, make_transport):
+        async def run():
+            transport = make_transport()
+            await transport.declare_queue("q_crm", "*.crm")
+            await transport.publish("event.crm", b"a")
+            await transport.publish("event.crm", b"b")
+
+            messages = transport.consume("q_crm", prefetch=1)
+            with pytest.raises(RuntimeError):
+                message = (await take(messages, 1))[0]
+                async with message.process(requeue=True):
+                    raise RuntimeError("handler failed")
+            again = (await take(messages, 1))[0]
+            await transport.close()
+            return again
+
+        again = asyncio.run(run())
+        assert again.body == b"a" and again.redelivered
+
+
+class TestSQLiteTransport:
+    """Test durability across restarts"""
+
+    def test_unacked_messages_are_redelivered_after_restart(self, tmp_path):
+        path = str(tmp_path / "broker.db")
+
+        async def crash():
+            transport = SQLiteTransport(path)
+            await transport.connect()
+            await transport.declare_queue("q_crm", "*.crm")
+            for body in (b"acked", b"in-flight", b"queued"):
+                await transport.publish("event.crm", body)
+            first, second = await take(transport.consume("q_crm", prefetch=2), 2)
+            await first.ack()
+            await transport.close()
+
+        async def restart():
+            transport = SQLiteTransport(path)
+            await transport.connect()
+            received = await take(transport.consume("q_crm", prefetch=10), 2)
+            await transport.publish("event.crm", b"after-restart")
+            received += await take(transport.consume("q_crm", prefetch=10), 1)
+            await transport.close()
+            return [(m.body, m.redelivered) for m in received]
+
+        asyncio.run(crash())
+        assert asyncio.run(restart()) == [(b"in-flight", True), (b"queued", False), (b"after-restart", False)]
+
+
+class TestBrokerOnInProcessTransport:
+    """Run the broker end to end with no external services"""
+
+    def test_consumers_see_every_event_of_an_order_in_order(self):
+        from event_broker import event_broker as broker_module
+
+        broker = broker_module.EventBroker()
+        broker.transport = InProcessTransport()
+        processed = []
+
+        async def record(system_name, body):
+            processed.append((system_name, body))
+
+        async def skip_logging(event):
+            return None
+
+        broker._process_message = record
+        broker.logger.log_event = skip_logging
+
+        async def run(count):
+            await broker.start()
+            started = time.perf_counter()
+            for i in range(count):
+                await broker.publish_event({"event_type": "bench_event", "source_system": "test",
+                                            "target_systems": ["crm"],
+                                            "payload": {"order_id": "ORD-1", "n": i}})
+            while len(processed) < count:
+                await asyncio.sleep(0.01)
+            elapsed = time.perf_counter() - started
+            await broker.stop()
+            return elapsed
+
+        try:
+            elapsed = asyncio.run(run(500))
+        finally:
+            broker.subscriptions.clear()
+            del broker.logger.log_event
+
+        assert {system for system, _ in processed} == {"crm"}
+        ordered = [broker_module.json.loads(body)["payload"]["n"] for _, body in processed]
+        assert ordered == list(range(500))
+        assert 500 / elapsed > 200
+
+    def test_stop_closes_the_http_pool_after_consumers_drain(self):
+        from event_broker import event_broker as broker_module
+        from event_broker.http_pool import AsyncHTTPPool
+
+        broker = broker_module.EventBroker()
+        broker.transport = InProcessTransport()
+        broker.http = AsyncHTTPPool(transport=httpx.MockTransport(lambda request: httpx.Response(200)))
+        calls = []
+
+        async def call_out(system_name, body):
+            # Still holding the message when stop() begins
+            await asyncio.sleep(0.05)
+            calls.append((await broker.http.post("http://crm/webhooks/events", content=body)).status_code)
+
+        async def skip_logging(event):
+            return None
+
+        broker._process_message = call_out
+        broker.logger.log_event = skip_logging
+
+        async def run():
+            await broker.start()
+            await broker.publish_event({"event_type": "drain_event", "source_system": "test",
+                                        "target_systems": ["crm"], "payload": {"order_id": "ORD-1"}})
+            await asyncio.sleep(0.01)
+            await broker.stop()
+
+        try:
+            asyncio.run(run())
+        finally:
+            broker.subscriptions.clear()
+            del broker.logger.log_event
+
+        assert calls == [200]
+        assert broker.http._client is None
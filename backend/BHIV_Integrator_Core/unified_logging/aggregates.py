@@ -0,0 +1,122 @@
+"""
+Streaming Log Aggregates for BHIV Integrator Core
+Compliance counts and DHI score sums kept up to date as entries are logged,
+overall, per system, per event type and over sliding time windows.
+"""
+
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Optional
+
+# Breakdown key that entries of systems / event types past max_keys count under
+OTHER_KEY = "other"
+
+
+class _Counts:
+    __slots__ = ("total", "compliant", "dhi_sum")
+
+    def __init__(self):
+        self.total = 0
+        self.compliant = 0
+        self.dhi_sum = 0.0
+
+    def add(self, compliant: bool, dhi_score: float, sign: int = 1):
+        self.total += sign
+        self.compliant += sign if compliant else 0
+        self.dhi_sum += sign * dhi_score
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total_logs": self.total,
+            "compliant_logs": self.compliant,
+            "compliance_rate": (self.compliant / self.total * 100) if self.total > 0 else 0,
+            "average_dhi_score": self.dhi_sum / self.total if self.total > 0 else 0
+        }
+
+
+class _Window:
+    """Counts for the last ``seconds`` seconds, in one-second buckets.
+
+    Each append lands in the newest bucket and buckets that fall out of the
+    window are subtracted from the running totals, so the work per entry is
+    constant however long the window is.
+    """
+
+    def __init__(self, seconds: int):
+        self.seconds = seconds
+        self.counts = _Counts()
+        self.buckets: Deque[List[Any]] = deque()
+
+    def expire(self, now: float):
+        cutoff = int(now) - self.seconds
+        while self.buckets and self.buckets[0][0] <= cutoff:
+            _, bucket = self.buckets.popleft()
+            self.counts.total -= bucket.total
+            self.counts.compliant -= bucket.compliant
+            self.counts.dhi_sum -= bucket.dhi_sum
+
+    def add(self, now: float, compliant: bool, dhi_score: float):
+        second = int(now)
+        if not self.buckets or self.buckets[-1][0] != second:
+            self.buckets.append([second, _Counts()])
+        self.buckets[-1][1].add(compliant, dhi_score)
+        self.counts.add(compliant, dhi_score)
+        self.expire(now)
+
+
+class LogAggregates:
+    """Running compliance and DHI totals over every entry logged.
+
+    ``add`` is O(1); ``summary`` reads the totals without touching the
+    entries, so it costs the same at ten logs or ten million. Breakdowns
+    keep at most ``max_keys`` systems and event types each; entries of any
+    further ones are counted under ``OTHER_KEY``.
+    """
+
+    def __init__(self, windows: Iterable[int] = (60, 300, 3600), max_keys: int = 1000, clock=time.time):
+        self.clock = clock
+        self.max_keys = max_keys
+        self.totals = _Counts()
+        self.by_system: Dict[str, _Counts] = {}
+        self.by_event_type: Dict[str, _Counts] = {}
+        self.windows = [_Window(int(seconds)) for seconds in sorted(set(windows))]
+
+    def add(self, log_entry: Dict[str, Any]):
+        compliant = bool(log_entry.get("compliance_flag", False))
+        dhi_score = float(log_entry.get("dhi_score") or 0.0)
+        self.totals.add(compliant, dhi_score)
+
+        self._counts_for(self.by_system, log_entry.get("system")).add(compliant, dhi_score)
+        self._counts_for(self.by_event_type, log_entry.get("event_type")).add(compliant, dhi_score)
+
+        now = self.clock()
+        for window in self.windows:
+            window.add(now, compliant, dhi_score)
+
+    def _counts_for(self, breakdown: Dict[str, _Counts], key: Any) -> _Counts:
+        if key not in breakdown:
+            if len(breakdown) >= self.max_keys:
+                key = OTHER_KEY
+            if key not in breakdown:
+                breakdown[key] = _Counts()
+        return breakdown[key]
+
+    def summary(self, system: Optional[str] = None, event_type: Optional[str] = None) -> Dict[str, Any]:
+        """Overall totals, or those of one system or event type"""
+        if system is not None:
+            return self.by_system.get(system, _Counts()).to_dict()
+        if event_type is not None:
+            return self.by_event_type.get(event_type, _Counts()).to_dict()
+        return self.totals.to_dict()
+
+    def window_summaries(self) -> Dict[str, Dict[str, Any]]:
+        now = self.clock()
+        for window in self.windows:
+            window.expire(now)
+        return {f"{window.seconds}s": window.counts.to_dict() for window in self.windows}
+
+    def breakdowns(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        return {
+            "by_system": {str(key): counts.to_dict() for key, counts in self.by_system.items()},
+            "by_event_type": {str(key): counts.to_dict() for key, counts in self.by_event_type.items()}
+        }
@@ -5,14 +5,40 @@ Handles structured logging across all modules with DHI scoring and compliance tr
 
 import json
 import uuid
+from collections import deque
 from datetime import datetime
+from itertools import islice
 from typing import Dict, Any, Optional
-import requests
 from config.settings import settings
+from event_broker.http_pool import AsyncHTTPPool
+from unified_logging.aggregates import LogAggregates
+from unified_logging.sink import BatchingLogSink, create_log_sink
+
+# Shared by every UnifiedLogger in the process
+http_pool = AsyncHTTPPool(
+    max_connections=settings.get("http_pool_max_connections", 100),
+    per_host_limit=settings.get("http_pool_per_host", 10),
+    timeout=settings.get("http_timeout_seconds", 5.0)
+)
+log_sink = create_log_sink(settings, http_pool)
 
 class UnifiedLogger:
-    def __init__(self):
-        self.log_store = []
+    def __init__(self, sink: Optional[BatchingLogSink] = None):
+        # Recent entries for get_logs; shipping to the DB and BHIV Core is
+        # batched in the background by the sink
+        self.log_store = deque(maxlen=settings.get("log_store_max", 10000))
+        # The same recent entries indexed by system and by event type. An
+        # entry leaves its index buckets when log_store evicts it, so the
+        # indexes never hold more than log_store does; past max_index_keys
+        # distinct values new keys are left unindexed and get_logs scans for them
+        self._by_system: Dict[str, deque] = {}
+        self._by_event_type: Dict[str, deque] = {}
+        self.max_index_keys = settings.get("log_index_max_keys", 1000)
+        self._indexes = {"system": self._by_system, "event_type": self._by_event_type}
+        self._unindexed = {"system": 0, "event_type": 0}
+        self.aggregates = LogAggregates(settings.get("log_summary_windows", [60, 300, 3600]),
+                                        max_keys=self.max_index_keys)
+        self.sink = sink or log_sink
         self.db_url = settings.get("database_url", "sqlite:///./bhiv_integrator.db")
 
     async def log_event(self, event_data: Dict[str, Any]) -> str:
@@ -35,14 +61,9 @@ class UnifiedLogger:
             }
         }
 
-        # Store locally
-        self.log_store.append(log_entry)
-
-        # Sync to central DB
-        await self._sync_to_database(log_entry)
-
-        # Send to BHIV Core if configured
-        await self._send_to_bhiv_core(log_entry)
+        # Store locally, then queue for the central DB and BHIV Core
+        self._store(log_entry)
+        await self.sink.submit(log_entry)
 
         print(f"📝 Logged event: {log_entry['event_type']} (ID: {log_entry['log_id']})")
         return log_entry["log_id"]
@@ -67,10 +88,9 @@ class UnifiedLogger:
             }
         }
 
-        # Store and sync
-        self.log_store.append(log_entry)
-        await self._sync_to_database(log_entry)
-        await self._send_to_bhiv_core(log_entry)
+        # Store and queue for sync
+        self._store(log_entry)
+        await self.sink.submit(log_entry)
 
         print(f"💰 Logged transaction: {transaction_data.get('type')} (ID: {log_entry['log_id']})")
         return log_entry["log_id"]
@@ -98,9 +118,9 @@ class UnifiedLogger:
             }
         }
 
-        # Store and sync
-        self.log_store.append(log_entry)
-        await self._sync_to_database(log_entry)
+        # Store and queue for the central DB only
+        self._store(log_entry)
+        await self.sink.submit(log_entry, forward=False)
 
         print(f"🔗 Logged API call: {api_data.get('method')} {api_data.get('endpoint')} (Status: {api_data.get('status_code')})")
         return log_entry["log_id"]
@@ -142,10 +162,9 @@ class UnifiedLogger:
                 "system": transaction.get("system")
             }
 
-            response = requests.post(
+            response = await http_pool.post(
                 f"{settings['sankalp_compliance_url']}/check",
-                json=compliance_payload,
-                timeout=5
+                json=compliance_payload
             )
 
             if response.status_code == 200:
@@ -184,122 +203,74 @@ class UnifiedLogger:
 
         return min(1.0, max(0.0, score))
 
-    async def _sync_to_database(self, log_entry: Dict[str, Any]):
-        """Sync log entry to central database"""
-        try:
-            db_url = self.db_url.lower()
-
-            if "sqlite" in db_url or "postgresql" in db_url or "mysql" in db_url:
-                # SQL Database sync
-                await self._sync_to_sql_db(log_entry)
-            elif "mongodb" in db_url or "mongo" in db_url:
-                # MongoDB sync
-                await self._sync_to_mongo_db(log_entry)
+    def _store(self, log_entry: Dict[str, Any]):
+        """Keep the entry for get_logs and fold it into the running aggregates"""
+        if len(self.log_store) == self.log_store.maxlen:
+            self._unindex(self.log_store[0])
+        self.log_store.append(log_entry)
+        for field, index in self._indexes.items():
+            key = log_entry.get(field)
+            if key not in index:
+                # A new key only gets a bucket while nothing stored is
+                # unindexed, so every bucket holds all stored entries of its key
+                if len(index) >= self.max_index_keys or self._unindexed[field]:
+                    self._unindexed[field] += 1
+                    continue
+                index[key] = deque()
+            index[key].append(log_entry)
+        self.aggregates.add(log_entry)
+
+    def _unindex(self, log_entry: Dict[str, Any]):
+        """Drop the oldest stored entry from the indexes as log_store evicts it"""
+        for field, index in self._indexes.items():
+            key = log_entry.get(field)
+            bucket = index.get(key)
+            if bucket and bucket[0] is log_entry:
+                bucket.popleft()
+                if not bucket:
+                    del index[key]
             else:
-                # Default to activity_log table via REST API
-                await self._sync_via_api(log_entry)
-
-            print(f"💾 Synced log {log_entry['log_id']} to database")
+                self._unindexed[field] -= 1
 
-        except Exception as e:
-            print(f"❌ Database sync failed: {str(e)}")
+    async def flush(self):
+        """Ship every buffered log entry now"""
+        await self.sink.flush()
 
-    async def _sync_to_sql_db(self, log_entry: Dict[str, Any]):
-        """Sync to SQL database (activity_log table)"""
-        try:
-            # Use requests to call a database service endpoint
-            # In production, this would use SQLAlchemy or similar
-            db_payload = {
-                "table": "activity_log",
-                "operation": "insert",
-                "data": log_entry
-            }
-
-            # Assuming there's a database service running
-            db_service_url = settings.get("database_service_url", "http://localhost:8008")
-            response = requests.post(f"{db_service_url}/db/insert", json=db_payload, timeout=5)
-
-            if response.status_code != 200:
-                print(f"⚠️ SQL DB sync failed: {response.status_code}")
-
-        except Exception as e:
-            print(f"❌ SQL DB sync error: {str(e)}")
-
-    async def _sync_to_mongo_db(self, log_entry: Dict[str, Any]):
-        """Sync to MongoDB collection"""
-        try:
-            mongo_payload = {
-                "collection": "activity_logs",
-                "operation": "insert",
-                "data": log_entry
-            }
-
-            # Assuming there's a MongoDB service running
-            mongo_service_url = settings.get("mongodb_service_url", "http://localhost:8009")
-            response = requests.post(f"{mongo_service_url}/mongo/insert", json=mongo_payload, timeout=5)
-
-            if response.status_code != 200:
-                print(f"⚠️ MongoDB sync failed: {response.status_code}")
-
-        except Exception as e:
-            print(f"❌ MongoDB sync error: {str(e)}")
-
-    async def _sync_via_api(self, log_entry: Dict[str, Any]):
-        """Sync via REST API to central logging service"""
-        try:
-            api_url = settings.get("central_log_api_url", "http://localhost:8010/logs")
-            response = requests.post(api_url, json=log_entry, timeout=5)
-
-            if response.status_code not in [200, 201]:
-                print(f"⚠️ API sync failed: {response.status_code}")
-
-        except Exception as e:
-            print(f"❌ API sync error: {str(e)}")
-
-    async def _send_to_bhiv_core(self, log_entry: Dict[str, Any]):
-        """Send log entry to BHIV Core for analysis"""
-        try:
-            payload = {
-                "log_entry": log_entry,
-                "source": "bhiv_integrator",
-                "api_key": settings.get("bhiv_core_api_key")
-            }
-
-            response = requests.post(
-                f"{settings['bhiv_core_url']}/logs/ingest",
-                json=payload,
-                timeout=5
-            )
-
-            if response.status_code == 200:
-                print(f"📤 Sent log to BHIV Core: {log_entry['log_id']}")
-            else:
-                print(f"⚠️ Failed to send log to BHIV Core: {response.status_code}")
-
-        except Exception as e:
-            print(f"❌ BHIV Core sync failed: {str(e)}")
+    def get_sink_stats(self) -> Dict[str, Any]:
+        return self.sink.get_stats()
 
     def get_logs(self, system: str = None, event_type: str = None, limit: int = 100) -> list:
-        """Get logs with optional filtering"""
-        logs = self.log_store[-limit:]  # Get most recent logs
-
+        """Get the most recent logs, optionally filtered by system and/or event type"""
+        filters = {}
         if system:
-            logs = [log for log in logs if log.get("system") == system]
+            logs = self._lookup("system", system)
+            if logs is None:
+                logs, filters["system"] = self.log_store, system
+            if event_type:
+                filters["event_type"] = event_type
+        elif event_type:
+            logs = self._lookup("event_type", event_type)
+            if logs is None:
+                logs, filters["event_type"] = self.log_store, event_type
+        else:
+            logs = self.log_store
 
-        if event_type:
-            logs = [log for log in logs if log.get("event_type") == event_type]
+        recent = reversed(logs)
+        if filters:
+            recent = (log for log in recent if all(log.get(field) == value for field, value in filters.items()))
+        return list(islice(recent, limit))[::-1]
 
-        return logs
+    def _lookup(self, field: str, key: str) -> Optional[deque]:
+        """The key's bucket, or None when its entries may be stored unindexed"""
+        index = self._indexes[field]
+        if key in index:
+            return index[key]
+        return None if self._unindexed[field] else deque()
 
     def get_compliance_summary(self) -> Dict[str, Any]:
-        """Get compliance summary"""
-        logs = self.log_store
-        total_logs = len(logs)
-        compliant_logs = len([log for log in logs if log.get("compliance_flag", False)])
-
+        """Get compliance summary over every entry logged, with breakdowns and sliding windows"""
         return {
-            "total_logs": total_logs,
-            "compliant_logs": compliant_logs,
-            "compliance_rate": (compliant_logs / total_logs * 100) if total_logs > 0 else 0,
-            "average_dhi_score": sum(log.get("dhi_score", 0) for log in logs) / total_logs if total_logs > 0 else 0
-        }
\ No newline at end of file
+            **self.aggregates.summary(),
+            **self.aggregates.breakdowns(),
+            "windows": self.aggregates.window_summaries()
+        }
@@ -0,0 +1,239 @@
+"""
+Batched Log Sink for BHIV Integrator Core
+Bounded in-memory buffer of log entries flushed in the background, by size or
+time, to gzip-compressed batch POSTs and/or local JSONL segment files.
+"""
+
+import asyncio
+import gzip
+import json
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from event_broker.http_pool import AsyncHTTPPool
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "block")
+
+
+class HTTPBatchExporter:
+    """POSTs a batch as one JSON document, gzip-compressed by default.
+
+    ``build_payload`` wraps the list of entries in whatever envelope the
+    receiving service expects. With ``forwarded_only`` the exporter only
+    gets entries submitted with ``forward=True``.
+    """
+
+    def __init__(self, name: str, url: str, build_payload: Callable[[List[Dict[str, Any]]], Any],
+                 http: AsyncHTTPPool, compress: bool = True, forwarded_only: bool = False):
+        self.name = name
+        self.url = url
+        self.build_payload = build_payload
+        self.http = http
+        self.compress = compress
+        self.forwarded_only = forwarded_only
+
+    async def export(self, entries: List[Dict[str, Any]]):
+        body = json.dumps(self.build_payload(entries), separators=(",", ":"), default=str).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if self.compress:
+            body = gzip.compress(body, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+        response = await self.http.post(self.url, content=body, headers=headers)
+        if response.status_code >= 300:
+            raise RuntimeError(f"{self.name} answered HTTP {response.status_code}")
+
+
+class JSONLSegmentExporter:
+    """Appends entries to ``logs-<first write time>.jsonl`` files in ``directory``.
+
+    A new segment starts once the current one reaches ``segment_bytes``.
+    Writes run in a worker thread so the event loop never waits on disk.
+    """
+
+    name = "jsonl"
+    forwarded_only = False
+
+    def __init__(self, directory: str, segment_bytes: int = 64 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.segment_bytes = segment_bytes
+        self.path: Optional[Path] = None
+
+    def _write(self, entries: List[Dict[str, Any]]):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if self.path is None or not self.path.exists() or self.path.stat().st_size >= self.segment_bytes:
+            self.path = self.directory / f"logs-{time.time_ns()}.jsonl"
+        data = "".join(json.dumps(entry, separators=(",", ":"), default=str) + "\n" for entry in entries)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(data)
+
+    async def export(self, entries: List[Dict[str, Any]]):
+        await asyncio.to_thread(self._write, entries)
+
+
+class BatchingLogSink:
+    """Takes log entries on the hot path and ships them in batches.
+
+    ``submit`` only appends to a buffer of at most ``capacity`` entries; a
+    background task flushes when ``batch_size`` entries are waiting or
+    ``flush_interval`` seconds after the first one arrived. When the buffer
+    is full ``overflow`` decides: ``drop_oldest`` overwrites the oldest
+    entry (ring buffer), ``drop_newest`` discards the new one, and
+    ``block`` makes ``submit`` wait for the next flush. Export failures are
+    counted and the batch is dropped; logging never fails the caller.
+
+    ``exported`` counts entries every exporter they went to accepted,
+    ``failed`` those at least one exporter lost, and ``dropped`` those
+    discarded on overflow before any export; ``exporters`` breaks the
+    first two down per exporter.
+    """
+
+    def __init__(self, exporters: List[Any], capacity: int = 10000, batch_size: int = 500,
+                 flush_interval: float = 1.0, overflow: str = "drop_oldest"):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.exporters = exporters
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.buffer: Deque[Tuple[Dict[str, Any], bool]] = deque()
+        self.stats = {"submitted": 0, "exported": 0, "failed": 0, "dropped": 0, "batches": 0, "export_errors": 0}
+        self.exporter_stats = {exporter.name: {"exported": 0, "failed": 0} for exporter in exporters}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._room: Optional[asyncio.Event] = None
+        self._closing = False
+
+    def _ensure_flusher(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._wakeup = asyncio.Event()
+            self._room = asyncio.Event()
+            self._flusher = None
+        if not self._closing and (self._flusher is None or self._flusher.done()):
+            self._flusher = loop.create_task(self._run())
+
+    async def submit(self, entry: Dict[str, Any], forward: bool = True):
+        """Buffer an entry; ``forward=False`` keeps it from forwarded-only exporters"""
+        self._ensure_flusher()
+        self.stats["submitted"] += 1
+        if len(self.buffer) >= self.capacity:
+            if self.overflow == "drop_newest":
+                self.stats["dropped"] += 1
+                return
+            if self.overflow == "drop_oldest":
+                self.buffer.popleft()
+                self.stats["dropped"] += 1
+            else:
+                while len(self.buffer) >= self.capacity:
+                    self._room.clear()
+                    self._wakeup.set()
+                    await self._room.wait()
+        self.buffer.append((entry, forward))
+        if len(self.buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    async def _run(self):
+        while not self._closing:
+            if len(self.buffer) < self.batch_size:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            await self.flush()
+
+    async def flush(self):
+        """Export everything buffered right now, in batches of ``batch_size``"""
+        while self.buffer:
+            count = min(self.batch_size, len(self.buffer))
+            batch = [self.buffer.popleft() for _ in range(count)]
+            if self._room is not None:
+                self._room.set()
+            await self._export(batch)
+
+    async def _export(self, batch: List[Tuple[Dict[str, Any], bool]]):
+        targets = []
+        for exporter in self.exporters:
+            picked = [i for i, (_, forward) in enumerate(batch) if forward or not exporter.forwarded_only]
+            if picked:
+                targets.append((exporter, picked))
+        results = await asyncio.gather(*(exporter.export([batch[i][0] for i in picked])
+                                         for exporter, picked in targets), return_exceptions=True)
+
+        delivered, lost = set(), set()
+        for (exporter, picked), result in zip(targets, results):
+            counts = self.exporter_stats[exporter.name]
+            if isinstance(result, Exception):
+                counts["failed"] += len(picked)
+                lost.update(picked)
+                self.stats["export_errors"] += 1
+                print(f"❌ Log batch export to {exporter.name} failed: {str(result)}")
+            else:
+                counts["exported"] += len(picked)
+                delivered.update(picked)
+        self.stats["batches"] += 1
+        self.stats["exported"] += len(delivered - lost)
+        self.stats["failed"] += len(lost)
+
+    async def close(self):
+        """Stop the background flusher, letting its current batch finish, and flush what is left"""
+        self._closing = True
+        if self._flusher is not None and self._loop is asyncio.get_running_loop():
+            self._wakeup.set()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+        self._flusher = None
+        await self.flush()
+        self._closing = False
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "buffered": len(self.buffer), "capacity": self.capacity,
+                "overflow": self.overflow,
+                "exporters": {name: dict(counts) for name, counts in self.exporter_stats.items()}}
+
+
+def _database_exporter(settings: Dict[str, Any], http: AsyncHTTPPool, compress: bool) -> HTTPBatchExporter:
+    """Batch exporter for the store ``database_url`` points at"""
+    db_url = settings.get("database_url", "").lower()
+    if "sqlite" in db_url or "postgresql" in db_url or "mysql" in db_url:
+        url = f"{settings.get('database_service_url', 'http://localhost:8008')}/db/insert"
+        build = lambda entries: {"table": "activity_log", "operation": "insert_many", "data": entries}
+    elif "mongo" in db_url:
+        url = f"{settings.get('mongodb_service_url', 'http://localhost:8009')}/mongo/insert"
+        build = lambda entries: {"collection": "activity_logs", "operation": "insert_many", "data": entries}
+    else:
+        url = settings.get("central_log_api_url", "http://localhost:8010/logs")
+        build = lambda entries: entries
+    return HTTPBatchExporter("database", url, build, http, compress=compress)
+
+
+def create_log_sink(settings: Dict[str, Any], http: AsyncHTTPPool) -> BatchingLogSink:
+    """Build the sink selected by ``settings["log_sink"]``"""
+    kind = settings.get("log_sink", "http").lower()
+    if kind not in ("http", "jsonl", "both", "none"):
+        raise ValueError(f"Unknown log sink: {kind}")
+    compress = settings.get("log_gzip", True)
+
+    exporters: List[Any] = []
+    if kind in ("http", "both"):
+        exporters.append(_database_exporter(settings, http, compress))
+        exporters.append(HTTPBatchExporter(
+            "bhiv_core", f"{settings['bhiv_core_url']}/logs/ingest",
+            lambda entries: {"log_entries": entries, "source": "bhiv_integrator",
+                             "api_key": settings.get("bhiv_core_api_key")},
+            http, compress=compress, forwarded_only=True
+        ))
+    if kind in ("jsonl", "both"):
+        exporters.append(JSONLSegmentExporter(settings.get("log_sink_dir", "./data/logs")))
+
+    return BatchingLogSink(
+        exporters,
+        capacity=settings.get("log_buffer_size", 10000),
+        batch_size=settings.get("log_batch_size", 500),
+        flush_interval=settings.get("log_flush_interval_ms", 1000) / 1000,
+        overflow=settings.get("log_overflow_policy", "drop_oldest")
+    )
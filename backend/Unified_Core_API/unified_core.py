@@ -165,6 +165,7 @@ async def startup():
 @app.on_event("shutdown")
 async def shutdown():
     await event_broker.stop()
+    await unified_logger.sink.close()
     print("🛑 Unified Core API Shutdown Complete")
 
 if __name__ == "__main__":
@@ -7,7 +7,7 @@ from database.models import init_database
 from database.crm_service import CRMService
 from database.models import create_tables as create_crm_tables
 from integrations.llm_query_system import LLMQuerySystem
-from integrations.google_maps_integration import GoogleMapsIntegration, VisitTracker
+from integrations.google_maps_integration import GoogleMapsIntegration, VisitTracker, LocationAnalytics
 from integrations.office365_integration import Office365Integration
 import agent_db
 from datetime import datetime, timedelta
@@ -20,6 +20,7 @@ from pydantic import BaseModel
 import json
 import requests
 import os
+import threading
 
 # === INFIVERSE MODELS ===
 
@@ -210,8 +211,24 @@ async def add_security_headers(request, call_next):
 llm_query_system = LLMQuerySystem()
 google_maps = GoogleMapsIntegration()
 visit_tracker = VisitTracker(google_maps)
+location_analytics = LocationAnalytics(google_maps)
 office365 = Office365Integration()
 
+# Set once the startup build of the account proximity index has run, whether
+# or not it found any accounts to index
+account_index_built = threading.Event()
+
+def build_account_index():
+    """Geocode every CRM account into the proximity index"""
+    try:
+        with CRMService() as crm_service:
+            indexed = location_analytics.index_accounts(crm_service.get_accounts(limit=100000))
+        print(f"Account proximity index built ({indexed} accounts)")
+    except Exception as e:
+        print(f"Account proximity index build failed: {e}")
+    finally:
+        account_index_built.set()
+
 # Initialize database on startup
 @app.on_event("startup")
 async def startup_event():
@@ -222,6 +239,7 @@ async def startup_event():
     print("Authentication system ready")
     print("LLM Query System ready")
     print("Google Maps integration ready")
+    threading.Thread(target=build_account_index, name="account-index-build", daemon=True).start()
     print("Office 365 integration ready")
 
 @app.get("/")
@@ -375,6 +393,20 @@ def get_low_stock():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/inventory/optimize")
+def optimize_inventory_parameters(dry_run: bool = True, service_level: float = 0.95,
+                                  current_user: User = Depends(require_permission("read:inventory"))):
+    """Retune reorder points and max stock from demand history (dry run by default)"""
+    if not dry_run and "write:inventory" not in current_user.permissions:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Permission required: write:inventory")
+    if not 0.5 <= service_level < 1.0:
+        raise HTTPException(status_code=400, detail="service_level must be between 0.5 and 1.0")
+    try:
+        from inventory_optimizer import InventoryOptimizer
+        return InventoryOptimizer(service_level=service_level).retune(dry_run=dry_run)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/agent/status")
 def get_agent_status():
     """Get agent status and metrics"""
@@ -571,6 +603,17 @@ def get_shipments(status: str = None):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/delivery/risk")
+def get_delivery_risk(min_score: float = 0.3, limit: int = 100, courier_id: str = None):
+    """Active shipments ranked by delay risk"""
+    if not 0.0 <= min_score <= 1.0:
+        raise HTTPException(status_code=400, detail="min_score must be between 0 and 1")
+    try:
+        from delivery_risk import DeliveryRiskScorer
+        return DeliveryRiskScorer().rank_at_risk(min_score=min_score, limit=limit, courier_id=courier_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/delivery/track/{tracking_number}")
 def track_shipment(tracking_number: str):
     """Track shipment by tracking number"""
@@ -941,7 +984,9 @@ def create_account(account: AccountCreate, current_user: User = Depends(require_
     """Create a new account"""
     try:
         with CRMService() as crm_service:
-            return crm_service.create_account(account.dict())
+            created = crm_service.create_account(account.dict())
+        location_analytics.index_accounts([created])
+        return created
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -972,6 +1017,22 @@ def get_accounts(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/accounts/nearby", response_model=dict)
+def get_nearby_accounts(
+    latitude: float = Query(..., ge=-90, le=90),
+    longitude: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(20, gt=0, le=500),
+    limit: int = Query(50, le=1000),
+    current_user: User = Depends(require_permission("read:accounts"))
+):
+    """Get accounts within a radius of a location, nearest first"""
+    try:
+        accounts = location_analytics.find_nearby_accounts(latitude, longitude, radius_km, limit)
+        return {"accounts": accounts, "count": len(accounts), "radius_km": radius_km,
+                "index_ready": account_index_built.is_set()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/accounts/{account_id}", response_model=dict)
 def get_account(account_id: str, current_user: User = Depends(require_permission("read:accounts"))):
     """Get account by ID with full details"""
@@ -994,6 +1055,7 @@ def update_account(account_id: str, update_data: dict, current_user: User = Depe
         with CRMService() as crm_service:
             account = crm_service.update_account(account_id, update_data)
             if account:
+                location_analytics.index_accounts([account])
                 return account
             else:
                 raise HTTPException(status_code=404, detail="Account not found")
@@ -1485,6 +1547,61 @@ def plan_visit(visit_data: dict, current_user: User = Depends(require_permission
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/integrations/google-maps/visit/{visit_id}/nearby-accounts", response_model=dict)
+def get_accounts_near_visit(
+    visit_id: str,
+    radius_km: float = Query(20, gt=0, le=500),
+    limit: int = Query(10, le=100),
+    current_user: User = Depends(require_permission("read:accounts"))
+):
+    """Suggest other accounts close to a planned visit"""
+    try:
+        visit = visit_tracker.get_visit_by_id(visit_id)
+        if not visit:
+            raise HTTPException(status_code=404, detail="Visit not found")
+
+        accounts = location_analytics.suggest_accounts_near_visit(visit, radius_km, limit)
+        return {"visit_id": visit_id, "accounts": accounts, "count": len(accounts),
+                "index_ready": account_index_built.is_set()}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/integrations/google-maps/territories/propose", response_model=dict)
+def propose_territories(proposal_data: dict, current_user: User = Depends(require_permission("read:accounts"))):
+    """Propose balanced territory assignments from account locations, revenue and visit load"""
+    try:
+        n_territories = int(proposal_data.get('n_territories', 0))
+        if n_territories < 1:
+            raise HTTPException(status_code=400, detail="n_territories must be at least 1")
+
+        filters = {}
+        if proposal_data.get('account_type'):
+            filters['account_type'] = proposal_data['account_type']
+
+        with CRMService() as crm_service:
+            accounts = crm_service.get_accounts(filters=filters, limit=100000)
+
+        proposal = location_analytics.propose_territories(
+            accounts,
+            n_territories,
+            visit_counts=visit_tracker.get_visit_counts(),
+            revenue_weight=float(proposal_data.get('revenue_weight', 0.5)),
+            visit_weight=float(proposal_data.get('visit_weight', 0.5))
+        )
+        if not proposal_data.get('include_assignments', False):
+            proposal.pop('assignments', None)
+        return proposal
+
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/integrations/bos/order", response_model=dict)
 def create_order_from_opportunity(order_data: dict, current_user: User = Depends(require_permission("write:orders"))):
     """Create order from opportunity (BOS integration)"""
@@ -1 +1,4 @@
 # Database package initialization
+
+# Registers the flush hook that keeps supplier scorecards current
+from . import supplier_scorecard  # noqa: F401
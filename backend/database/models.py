@@ -158,6 +158,44 @@ class Supplier(Base):
     def __repr__(self):
         return f"<Supplier(supplier_id='{self.supplier_id}', name='{self.name}')>"
 
+class SupplierScorecard(Base):
+    """Running supplier performance, updated as purchase orders are written"""
+    __tablename__ = 'supplier_scorecards'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    supplier_id = Column(String(50), unique=True, nullable=False, index=True)
+    total_orders = Column(Integer, default=0)
+    open_orders = Column(Integer, default=0)  # pending, sent, confirmed
+    delivered_orders = Column(Integer, default=0)  # received and accepted
+    on_time_deliveries = Column(Integer, default=0)  # of received orders
+    cancelled_orders = Column(Integer, default=0)
+    defective_orders = Column(Integer, default=0)  # received, then rejected or returned
+    total_value = Column(Float, default=0.0)
+    lead_time_mean = Column(Float, default=0.0)  # days, over received orders
+    lead_time_m2 = Column(Float, default=0.0)  # sum of squared deviations (Welford)
+    cost_index = Column(Float, default=1.0)  # mean unit cost relative to catalog cost
+    cost_samples = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @property
+    def received_orders(self):
+        return self.delivered_orders + self.defective_orders
+
+    @property
+    def on_time_rate(self):
+        return self.on_time_deliveries / self.received_orders if self.received_orders else None
+
+    @property
+    def lead_time_variance(self):
+        return self.lead_time_m2 / (self.received_orders - 1) if self.received_orders > 1 else 0.0
+
+    @property
+    def defect_rate(self):
+        return self.defective_orders / self.received_orders if self.received_orders else 0.0
+
+    def __repr__(self):
+        return f"<SupplierScorecard(supplier_id='{self.supplier_id}', orders={self.total_orders})>"
+
 class Shipment(Base):
     """Shipment model for delivery tracking"""
     __tablename__ = 'shipments'
@@ -764,7 +802,7 @@ def init_database():
                 name='TechParts Supply Co.',
                 contact_email='orders@techparts.com',
                 contact_phone='+1-555-0101',
-                api_endpoint='http://localhost:8001/api/supplier',
+                api_endpoint='http://localhost:8001/SUPPLIER_001/api',
                 lead_time_days=5,
                 minimum_order=10
             ),
@@ -773,7 +811,7 @@ def init_database():
                 name='Global Components Ltd.',
                 contact_email='procurement@globalcomp.com',
                 contact_phone='+1-555-0102',
-                api_endpoint='http://localhost:8002/api/supplier',
+                api_endpoint='http://localhost:8001/SUPPLIER_002/api',
                 lead_time_days=7,
                 minimum_order=5
             ),
@@ -782,7 +820,7 @@ def init_database():
                 name='FastTrack Logistics',
                 contact_email='orders@fasttrack.com',
                 contact_phone='+1-555-0103',
-                api_endpoint='http://localhost:8003/api/supplier',
+                api_endpoint='http://localhost:8001/SUPPLIER_003/api',
                 lead_time_days=3,
                 minimum_order=20
             )
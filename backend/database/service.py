@@ -391,6 +391,7 @@ class DatabaseService:
                 'contact_phone': supplier.contact_phone,
                 'lead_time_days': supplier.lead_time_days,
                 'minimum_order': supplier.minimum_order,
+                'api_endpoint': supplier.api_endpoint,
                 'is_active': supplier.is_active
             }
             for supplier in suppliers
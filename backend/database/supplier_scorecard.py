@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Supplier Scorecards
+Keeps one ``SupplierScorecard`` row per supplier up to date as purchase orders
+are created, changed and deleted through the ORM, so supplier selection and
+performance reports read a single row instead of scanning every purchase order.
+"""
+
+import weakref
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.base import NO_VALUE
+
+from .models import SessionLocal, PurchaseOrder, Supplier, Inventory, SupplierScorecard
+
+OPEN_STATUSES = ("pending", "sent", "confirmed")
+# Goods that arrived and were rejected on inspection or sent back
+DEFECT_STATUSES = ("rejected", "returned")
+RECEIVED_STATUSES = ("delivered",) + DEFECT_STATUSES
+
+# Purchase order columns a scorecard is derived from
+TRACKED_FIELDS = ("supplier_id", "product_id", "status", "total_cost", "unit_cost",
+                  "created_at", "sent_at", "expected_delivery", "delivered_at")
+
+DEFAULT_LEAD_TIME_DAYS = 7
+
+# Engines already known to have the scorecard table
+_ready_engines = weakref.WeakSet()
+
+
+def _ensure_table(session: Session):
+    """Create the scorecard table on databases that predate it"""
+    engine = session.get_bind()
+    if engine not in _ready_engines:
+        SupplierScorecard.__table__.create(bind=session.connection(), checkfirst=True)
+        _ready_engines.add(engine)
+
+
+class _FlushContext:
+    """Scorecards, supplier lead times and catalog costs looked up once per flush"""
+
+    def __init__(self, session: Session):
+        self.session = session
+        self.scorecards: Dict[str, SupplierScorecard] = {}
+        self.lead_times: Dict[str, int] = {}
+        self.costs: Dict[str, Optional[float]] = {}
+
+    def scorecard(self, supplier_id: str) -> SupplierScorecard:
+        card = self.scorecards.get(supplier_id)
+        if card is None:
+            card = self.session.query(SupplierScorecard).filter(
+                SupplierScorecard.supplier_id == supplier_id).first()
+            if card is None:
+                card = SupplierScorecard(
+                    supplier_id=supplier_id, total_orders=0, open_orders=0, delivered_orders=0,
+                    on_time_deliveries=0, cancelled_orders=0, defective_orders=0, total_value=0.0,
+                    lead_time_mean=0.0, lead_time_m2=0.0, cost_index=1.0, cost_samples=0
+                )
+                self.session.add(card)
+            self.scorecards[supplier_id] = card
+        return card
+
+    def lead_time_days(self, supplier_id: str) -> int:
+        if supplier_id not in self.lead_times:
+            row = self.session.query(Supplier.lead_time_days).filter(
+                Supplier.supplier_id == supplier_id).first()
+            self.lead_times[supplier_id] = (row[0] if row else None) or DEFAULT_LEAD_TIME_DAYS
+        return self.lead_times[supplier_id]
+
+    def catalog_cost(self, product_id: str) -> Optional[float]:
+        if product_id not in self.costs:
+            row = self.session.query(Inventory.unit_cost).filter(
+                Inventory.product_id == product_id).first()
+            self.costs[product_id] = row[0] if row and row[0] else None
+        return self.costs[product_id]
+
+
+def _lead_time(order: Dict, ctx: _FlushContext) -> Tuple[float, bool]:
+    """Days from placement to receipt, and whether that beat the expected date"""
+    placed = order["sent_at"] or order["created_at"] or order["delivered_at"]
+    # Orders received before receipts were stamped count as arriving when expected
+    delivered_at = order["delivered_at"] or order["expected_delivery"] or placed
+    expected = order["expected_delivery"] or placed + timedelta(days=ctx.lead_time_days(order["supplier_id"]))
+    return (delivered_at - placed).total_seconds() / 86400, delivered_at <= expected
+
+
+def apply_order(card: SupplierScorecard, order: Dict, ctx: _FlushContext, sign: int = 1):
+    """Add (``sign=1``) or remove (``sign=-1``) one purchase order's share of a scorecard.
+
+    ``order`` maps ``TRACKED_FIELDS`` to the order's values. A change is the
+    old values removed and the new ones added, so every counter always
+    matches the orders as stored. Delivered and defective (rejected or
+    returned) orders are counted apart; lead time and punctuality cover
+    both, since the goods arrived either way.
+    """
+    status = order["status"]
+    card.total_orders += sign
+    card.total_value += sign * (order["total_cost"] or 0.0)
+    reference = ctx.catalog_cost(order["product_id"])
+    if reference and order["unit_cost"]:
+        ratio = order["unit_cost"] / reference
+        card.cost_samples += sign
+        if card.cost_samples > 0:
+            card.cost_index += sign * (ratio - card.cost_index) / card.cost_samples
+        else:
+            card.cost_index = 1.0
+
+    card.open_orders += sign * (status in OPEN_STATUSES)
+    card.cancelled_orders += sign * (status == "cancelled")
+    if status not in RECEIVED_STATUSES:
+        return
+
+    lead_time, on_time = _lead_time(order, ctx)
+    received = card.delivered_orders + card.defective_orders
+    if status == "delivered":
+        card.delivered_orders += sign
+    else:
+        card.defective_orders += sign
+    card.on_time_deliveries += sign * on_time
+
+    # Welford's update, run backwards to remove a sample
+    if sign > 0:
+        received += 1
+        delta = lead_time - card.lead_time_mean
+        card.lead_time_mean += delta / received
+        card.lead_time_m2 += delta * (lead_time - card.lead_time_mean)
+    elif received <= 1:
+        card.lead_time_mean, card.lead_time_m2 = 0.0, 0.0
+    else:
+        previous_mean = card.lead_time_mean
+        card.lead_time_mean = (previous_mean * received - lead_time) / (received - 1)
+        card.lead_time_m2 = max(0.0, card.lead_time_m2 - (lead_time - card.lead_time_mean) * (lead_time - previous_mean))
+
+
+def _order_values(po: PurchaseOrder, committed: bool = False) -> Dict:
+    """The order's tracked values, or those last flushed to the database"""
+    state = inspect(po)
+    values = {}
+    for name in TRACKED_FIELDS:
+        value = getattr(po, name)
+        if committed and name in state.committed_state:
+            value = state.committed_state[name]
+            if value is NO_VALUE:
+                value = None
+        values[name] = value
+    return values
+
+
+def _load_previous_value(target, value, oldvalue, initiator):
+    # active_history loads the old value of expired orders before it is
+    # overwritten, so the flush hook below can always remove it
+    return value
+
+
+for _name in TRACKED_FIELDS:
+    event.listen(getattr(PurchaseOrder, _name), "set", _load_previous_value, active_history=True)
+
+
+def _default_status() -> Optional[str]:
+    default = PurchaseOrder.__table__.c.status.default
+    return default.arg if default is not None and default.is_scalar else None
+
+
+@event.listens_for(Session, "before_flush")
+def _update_scorecards(session: Session, flush_context, instances):
+    changes = []  # (order as stored or None, order as it will be stored or None)
+    for po in session.new:
+        if isinstance(po, PurchaseOrder):
+            # Column defaults are only applied on INSERT; resolve them now so
+            # the new order is counted as it will be stored
+            if po.status is None:
+                po.status = _default_status()
+            if po.created_at is None:
+                po.created_at = datetime.utcnow()
+            changes.append((None, po))
+    for po in session.dirty:
+        if isinstance(po, PurchaseOrder) and session.is_modified(po):
+            changes.append((po, po))
+    for po in session.deleted:
+        if isinstance(po, PurchaseOrder):
+            changes.append((po, None))
+    if not changes:
+        return
+
+    _ensure_table(session)
+    ctx = _FlushContext(session)
+    with session.no_autoflush:
+        for old_po, new_po in changes:
+            if new_po is not None and new_po.status in RECEIVED_STATUSES and new_po.delivered_at is None \
+                    and (old_po is None or inspect(new_po).attrs.status.history.has_changes()):
+                # Stamp the receipt so removing it later subtracts the same lead time
+                new_po.delivered_at = datetime.utcnow()
+            old = _order_values(old_po, committed=True) if old_po is not None else None
+            new = _order_values(new_po) if new_po is not None else None
+            if old == new:
+                continue
+            if old is not None:
+                apply_order(ctx.scorecard(old["supplier_id"]), old, ctx, sign=-1)
+            if new is not None:
+                apply_order(ctx.scorecard(new["supplier_id"]), new, ctx)
+
+
+def scorecard_to_dict(card: SupplierScorecard) -> Dict:
+    on_time_rate = card.on_time_rate
+    return {
+        "supplier_id": card.supplier_id,
+        "total_orders": card.total_orders,
+        "open_orders": card.open_orders,
+        "delivered_orders": card.delivered_orders,
+        "defective_orders": card.defective_orders,
+        "received_orders": card.received_orders,
+        "cancelled_orders": card.cancelled_orders,
+        "total_value": round(card.total_value, 2),
+        "on_time_rate": round(on_time_rate, 4) if on_time_rate is not None else None,
+        "lead_time_mean_days": round(card.lead_time_mean, 2),
+        "lead_time_std_days": round(card.lead_time_variance ** 0.5, 2),
+        "cost_index": round(card.cost_index, 4),
+        "defect_rate": round(card.defect_rate, 4),
+        "updated_at": card.updated_at.isoformat() if card.updated_at else None
+    }
+
+
+def get_scorecards(supplier_ids: Optional[Iterable[str]] = None, db=None) -> Dict[str, Dict]:
+    """Scorecards keyed by supplier id, for the given suppliers or all of them"""
+    own_session = db is None
+    db = db or SessionLocal()
+    try:
+        _ensure_table(db)
+        query = db.query(SupplierScorecard)
+        if supplier_ids is not None:
+            query = query.filter(SupplierScorecard.supplier_id.in_(list(supplier_ids)))
+        return {card.supplier_id: scorecard_to_dict(card) for card in query.all()}
+    finally:
+        if own_session:
+            db.close()
+
+
+def rebuild_scorecards(db=None) -> List[Dict]:
+    """Recompute every scorecard from the purchase order table.
+
+    Used once to backfill existing history; afterwards the flush hook keeps
+    the rows current.
+    """
+    own_session = db is None
+    db = db or SessionLocal()
+    try:
+        _ensure_table(db)
+        db.query(SupplierScorecard).delete()
+        ctx = _FlushContext(db)
+        with db.no_autoflush:
+            for po in db.query(PurchaseOrder).order_by(PurchaseOrder.created_at, PurchaseOrder.id).all():
+                apply_order(ctx.scorecard(po.supplier_id), _order_values(po), ctx)
+        db.commit()
+        return [scorecard_to_dict(card) for card in ctx.scorecards.values()]
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        if own_session:
+            db.close()
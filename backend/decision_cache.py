@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Decision Cache for the Logistics Decision Engine
+Memoizes decisions for repeated contexts with per-type TTLs, LRU eviction
+and hit-rate metrics.
+"""
+
+import copy
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from typing import Dict, Any, Optional, Tuple
+
+# Seconds a decision stays valid; types missing here (or with 0) are never cached.
+# Procurement decisions are excluded by default because they send restock alerts.
+DEFAULT_DECISION_TTLS = {
+    "route_optimization": 60,
+    "delay_assessment": 120,
+    "supplier_selection": 300,
+    "inventory_forecast": 600,
+}
+
+# List fields whose order does not affect the decision, per decision type
+UNORDERED_FIELDS = {
+    "supplier_selection": ("suppliers",),
+}
+
+
+def _canonical(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def context_key(decision_type: str, context: Dict[str, Any]) -> str:
+    """Stable hash of a decision type and its context.
+
+    Dict key order never matters; list order only matters unless the field
+    is listed in ``UNORDERED_FIELDS`` for the type.
+    """
+    normalized = dict(context)
+    for field in UNORDERED_FIELDS.get(decision_type, ()):
+        if isinstance(normalized.get(field), list):
+            normalized[field] = sorted(normalized[field], key=_canonical)
+    digest = hashlib.sha256(_canonical(normalized).encode("utf-8")).hexdigest()
+    return f"{decision_type}:{digest}"
+
+
+class DecisionCache:
+    """LRU cache of decisions with a TTL per decision type.
+
+    Cached answers are returned as copies flagged ``cached: True``. Their
+    ``action_id`` is moved to ``source_action_id``, so a consumer recording
+    RL outcomes never credits the original action a second time.
+    """
+
+    def __init__(self, ttl_seconds: Optional[Dict[str, float]] = None, max_entries: int = 1024):
+        self.ttl_seconds = dict(DEFAULT_DECISION_TTLS if ttl_seconds is None else ttl_seconds)
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.stats = defaultdict(lambda: {"hits": 0, "misses": 0, "expired": 0})
+        self.evictions = 0
+
+    def is_cacheable(self, decision_type: str) -> bool:
+        return self.ttl_seconds.get(decision_type, 0) > 0
+
+    def get(self, decision_type: str, context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Cached decision for the context, or None on a miss"""
+        if not self.is_cacheable(decision_type):
+            return None
+
+        key = context_key(decision_type, context)
+        now = time.time()
+        with self._lock:
+            stats = self.stats[decision_type]
+            entry = self._entries.get(key)
+            if entry is None:
+                stats["misses"] += 1
+                return None
+
+            stored_at, expires_at, decision = entry
+            if expires_at <= now:
+                del self._entries[key]
+                stats["expired"] += 1
+                stats["misses"] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            stats["hits"] += 1
+
+        cached = copy.deepcopy(decision)
+        cached["source_action_id"] = cached.pop("action_id", None)
+        cached["action_id"] = None
+        cached["cached"] = True
+        cached["cache_age_seconds"] = round(now - stored_at, 3)
+        return cached
+
+    def put(self, decision_type: str, context: Dict[str, Any], decision: Dict[str, Any]):
+        """Store a freshly computed decision"""
+        if not self.is_cacheable(decision_type) or decision.get("decision") == "error":
+            return
+
+        key = context_key(decision_type, context)
+        now = time.time()
+        entry = (now, now + self.ttl_seconds[decision_type], copy.deepcopy(decision))
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, decision_type: Optional[str] = None):
+        """Drop cached decisions, all or for one type"""
+        with self._lock:
+            if decision_type is None:
+                self._entries.clear()
+                return
+            prefix = f"{decision_type}:"
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit-rate metrics overall and per decision type"""
+        with self._lock:
+            by_type = {}
+            for decision_type, counts in self.stats.items():
+                lookups = counts["hits"] + counts["misses"]
+                by_type[decision_type] = dict(counts, hit_rate=round(counts["hits"] / lookups, 4) if lookups else 0.0)
+            hits = sum(c["hits"] for c in self.stats.values())
+            lookups = hits + sum(c["misses"] for c in self.stats.values())
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": hits,
+                "misses": lookups - hits,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "by_type": by_type,
+                "timestamp": datetime.utcnow().isoformat()
+            }
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Persistent Geocoding Cache for Google Maps Integration
+"""
+
+import json
+import re
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+
+class GeocodingNotFound(Exception):
+    """Raised when a geocoder definitively has no result for a query"""
+
+
+# Statuses returned by the Maps API that mean "no answer exists" rather than
+# "try again later"; only these are negatively cached.
+NEGATIVE_STATUSES = {'ZERO_RESULTS', 'NOT_FOUND', 'INVALID_REQUEST'}
+
+_PUNCTUATION = re.compile(r'[^\w\s#/-]')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_address(address: str) -> str:
+    """Normalize a free-text address into a stable cache key"""
+    key = (address or '').lower()
+    key = _PUNCTUATION.sub(' ', key)
+    key = _WHITESPACE.sub(' ', key)
+    return key.strip()
+
+
+def coordinate_key(latitude: float, longitude: float, precision: int = 5) -> str:
+    """Cache key for reverse geocoding (5 decimals is roughly 1 metre)"""
+    return f"{round(float(latitude), precision)},{round(float(longitude), precision)}"
+
+
+class GeocodeCache:
+    """SQLite-backed cache for geocode, reverse geocode and place lookups"""
+
+    DEFAULT_TTL_SECONDS = 30 * 24 * 3600
+    DEFAULT_NEGATIVE_TTL_SECONDS = 24 * 3600
+    BULK_CHUNK_SIZE = 500  # stays under SQLite's bound-parameter limit
+
+    def __init__(self, db_path: str = 'database/geocode_cache.db',
+                 ttl_seconds: int = DEFAULT_TTL_SECONDS,
+                 negative_ttl_seconds: int = DEFAULT_NEGATIVE_TTL_SECONDS):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._init_database()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path)
+
+    def _init_database(self):
+        """Initialize the geocode cache table"""
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS geocode_cache (
+                    kind TEXT NOT NULL,
+                    cache_key TEXT NOT NULL,
+                    payload TEXT,
+                    negative INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    PRIMARY KEY (kind, cache_key)
+                )
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_geocode_cache_expires ON geocode_cache (expires_at)
+            ''')
+
+    def get(self, kind: str, key: str) -> Tuple[bool, Optional[Dict]]:
+        """Look up a single entry.
+
+        Returns ``(found, value)``. A negative entry is ``(True, None)``.
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT payload, negative FROM geocode_cache '
+                'WHERE kind = ? AND cache_key = ? AND expires_at > ?',
+                (kind, key, time.time())
+            ).fetchone()
+
+        if row is None:
+            self.misses += 1
+            return False, None
+
+        self.hits += 1
+        payload, negative = row
+        return True, None if negative else json.loads(payload)
+
+    def get_many(self, kind: str, keys: Iterable[str]) -> Dict[str, Optional[Dict]]:
+        """Look up many entries at once; missing keys are absent from the result"""
+        unique_keys = list(dict.fromkeys(keys))
+        found: Dict[str, Optional[Dict]] = {}
+        now = time.time()
+
+        with self._connect() as conn:
+            for start in range(0, len(unique_keys), self.BULK_CHUNK_SIZE):
+                chunk = unique_keys[start:start + self.BULK_CHUNK_SIZE]
+                placeholders = ','.join('?' * len(chunk))
+                rows = conn.execute(
+                    f'SELECT cache_key, payload, negative FROM geocode_cache '
+                    f'WHERE kind = ? AND expires_at > ? AND cache_key IN ({placeholders})',
+                    (kind, now, *chunk)
+                ).fetchall()
+                for cache_key, payload, negative in rows:
+                    found[cache_key] = None if negative else json.loads(payload)
+
+        self.hits += len(found)
+        self.misses += len(unique_keys) - len(found)
+        return found
+
+    def set(self, kind: str, key: str, value: Dict, ttl_seconds: Optional[int] = None):
+        """Store a positive result"""
+        self.set_many(kind, {key: value}, ttl_seconds)
+
+    def set_many(self, kind: str, values: Dict[str, Dict], ttl_seconds: Optional[int] = None):
+        """Store many positive results in one transaction"""
+        now = time.time()
+        expires_at = now + (ttl_seconds if ttl_seconds is not None else self.ttl_seconds)
+        with self._connect() as conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO geocode_cache '
+                '(kind, cache_key, payload, negative, created_at, expires_at) '
+                'VALUES (?, ?, ?, 0, ?, ?)',
+                [(kind, key, json.dumps(value), now, expires_at) for key, value in values.items()]
+            )
+
+    def set_negative(self, kind: str, key: str, ttl_seconds: Optional[int] = None):
+        """Remember that a lookup has no result so it is not retried immediately"""
+        now = time.time()
+        expires_at = now + (ttl_seconds if ttl_seconds is not None else self.negative_ttl_seconds)
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO geocode_cache '
+                '(kind, cache_key, payload, negative, created_at, expires_at) '
+                'VALUES (?, ?, NULL, 1, ?, ?)',
+                (kind, key, now, expires_at)
+            )
+
+    def invalidate(self, kind: str, key: str):
+        """Drop a single entry"""
+        with self._connect() as conn:
+            conn.execute('DELETE FROM geocode_cache WHERE kind = ? AND cache_key = ?', (kind, key))
+
+    def purge_expired(self) -> int:
+        """Delete expired entries and return how many were removed"""
+        with self._connect() as conn:
+            cursor = conn.execute('DELETE FROM geocode_cache WHERE expires_at <= ?', (time.time(),))
+            return cursor.rowcount
+
+    def get_stats(self) -> Dict:
+        """Cache size and hit-rate statistics"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT kind, negative, COUNT(*) FROM geocode_cache '
+                'WHERE expires_at > ? GROUP BY kind, negative',
+                (time.time(),)
+            ).fetchall()
+
+        entries: Dict[str, Dict[str, int]] = {}
+        for kind, negative, count in rows:
+            bucket = entries.setdefault(kind, {'positive': 0, 'negative': 0})
+            bucket['negative' if negative else 'positive'] = count
+
+        lookups = self.hits + self.misses
+        return {
+            'entries': entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+
+class OfflineGeocoder:
+    """In-memory geocoder stub for tests and offline environments.
+
+    Implements the same backend interface ``GoogleMapsIntegration`` expects
+    (``geocode``, ``reverse_geocode``, ``place_details``) without network access.
+    """
+
+    def __init__(self, locations: Optional[Dict[str, Tuple[float, float]]] = None,
+                 places: Optional[Dict[str, Dict]] = None):
+        self.locations: Dict[str, Tuple[float, float]] = {}
+        self.places: Dict[str, Dict] = dict(places or {})
+        self.calls = 0
+        for address, coordinates in (locations or {}).items():
+            self.add_location(address, *coordinates)
+
+    def add_location(self, address: str, latitude: float, longitude: float):
+        self.locations[normalize_address(address)] = (latitude, longitude)
+
+    def geocode(self, address: str) -> Dict:
+        self.calls += 1
+        key = normalize_address(address)
+        if key not in self.locations:
+            raise GeocodingNotFound("Geocoding failed: ZERO_RESULTS")
+
+        latitude, longitude = self.locations[key]
+        return {
+            'latitude': latitude,
+            'longitude': longitude,
+            'formatted_address': address,
+            'place_id': f"offline:{key}",
+            'address_components': []
+        }
+
+    def reverse_geocode(self, latitude: float, longitude: float) -> Dict:
+        self.calls += 1
+        if not self.locations:
+            raise GeocodingNotFound("Reverse geocoding failed: ZERO_RESULTS")
+
+        # Nearest known address by squared degree distance is plenty for a stub
+        key = min(
+            self.locations,
+            key=lambda k: (self.locations[k][0] - latitude) ** 2 + (self.locations[k][1] - longitude) ** 2
+        )
+        return {
+            'formatted_address': key,
+            'place_id': f"offline:{key}",
+            'address_components': []
+        }
+
+    def place_details(self, place_id: str) -> Dict:
+        self.calls += 1
+        if place_id not in self.places:
+            raise GeocodingNotFound("Place details failed: NOT_FOUND")
+        return self.places[place_id]
+
@@ -12,18 +12,105 @@ import math
 import sqlite3
 from pathlib import Path
 
+try:
+    from integrations.geocode_cache import (
+        GeocodeCache, GeocodingNotFound, NEGATIVE_STATUSES,
+        coordinate_key, normalize_address
+    )
+    from integrations.spatial_index import EARTH_RADIUS_MILES, SpatialIndex, haversine_distances, pairwise_haversine
+    from integrations.territory_clustering import TerritoryClusteringEngine
+except ImportError:
+    # Run as a script from inside integrations/
+    from geocode_cache import (
+        GeocodeCache, GeocodingNotFound, NEGATIVE_STATUSES,
+        coordinate_key, normalize_address
+    )
+    from spatial_index import EARTH_RADIUS_MILES, SpatialIndex, haversine_distances, pairwise_haversine
+    from territory_clustering import TerritoryClusteringEngine
+
 class GoogleMapsIntegration:
     """Google Maps integration for location services and visit tracking"""
     
-    def __init__(self):
+    def __init__(self, geocoder=None, cache: Optional[GeocodeCache] = None,
+                 enable_cache: bool = True):
         self.api_key = os.getenv('GOOGLE_MAPS_API_KEY')
         self.base_url = 'https://maps.googleapis.com/maps/api'
         
-        if not self.api_key:
+        # Optional backend exposing geocode/reverse_geocode/place_details
+        # (e.g. OfflineGeocoder); the Maps HTTP API is used when not set
+        self.geocoder = geocoder
+        
+        if cache is None and enable_cache:
+            cache = GeocodeCache()
+        self.cache = cache
+        
+        if not self.api_key and not self.geocoder:
             print("Warning: Google Maps API key not found. Some features may not work.")
     
+    def _cached_lookup(self, kind: str, key: str, fetch):
+        """Serve a lookup from the cache, falling back to ``fetch`` on a miss"""
+        if self.cache:
+            found, value = self.cache.get(kind, key)
+            if found:
+                if value is None:
+                    raise GeocodingNotFound(f"No {kind} result for '{key}' (cached)")
+                return value
+        
+        try:
+            value = fetch()
+        except GeocodingNotFound:
+            if self.cache:
+                self.cache.set_negative(kind, key)
+            raise
+        
+        if self.cache:
+            self.cache.set(kind, key, value)
+        return value
+    
     def geocode_address(self, address: str) -> Dict:
         """Convert address to latitude/longitude coordinates"""
+        return self._cached_lookup(
+            'geocode', normalize_address(address),
+            lambda: self.geocoder.geocode(address) if self.geocoder else self._fetch_geocode(address)
+        )
+    
+    def bulk_geocode(self, addresses: List[str]) -> Dict[str, Optional[Dict]]:
+        """Geocode many addresses, reading cached entries in one query.
+        
+        Returns a mapping of each input address to its location, or None when
+        the address could not be geocoded.
+        """
+        keys = {address: normalize_address(address) for address in addresses if address}
+        cached = self.cache.get_many('geocode', keys.values()) if self.cache else {}
+        
+        results: Dict[str, Optional[Dict]] = {}
+        fetched: Dict[str, Dict] = {}
+        for address, key in keys.items():
+            if key in cached:
+                results[address] = cached[key]
+                continue
+            if key in fetched:
+                results[address] = fetched[key]
+                continue
+            try:
+                location = self.geocoder.geocode(address) if self.geocoder else self._fetch_geocode(address)
+                fetched[key] = location
+                results[address] = location
+            except GeocodingNotFound:
+                if self.cache:
+                    self.cache.set_negative('geocode', key)
+                cached[key] = None
+                results[address] = None
+            except Exception:
+                results[address] = None
+        
+        if self.cache and fetched:
+            self.cache.set_many('geocode', fetched)
+        
+        return results
+    
+    def _fetch_geocode(self, address: str) -> Dict:
+        """Geocode an address through the Maps HTTP API"""
         if not self.api_key:
             raise Exception("Google Maps API key not configured")
         
@@ -49,6 +136,8 @@ class GoogleMapsIntegration:
                     'place_id': result.get('place_id'),
                     'address_components': result.get('address_components', [])
                 }
+            elif data['status'] in NEGATIVE_STATUSES or data['status'] == 'OK':
+                raise GeocodingNotFound(f"Geocoding failed: {data['status']}")
             else:
                 raise Exception(f"Geocoding failed: {data['status']}")
         else:
@@ -56,6 +145,14 @@ class GoogleMapsIntegration:
     
     def reverse_geocode(self, latitude: float, longitude: float) -> Dict:
         """Convert coordinates to address"""
+        return self._cached_lookup(
+            'reverse', coordinate_key(latitude, longitude),
+            lambda: (self.geocoder.reverse_geocode(latitude, longitude) if self.geocoder
+                     else self._fetch_reverse_geocode(latitude, longitude))
+        )
+    
+    def _fetch_reverse_geocode(self, latitude: float, longitude: float) -> Dict:
+        """Reverse geocode coordinates through the Maps HTTP API"""
         if not self.api_key:
             raise Exception("Google Maps API key not configured")
         
@@ -78,6 +175,8 @@ class GoogleMapsIntegration:
                     'place_id': result.get('place_id'),
                     'address_components': result.get('address_components', [])
                 }
+            elif data['status'] in NEGATIVE_STATUSES or data['status'] == 'OK':
+                raise GeocodingNotFound(f"Reverse geocoding failed: {data['status']}")
             else:
                 raise Exception(f"Reverse geocoding failed: {data['status']}")
         else:
@@ -199,6 +298,14 @@ class GoogleMapsIntegration:
     
     def get_place_details(self, place_id: str) -> Dict:
         """Get detailed information about a specific place"""
+        return self._cached_lookup(
+            'place', place_id,
+            lambda: (self.geocoder.place_details(place_id) if self.geocoder
+                     else self._fetch_place_details(place_id))
+        )
+    
+    def _fetch_place_details(self, place_id: str) -> Dict:
+        """Fetch place details through the Maps HTTP API"""
         if not self.api_key:
             raise Exception("Google Maps API key not configured")
         
@@ -216,6 +323,8 @@ class GoogleMapsIntegration:
             
             if data['status'] == 'OK':
                 return data['result']
+            elif data['status'] in NEGATIVE_STATUSES:
+                raise GeocodingNotFound(f"Place details failed: {data['status']}")
             else:
                 raise Exception(f"Place details failed: {data['status']}")
         else:
@@ -229,6 +338,8 @@ class VisitTracker:
         self.db_path = Path('database/visit_tracking.db')
         self.db_path.parent.mkdir(exist_ok=True)
         self._init_database()
+        self.spatial_index = SpatialIndex()
+        self._load_spatial_index()
     
     def _init_database(self):
         """Initialize the visit tracking database"""
@@ -287,6 +398,46 @@ class VisitTracker:
                 CREATE INDEX IF NOT EXISTS idx_visits_scheduled_time ON visits (scheduled_time)
             ''')
     
+    def _load_spatial_index(self):
+        """Index every stored visit location for proximity queries"""
+        with sqlite3.connect(self.db_path) as conn:
+            rows = conn.execute(
+                'SELECT visit_id, latitude, longitude, account_id, status FROM visits'
+            ).fetchall()
+        
+        self.spatial_index.add_many(
+            (visit_id, lat, lng, {'account_id': account_id, 'status': status})
+            for visit_id, lat, lng, account_id, status in rows
+        )
+    
+    def find_visits_near(self, latitude: float, longitude: float, radius_km: float = 20,
+                         status: Optional[str] = None, limit: int = 50) -> List[Dict]:
+        """Find visits within ``radius_km`` of a point, nearest first"""
+        matches = self.spatial_index.within_radius(latitude, longitude, radius_km)
+        if status:
+            matches = [m for m in matches if m['data']['status'] == status]
+        
+        return [{
+            'visit_id': m['id'],
+            'account_id': m['data']['account_id'],
+            'status': m['data']['status'],
+            'latitude': m['latitude'],
+            'longitude': m['longitude'],
+            'distance_km': m['distance_km']
+        } for m in matches[:limit]]
+    
+    def get_visit_counts(self, since: Optional[datetime] = None) -> Dict[str, int]:
+        """Number of visits per account, optionally since a given time"""
+        query = 'SELECT account_id, COUNT(*) FROM visits'
+        params: Tuple = ()
+        if since:
+            query += ' WHERE scheduled_time >= ?'
+            params = (since.isoformat(),)
+        query += ' GROUP BY account_id'
+        
+        with sqlite3.connect(self.db_path) as conn:
+            return dict(conn.execute(query, params).fetchall())
+    
     def plan_visit(self, account_data: Dict, visit_purpose: str, 
                    scheduled_time: datetime) -> Dict:
         """Plan a visit to an account location"""
@@ -339,6 +490,11 @@ class VisitTracker:
                     now
                 ))
             
+            self.spatial_index.add(
+                visit_id, location_info['latitude'], location_info['longitude'],
+                {'account_id': account_data.get('account_id'), 'status': 'planned'}
+            )
+            
             return visit_plan
             
         except Exception as e:
@@ -535,6 +691,108 @@ class LocationAnalytics:
     
     def __init__(self, maps_integration: GoogleMapsIntegration):
         self.maps = maps_integration
+        self.account_index = SpatialIndex()
+        self.territory_engine: Optional[TerritoryClusteringEngine] = None
+    
+    def index_accounts(self, accounts: List[Dict]) -> int:
+        """Geocode accounts and add them to the proximity index.
+        
+        Accounts whose address cannot be geocoded are dropped from the index.
+        Returns the number of accounts indexed.
+        """
+        addresses = [acc.get('address') or acc.get('billing_address') for acc in accounts]
+        locations = self.maps.bulk_geocode([address for address in addresses if address])
+        
+        indexed = 0
+        for account, address in zip(accounts, addresses):
+            location = locations.get(address) if address else None
+            if not location:
+                self.account_index.remove(account['account_id'])
+                continue
+            self.account_index.add(account['account_id'], location['latitude'], location['longitude'], {
+                'name': account.get('name'),
+                'territory': account.get('territory'),
+                'annual_revenue': account.get('annual_revenue') or 0
+            })
+            indexed += 1
+        
+        return indexed
+    
+    def find_nearby_accounts(self, latitude: float, longitude: float,
+                             radius_km: float = 20, limit: int = 50) -> List[Dict]:
+        """Indexed accounts within ``radius_km`` of a point, nearest first"""
+        return [self._account_match(m) for m in
+                self.account_index.within_radius(latitude, longitude, radius_km, limit=limit)]
+    
+    def nearest_accounts(self, latitude: float, longitude: float, k: int = 5) -> List[Dict]:
+        """The ``k`` indexed accounts closest to a point"""
+        return [self._account_match(m) for m in self.account_index.nearest(latitude, longitude, k)]
+    
+    def suggest_accounts_near_visit(self, visit: Dict, radius_km: float = 20,
+                                    limit: int = 10) -> List[Dict]:
+        """Other accounts a rep could drop in on around a planned visit"""
+        location = visit.get('location') or visit
+        matches = self.find_nearby_accounts(
+            location['latitude'], location['longitude'], radius_km, limit + 1
+        )
+        return [m for m in matches if m['account_id'] != visit.get('account_id')][:limit]
+    
+    def _geocoded_accounts(self, accounts: List[Dict], visit_counts: Dict[str, int]) -> List[Dict]:
+        """Index accounts and return clustering inputs for those with coordinates"""
+        self.index_accounts(accounts)
+        
+        geocoded = []
+        for account in accounts:
+            point = self.account_index.get(account['account_id'])
+            if point:
+                geocoded.append({
+                    'account_id': account['account_id'],
+                    'latitude': point['latitude'],
+                    'longitude': point['longitude'],
+                    'annual_revenue': account.get('annual_revenue') or 0,
+                    'visit_count': visit_counts.get(account['account_id'], 0)
+                })
+        return geocoded
+    
+    def propose_territories(self, accounts: List[Dict], n_territories: int,
+                            visit_counts: Optional[Dict[str, int]] = None,
+                            revenue_weight: float = 0.5, visit_weight: float = 0.5,
+                            random_state: Optional[int] = None) -> Dict:
+        """Cluster accounts into balanced territories and report the proposal.
+        
+        Keeps the fitted engine on ``self.territory_engine`` so accounts added
+        later can be placed with ``assign_new_accounts``.
+        """
+        geocoded = self._geocoded_accounts(accounts, visit_counts or {})
+        
+        self.territory_engine = TerritoryClusteringEngine(
+            n_territories, revenue_weight=revenue_weight, visit_weight=visit_weight,
+            random_state=random_state
+        )
+        current = {acc['account_id']: acc.get('territory') for acc in accounts if acc.get('territory')}
+        proposal = self.territory_engine.fit(geocoded, current_assignments=current)
+        proposal['ungeocoded_accounts'] = len(accounts) - len(geocoded)
+        return proposal
+    
+    def assign_new_accounts(self, accounts: List[Dict],
+                            visit_counts: Optional[Dict[str, int]] = None) -> Dict[str, str]:
+        """Place newly added accounts into the last proposed territories"""
+        if not self.territory_engine:
+            raise Exception("No territory proposal has been computed yet")
+        
+        geocoded = self._geocoded_accounts(accounts, visit_counts or {})
+        return self.territory_engine.assign_incremental(geocoded)
+    
+    def _account_match(self, match: Dict) -> Dict:
+        return {
+            'account_id': match['id'],
+            'name': match['data']['name'],
+            'territory': match['data']['territory'],
+            'annual_revenue': match['data']['annual_revenue'],
+            'latitude': match['latitude'],
+            'longitude': match['longitude'],
+            'distance_km': match['distance_km']
+        }
     
     def analyze_territory_coverage(self, accounts: List[Dict], territory: str) -> Dict:
         """Analyze account coverage in a territory"""
@@ -543,22 +801,21 @@ class LocationAnalytics:
         if not territory_accounts:
             return {'territory': territory, 'account_count': 0, 'coverage_analysis': {}}
         
-        # Get coordinates for all accounts
+        # Get coordinates for all accounts (cached addresses are one local read)
+        addresses = [acc.get('address') or acc.get('billing_address') for acc in territory_accounts]
+        locations = self.maps.bulk_geocode([address for address in addresses if address])
+        
         account_locations = []
-        for account in territory_accounts:
-            try:
-                address = account.get('address') or account.get('billing_address')
-                if address:
-                    location = self.maps.geocode_address(address)
-                    account_locations.append({
-                        'account_id': account['account_id'],
-                        'name': account['name'],
-                        'latitude': location['latitude'],
-                        'longitude': location['longitude'],
-                        'revenue': account.get('annual_revenue', 0)
-                    })
-            except Exception:
-                continue
+        for account, address in zip(territory_accounts, addresses):
+            location = locations.get(address) if address else None
+            if location:
+                account_locations.append({
+                    'account_id': account['account_id'],
+                    'name': account['name'],
+                    'latitude': location['latitude'],
+                    'longitude': location['longitude'],
+                    'revenue': account.get('annual_revenue', 0)
+                })
         
         if not account_locations:
             return {'territory': territory, 'account_count': 0, 'coverage_analysis': {}}
@@ -568,12 +825,12 @@ class LocationAnalytics:
         avg_lng = sum(loc['longitude'] for loc in account_locations) / len(account_locations)
         
         # Calculate coverage radius (distance from center to furthest account)
-        max_distance = 0
-        for location in account_locations:
-            distance = self.calculate_haversine_distance(
-                avg_lat, avg_lng, location['latitude'], location['longitude']
-            )
-            max_distance = max(max_distance, distance)
+        max_distance = float(haversine_distances(
+            avg_lat, avg_lng,
+            [loc['latitude'] for loc in account_locations],
+            [loc['longitude'] for loc in account_locations],
+            radius=EARTH_RADIUS_MILES
+        ).max())
         
         # Revenue analysis
         total_revenue = sum(loc['revenue'] for loc in account_locations)
@@ -625,26 +882,22 @@ class LocationAnalytics:
             )
             
             # Score venues based on proximity to all accounts
+            candidates = venues[:10]  # Limit to top 10 venues
             scored_venues = []
-            for venue in venues[:10]:  # Limit to top 10 venues
-                venue_lat = venue['geometry']['location']['lat']
-                venue_lng = venue['geometry']['location']['lng']
-                
-                total_distance = 0
-                for account in account_locations:
-                    distance = self.calculate_haversine_distance(
-                        venue_lat, venue_lng,
-                        account['latitude'], account['longitude']
-                    )
-                    total_distance += distance
-                
-                avg_distance = total_distance / len(account_locations)
-                
-                scored_venues.append({
-                    'venue': venue,
-                    'average_distance_miles': avg_distance,
-                    'total_distance_miles': total_distance
-                })
+            if candidates:
+                distances = pairwise_haversine(
+                    [venue['geometry']['location']['lat'] for venue in candidates],
+                    [venue['geometry']['location']['lng'] for venue in candidates],
+                    [account['latitude'] for account in account_locations],
+                    [account['longitude'] for account in account_locations],
+                    radius=EARTH_RADIUS_MILES
+                )
+                for venue, total_distance in zip(candidates, distances.sum(axis=1)):
+                    scored_venues.append({
+                        'venue': venue,
+                        'average_distance_miles': float(total_distance) / len(account_locations),
+                        'total_distance_miles': float(total_distance)
+                    })
             
             # Sort by average distance
             scored_venues.sort(key=lambda x: x['average_distance_miles'])
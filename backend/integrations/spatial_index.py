@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Grid-bucketed Spatial Index for Account and Visit Proximity Queries
+"""
+
+import math
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+EARTH_RADIUS_MILES = 3958.7613
+KM_PER_DEGREE_LAT = 111.195
+HALF_EARTH_CIRCUMFERENCE_KM = math.pi * EARTH_RADIUS_KM
+
+
+def haversine_distances(lat: float, lon: float, lats, lons,
+                        radius: float = EARTH_RADIUS_KM) -> np.ndarray:
+    """Vectorized great-circle distance from one point to arrays of points"""
+    lat1 = np.radians(lat)
+    lat2 = np.radians(np.asarray(lats, dtype=float))
+    dlat = lat2 - lat1
+    dlon = np.radians(np.asarray(lons, dtype=float) - lon)
+
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * radius * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def pairwise_haversine(lats_a, lons_a, lats_b, lons_b,
+                       radius: float = EARTH_RADIUS_KM) -> np.ndarray:
+    """Distance matrix of shape (len(a), len(b)) between two sets of points"""
+    lat1 = np.radians(np.asarray(lats_a, dtype=float))[:, None]
+    lon1 = np.radians(np.asarray(lons_a, dtype=float))[:, None]
+    lat2 = np.radians(np.asarray(lats_b, dtype=float))[None, :]
+    lon2 = np.radians(np.asarray(lons_b, dtype=float))[None, :]
+
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * radius * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class SpatialIndex:
+    """In-memory lat/lon index bucketed on a fixed degree grid.
+
+    Radius queries only inspect the grid cells overlapping the search circle
+    and filter candidates with a single vectorized haversine pass, so they
+    stay fast for tens of thousands of points. Reads and writes hold one
+    lock, so the index can be filled from a background thread while
+    request handlers query it.
+    """
+
+    def __init__(self, cell_size_degrees: float = 0.25):
+        self.cell_size = cell_size_degrees
+        self.lon_cells = int(math.ceil(360.0 / cell_size_degrees))
+        self._points: Dict[str, Tuple[float, float, Any]] = {}
+        self._cells: Dict[Tuple[int, int], Set[str]] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._points)
+
+    def __contains__(self, item_id: str) -> bool:
+        with self._lock:
+            return item_id in self._points
+
+    def _cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        row = int(math.floor((latitude + 90.0) / self.cell_size))
+        col = int(math.floor((longitude + 180.0) / self.cell_size)) % self.lon_cells
+        return row, col
+
+    def add(self, item_id: str, latitude: float, longitude: float, data: Any = None):
+        """Insert or move a point"""
+        with self._lock:
+            if item_id in self._points:
+                self.remove(item_id)
+
+            self._points[item_id] = (float(latitude), float(longitude), data)
+            self._cells.setdefault(self._cell(latitude, longitude), set()).add(item_id)
+
+    def add_many(self, items: Iterable[Tuple[str, float, float, Any]]):
+        """Insert many ``(item_id, latitude, longitude, data)`` tuples"""
+        with self._lock:
+            for item_id, latitude, longitude, data in items:
+                self.add(item_id, latitude, longitude, data)
+
+    def remove(self, item_id: str) -> bool:
+        """Remove a point; returns False if it was not indexed"""
+        with self._lock:
+            point = self._points.pop(item_id, None)
+            if point is None:
+                return False
+
+            cell = self._cell(point[0], point[1])
+            members = self._cells.get(cell)
+            if members is not None:
+                members.discard(item_id)
+                if not members:
+                    del self._cells[cell]
+            return True
+
+    def get(self, item_id: str) -> Optional[Dict]:
+        with self._lock:
+            point = self._points.get(item_id)
+        if point is None:
+            return None
+        return {'id': item_id, 'latitude': point[0], 'longitude': point[1], 'data': point[2]}
+
+    def clear(self):
+        with self._lock:
+            self._points.clear()
+            self._cells.clear()
+
+    def _candidate_ids(self, latitude: float, longitude: float, radius_km: float) -> List[str]:
+        """Ids in every grid cell overlapping the search circle"""
+        dlat = radius_km / KM_PER_DEGREE_LAT
+        min_row, _ = self._cell(max(latitude - dlat, -90.0), 0.0)
+        max_row, _ = self._cell(min(latitude + dlat, 90.0), 0.0)
+
+        cos_lat = math.cos(math.radians(min(abs(latitude) + dlat, 90.0)))
+        if cos_lat <= 1e-9 or radius_km >= HALF_EARTH_CIRCUMFERENCE_KM:
+            columns = None  # search circle wraps all longitudes
+        else:
+            dlon = radius_km / (KM_PER_DEGREE_LAT * cos_lat)
+            if dlon >= 180.0:
+                columns = None
+            else:
+                first = int(math.floor((longitude - dlon + 180.0) / self.cell_size))
+                last = int(math.floor((longitude + dlon + 180.0) / self.cell_size))
+                columns = {col % self.lon_cells for col in range(first, last + 1)}
+
+        rows = max_row - min_row + 1
+        span = rows * (len(columns) if columns is not None else self.lon_cells)
+
+        ids: List[str] = []
+        if span > len(self._cells):
+            # Cheaper to walk occupied cells than every cell in the range
+            for (row, col), members in self._cells.items():
+                if min_row <= row <= max_row and (columns is None or col in columns):
+                    ids.extend(members)
+        else:
+            for row in range(min_row, max_row + 1):
+                for col in (columns if columns is not None else range(self.lon_cells)):
+                    members = self._cells.get((row, col))
+                    if members:
+                        ids.extend(members)
+        return ids
+
+    def _rank(self, latitude: float, longitude: float, ids: List[str]) -> Tuple[List[str], np.ndarray]:
+        """Distances (km) from the query point to ``ids``, nearest first"""
+        if not ids:
+            return [], np.empty(0)
+
+        points = [self._points[item_id] for item_id in ids]
+        lats = np.fromiter((p[0] for p in points), dtype=float, count=len(points))
+        lons = np.fromiter((p[1] for p in points), dtype=float, count=len(points))
+        distances = haversine_distances(latitude, longitude, lats, lons)
+        order = np.argsort(distances, kind='stable')
+        return [ids[i] for i in order], distances[order]
+
+    def _results(self, ids: List[str], distances: np.ndarray) -> List[Dict]:
+        results = []
+        for item_id, distance in zip(ids, distances):
+            point = self._points[item_id]
+            results.append({
+                'id': item_id,
+                'latitude': point[0],
+                'longitude': point[1],
+                'distance_km': round(float(distance), 3),
+                'data': point[2]
+            })
+        return results
+
+    def within_radius(self, latitude: float, longitude: float, radius_km: float,
+                      limit: Optional[int] = None) -> List[Dict]:
+        """All points within ``radius_km``, nearest first"""
+        with self._lock:
+            ids, distances = self._rank(latitude, longitude,
+                                        self._candidate_ids(latitude, longitude, radius_km))
+            count = int(np.searchsorted(distances, radius_km, side='right'))
+            if limit is not None:
+                count = min(count, limit)
+            return self._results(ids[:count], distances[:count])
+
+    def nearest(self, latitude: float, longitude: float, k: int = 5,
+                max_radius_km: Optional[float] = None) -> List[Dict]:
+        """The ``k`` nearest points, optionally capped at ``max_radius_km``"""
+        ceiling = min(max_radius_km or HALF_EARTH_CIRCUMFERENCE_KM, HALF_EARTH_CIRCUMFERENCE_KM)
+        radius = min(self.cell_size * KM_PER_DEGREE_LAT, ceiling)
+
+        with self._lock:
+            if k <= 0 or not self._points:
+                return []
+
+            # Grow the search circle until it holds k points; every point inside a
+            # circle of radius r is found, so the k nearest within it are exact.
+            while True:
+                ids, distances = self._rank(latitude, longitude,
+                                            self._candidate_ids(latitude, longitude, radius))
+                inside = int(np.searchsorted(distances, radius, side='right'))
+                if inside >= k or radius >= ceiling:
+                    count = min(inside, k)
+                    return self._results(ids[:count], distances[:count])
+                radius = min(radius * 2, ceiling)
@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+Territory Clustering Engine for Balanced Sales Territories
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+
+try:
+    from integrations.spatial_index import KM_PER_DEGREE_LAT, haversine_distances
+except ImportError:
+    from spatial_index import KM_PER_DEGREE_LAT, haversine_distances
+
+
+class TerritoryClusteringEngine:
+    """Capacitated, load-weighted k-means over geocoded accounts.
+
+    Each account carries a workload made of its share of total revenue and
+    its share of total visits. Clustering minimises travel distance to the
+    territory centre while per-territory price penalties push workload
+    towards ``1 / n_territories`` of the total. A capacitated assignment
+    caps each territory at ``1 + balance_tolerance`` times that share and a
+    rebalancing pass fills any below ``1 - balance_tolerance`` from their
+    borders. Iteration stops once the centres move less than ``tolerance``
+    times the median gap between them.
+    Distances and loads are computed on NumPy arrays, so tens of thousands
+    of accounts cluster in a few seconds.
+    """
+
+    def __init__(self, n_territories: int, revenue_weight: float = 0.5,
+                 visit_weight: float = 0.5, balance_tolerance: float = 0.15,
+                 max_iterations: int = 100, tolerance: float = 0.002,
+                 random_state: Optional[int] = None):
+        if n_territories < 1:
+            raise ValueError("n_territories must be at least 1")
+
+        self.n_territories = n_territories
+        self.revenue_weight = revenue_weight
+        self.visit_weight = visit_weight
+        self.balance_tolerance = balance_tolerance
+        self.max_iterations = max_iterations
+        self.tolerance = tolerance
+        self.rng = np.random.default_rng(random_state)
+
+        self.territory_names: List[str] = []
+        self.account_ids: List[str] = []
+        self.labels = np.empty(0, dtype=int)
+        self.iterations = 0
+
+        # Fitted state, kept so new accounts can be placed incrementally
+        self._ref_cos = 1.0
+        self._points = np.empty((0, 2))
+        self._latitudes = np.empty(0)
+        self._longitudes = np.empty(0)
+        self._revenue = np.empty(0)
+        self._visits = np.empty(0)
+        self._centers = np.empty((0, 2))
+        self._penalties = np.zeros(n_territories)
+        self._revenue_scale = 1.0
+        self._visit_scale = 1.0
+
+    # === Preparation ===
+
+    def _project(self, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+        """Equirectangular projection to kilometres around the fitted reference latitude"""
+        return np.column_stack((
+            longitudes * self._ref_cos * KM_PER_DEGREE_LAT,
+            latitudes * KM_PER_DEGREE_LAT
+        ))
+
+    def _loads(self, revenue: np.ndarray, visits: np.ndarray) -> np.ndarray:
+        """Per-account workload on a scale where the fitted mean account is 1"""
+        return (self.revenue_weight * revenue / self._revenue_scale +
+                self.visit_weight * visits / self._visit_scale)
+
+    @staticmethod
+    def _columns(accounts: List[Dict]):
+        ids = [str(acc['account_id']) for acc in accounts]
+        latitudes = np.array([acc['latitude'] for acc in accounts], dtype=float)
+        longitudes = np.array([acc['longitude'] for acc in accounts], dtype=float)
+        revenue = np.array([acc.get('annual_revenue') or 0 for acc in accounts], dtype=float)
+        visits = np.array([acc.get('visit_count') or 0 for acc in accounts], dtype=float)
+        return ids, latitudes, longitudes, revenue, visits
+
+    # === Clustering ===
+
+    def _initial_centers(self, points: np.ndarray, weights: np.ndarray, k: int) -> np.ndarray:
+        """Load-weighted k-means++ seeding"""
+        probabilities = weights / weights.sum()
+        centers = [points[self.rng.choice(len(points), p=probabilities)]]
+        closest = ((points - centers[0]) ** 2).sum(axis=1)
+
+        for _ in range(1, k):
+            scores = closest * weights
+            total = scores.sum()
+            index = self.rng.choice(len(points), p=scores / total) if total > 0 \
+                else self.rng.integers(len(points))
+            centers.append(points[index])
+            closest = np.minimum(closest, ((points - points[index]) ** 2).sum(axis=1))
+
+        return np.array(centers)
+
+    def _distances(self, points: np.ndarray) -> np.ndarray:
+        return np.sqrt(((points[:, None, :] - self._centers[None, :, :]) ** 2).sum(axis=2))
+
+    def _center_spread(self) -> float:
+        """Median distance between territory centres"""
+        if len(self._centers) < 2:
+            return 1.0
+        gaps = np.sqrt(((self._centers[:, None, :] - self._centers[None, :, :]) ** 2).sum(axis=2))
+        return float(np.median(gaps[np.triu_indices(len(self._centers), 1)])) or 1.0
+
+    @staticmethod
+    def _capacitated_assign(costs: np.ndarray, loads: np.ndarray, capacity: float) -> np.ndarray:
+        """Greedy assignment to the cheapest territory with spare capacity.
+
+        Accounts with the most to lose from a second-choice territory
+        (largest regret) are placed first.
+        """
+        n, k = costs.shape
+        preferences = np.argsort(costs, axis=1)
+        if k > 1:
+            ranked = np.take_along_axis(costs, preferences[:, :2], axis=1)
+            order = np.argsort(ranked[:, 0] - ranked[:, 1])
+        else:
+            order = np.arange(n)
+
+        labels = np.empty(n, dtype=int)
+        remaining = np.full(k, capacity)
+        for i in order:
+            load = loads[i]
+            for territory in preferences[i]:
+                if remaining[territory] >= load:
+                    break
+            else:
+                # Too big for any territory's spare capacity: least-loaded wins
+                territory = int(np.argmax(remaining))
+            labels[i] = territory
+            remaining[territory] -= load
+        return labels
+
+    @staticmethod
+    def _rebalance(costs: np.ndarray, loads: np.ndarray, labels: np.ndarray,
+                   floor: float, capacity: float) -> np.ndarray:
+        """Fill territories below ``floor`` with the accounts cheapest to move.
+
+        An account only moves if its territory stays at or above ``floor``
+        and the receiving one stays within ``capacity``; accounts on the
+        border, whose cost barely changes, go first.
+        """
+        n, k = costs.shape
+        labels = labels.copy()
+        territory_loads = np.bincount(labels, weights=loads, minlength=k)
+        rows = np.arange(n)
+        for _ in range(k):
+            under = np.flatnonzero(territory_loads < floor)
+            if not len(under):
+                break
+            moved = False
+            for territory in under[np.argsort(territory_loads[under])]:
+                extra = costs[:, territory] - costs[rows, labels]
+                for i in np.argsort(extra):
+                    source = labels[i]
+                    if source == territory or territory_loads[source] - loads[i] < floor \
+                            or territory_loads[territory] + loads[i] > capacity:
+                        continue
+                    labels[i] = territory
+                    territory_loads[source] -= loads[i]
+                    territory_loads[territory] += loads[i]
+                    moved = True
+                    if territory_loads[territory] >= floor:
+                        break
+            if not moved:
+                break
+        return labels
+
+    def fit(self, accounts: List[Dict],
+            current_assignments: Optional[Dict[str, str]] = None) -> Dict:
+        """Cluster accounts into balanced territories.
+
+        ``accounts`` need ``account_id``, ``latitude`` and ``longitude`` and
+        may carry ``annual_revenue`` and ``visit_count``. When
+        ``current_assignments`` (account_id -> territory) is given, clusters
+        inherit the existing territory name they overlap most, and the
+        result lists the accounts that would move.
+        """
+        if not accounts:
+            raise ValueError("No geocoded accounts to cluster")
+
+        ids, latitudes, longitudes, revenue, visits = self._columns(accounts)
+        k = min(self.n_territories, len(ids))
+
+        self._ref_cos = float(np.cos(np.radians(latitudes.mean())))
+        self._revenue_scale = revenue.mean() if revenue.sum() > 0 else 1.0
+        self._visit_scale = visits.mean() if visits.sum() > 0 else 1.0
+        loads = self._loads(revenue, visits)
+        if loads.sum() <= 0:
+            loads = np.ones(len(ids))
+        weights = loads + 1e-9
+
+        points = self._project(latitudes, longitudes)
+        self._centers = self._initial_centers(points, weights, k)
+        self._penalties = np.zeros(k)
+        target = loads.sum() / k
+
+        capacity = target * (1.0 + self.balance_tolerance)
+        floor = target * (1.0 - self.balance_tolerance)
+        labels = np.full(len(ids), -1)
+        for iteration in range(1, self.max_iterations + 1):
+            distances = self._distances(points)
+
+            # Price overloaded territories up and underloaded ones down. The
+            # step is on the scale of the gaps between territory centres so
+            # load can shift between distant clusters, and decays to settle.
+            proposed = np.argmin(distances + self._penalties[None, :], axis=1)
+            imbalance = np.bincount(proposed, weights=loads, minlength=k) / target - 1.0
+            spread = self._center_spread()
+            self._penalties += spread * 0.25 * (0.9 ** iteration) * np.clip(imbalance, -1.0, 1.0)
+            self._penalties -= self._penalties.mean()
+
+            costs = distances + self._penalties[None, :]
+            new_labels = self._rebalance(costs, loads, self._capacitated_assign(costs, loads, capacity),
+                                         floor, capacity)
+            if np.array_equal(new_labels, labels):
+                break
+            labels = new_labels
+
+            previous_centers = self._centers.copy()
+            for territory in range(k):
+                members = labels == territory
+                if members.any():
+                    self._centers[territory] = np.average(points[members], axis=0, weights=weights[members])
+                else:
+                    # Reseed an empty territory on the worst-served account
+                    worst = int(np.argmax(distances[np.arange(len(labels)), labels]))
+                    self._centers[territory] = points[worst]
+            # Accounts on territory borders can keep trading places between
+            # near-equal choices; stop once that no longer moves the centres
+            shift = np.sqrt(((self._centers - previous_centers) ** 2).sum(axis=1)).max()
+            if shift <= self.tolerance * spread:
+                break
+
+        self.iterations = iteration
+        self.account_ids = ids
+        self.labels = labels
+        self._points = points
+        self._latitudes = latitudes
+        self._longitudes = longitudes
+        self._revenue = revenue
+        self._visits = visits
+        self.territory_names = self._name_territories(current_assignments or {})
+
+        result = self.report()
+        result['assignments'] = self.assignments()
+        if current_assignments:
+            result['changes'] = self.proposed_changes(current_assignments)
+        return result
+
+    def _name_territories(self, current_assignments: Dict[str, str]) -> List[str]:
+        """Give each cluster the existing territory it overlaps most"""
+        k = len(self._centers)
+        names = [f"Territory {i + 1}" for i in range(k)]
+        if not current_assignments:
+            return names
+
+        overlap: Dict[tuple, int] = {}
+        for account_id, label in zip(self.account_ids, self.labels):
+            existing = current_assignments.get(account_id)
+            if existing:
+                overlap[(int(label), existing)] = overlap.get((int(label), existing), 0) + 1
+
+        used_clusters, used_names = set(), set()
+        for (label, existing), _ in sorted(overlap.items(), key=lambda item: -item[1]):
+            if label in used_clusters or existing in used_names:
+                continue
+            names[label] = existing
+            used_clusters.add(label)
+            used_names.add(existing)
+        return names
+
+    # === Incremental updates ===
+
+    def assign_incremental(self, accounts: List[Dict]) -> Dict[str, str]:
+        """Place new accounts into the fitted territories without re-clustering"""
+        if not len(self._centers):
+            raise ValueError("Engine has not been fitted")
+        if not accounts:
+            return {}
+
+        ids, latitudes, longitudes, revenue, visits = self._columns(accounts)
+        points = self._project(latitudes, longitudes)
+        labels = np.argmin(self._distances(points) + self._penalties[None, :], axis=1)
+
+        known = {account_id: i for i, account_id in enumerate(self.account_ids)}
+        for i, account_id in enumerate(ids):
+            if account_id in known:
+                self.labels[known[account_id]] = labels[i]
+
+        fresh = np.array([account_id not in known for account_id in ids], dtype=bool)
+        if fresh.any():
+            self.account_ids.extend(account_id for account_id, new in zip(ids, fresh) if new)
+            self.labels = np.concatenate((self.labels, labels[fresh]))
+            self._points = np.vstack((self._points, points[fresh]))
+            self._latitudes = np.concatenate((self._latitudes, latitudes[fresh]))
+            self._longitudes = np.concatenate((self._longitudes, longitudes[fresh]))
+            self._revenue = np.concatenate((self._revenue, revenue[fresh]))
+            self._visits = np.concatenate((self._visits, visits[fresh]))
+
+        return {account_id: self.territory_names[label] for account_id, label in zip(ids, labels)}
+
+    # === Reporting ===
+
+    def assignments(self) -> Dict[str, str]:
+        return {account_id: self.territory_names[label]
+                for account_id, label in zip(self.account_ids, self.labels)}
+
+    def proposed_changes(self, current_assignments: Dict[str, str]) -> List[Dict]:
+        """Accounts whose proposed territory differs from their current one"""
+        changes = []
+        for account_id, proposed in self.assignments().items():
+            current = current_assignments.get(account_id)
+            if current != proposed:
+                changes.append({'account_id': account_id, 'from': current, 'to': proposed})
+        return changes
+
+    def report(self) -> Dict:
+        """Per-territory travel and revenue balance for the current assignment"""
+        k = len(self._centers)
+        loads = self._loads(self._revenue, self._visits)
+        counts = np.bincount(self.labels, minlength=k)
+        revenue = np.bincount(self.labels, weights=self._revenue, minlength=k)
+        visits = np.bincount(self.labels, weights=self._visits, minlength=k)
+        territory_loads = np.bincount(self.labels, weights=loads, minlength=k)
+        target = territory_loads.sum() / k if territory_loads.sum() > 0 else 1.0
+
+        center_lats = self._centers[:, 1] / KM_PER_DEGREE_LAT
+        center_lons = self._centers[:, 0] / (self._ref_cos * KM_PER_DEGREE_LAT)
+
+        travel = np.zeros(len(self.labels))
+        for territory in range(k):
+            members = self.labels == territory
+            if members.any():
+                travel[members] = haversine_distances(
+                    center_lats[territory], center_lons[territory],
+                    self._latitudes[members], self._longitudes[members]
+                )
+        travel_total = np.bincount(self.labels, weights=travel, minlength=k)
+        travel_max = np.zeros(k)
+        np.maximum.at(travel_max, self.labels, travel)
+
+        total_revenue = revenue.sum()
+        territories = []
+        for territory in range(k):
+            territories.append({
+                'territory': self.territory_names[territory],
+                'account_count': int(counts[territory]),
+                'total_revenue': float(revenue[territory]),
+                'revenue_share': float(revenue[territory] / total_revenue) if total_revenue else 0.0,
+                'visit_load': float(visits[territory]),
+                'load_ratio': round(float(territory_loads[territory] / target), 3),
+                'center_coordinates': {
+                    'latitude': float(center_lats[territory]),
+                    'longitude': float(center_lons[territory])
+                },
+                'total_travel_km': round(float(travel_total[territory]), 2),
+                'average_travel_km': round(float(travel_total[territory] / counts[territory]), 2)
+                if counts[territory] else 0.0,
+                'max_travel_km': round(float(travel_max[territory]), 2)
+            })
+
+        mean_revenue = revenue.mean() if k else 0.0
+        return {
+            'territory_count': k,
+            'account_count': len(self.account_ids),
+            'iterations': self.iterations,
+            'territories': territories,
+            'balance': {
+                'max_load_ratio': round(float((territory_loads / target).max()), 3),
+                'min_load_ratio': round(float((territory_loads / target).min()), 3),
+                'revenue_cv': round(float(revenue.std() / mean_revenue), 3) if mean_revenue else 0.0,
+                'total_travel_km': round(float(travel_total.sum()), 2)
+            }
+        }
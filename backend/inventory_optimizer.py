@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Safety Stock and Reorder Point Optimizer
+Computes per-SKU safety stock, reorder point and economic order quantity from
+order history and supplier lead times, vectorized across the whole catalog,
+and writes the recommended inventory parameters back in one bulk update.
+"""
+
+import json
+from datetime import datetime, timedelta
+from statistics import NormalDist
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import update
+
+from database.models import SessionLocal, Inventory, Order, PurchaseOrder, Supplier, AgentLog
+from procurement_agent import ORDER_UP_TO_FRACTION
+
+
+def optimize_parameters(mean_demand: np.ndarray, std_demand: np.ndarray,
+                        lead_time: np.ndarray, lead_time_std: np.ndarray,
+                        unit_cost: np.ndarray, service_level: float = 0.95,
+                        ordering_cost: float = 50.0, holding_cost_rate: float = 0.25) -> Dict[str, np.ndarray]:
+    """Safety stock, reorder point and EOQ for arrays of SKUs.
+
+    Demand and its standard deviation are per day; lead times are in days.
+    Safety stock covers both demand and lead time variability,
+    ``z * sqrt(L * sigma_d^2 + d^2 * sigma_L^2)``. EOQ is the classic
+    ``sqrt(2 * D * S / H)`` with annual demand ``D``, cost per order ``S``
+    and annual holding cost ``H = holding_cost_rate * unit_cost``; SKUs
+    without a positive unit cost have no EOQ and get 0.
+    """
+    z = NormalDist().inv_cdf(service_level)
+
+    safety_stock = z * np.sqrt(lead_time * std_demand ** 2 + mean_demand ** 2 * lead_time_std ** 2)
+    reorder_point = mean_demand * lead_time + safety_stock
+
+    holding_cost = holding_cost_rate * unit_cost
+    priced = holding_cost > 0
+    eoq = np.zeros(len(holding_cost))
+    eoq[priced] = np.sqrt(2.0 * mean_demand[priced] * 365.0 * ordering_cost / holding_cost[priced])
+
+    return {
+        "safety_stock": np.ceil(safety_stock).astype(int),
+        "reorder_point": np.ceil(reorder_point).astype(int),
+        "eoq": np.where(priced, np.maximum(1, np.ceil(eoq)), 0).astype(int)
+    }
+
+
+class InventoryOptimizer:
+    """Retunes ``Inventory.reorder_point`` and ``max_stock`` from demand history.
+
+    Daily demand per SKU is built as one (SKU x day) matrix from the orders
+    table, so mean and variance for the whole catalog come from two NumPy
+    reductions. Lead times come from delivered purchase orders per supplier
+    when there are enough of them, otherwise from ``Supplier.lead_time_days``.
+    ``max_stock`` is set so the procurement agent, which orders up to
+    ``ORDER_UP_TO_FRACTION`` of the way from reorder point to max stock,
+    orders one EOQ at the reorder point. SKUs with demand on fewer than
+    ``min_demand_days`` days in the window, or without a unit cost to price
+    holding stock, keep their current values.
+    """
+
+    def __init__(self, service_level: float = 0.95, history_days: int = 90,
+                 ordering_cost: float = 50.0, holding_cost_rate: float = 0.25,
+                 default_lead_time_days: int = 7, min_demand_days: int = 3,
+                 min_lead_time_samples: int = 3):
+        self.service_level = service_level
+        self.history_days = history_days
+        self.ordering_cost = ordering_cost
+        self.holding_cost_rate = holding_cost_rate
+        self.default_lead_time_days = default_lead_time_days
+        self.min_demand_days = min_demand_days
+        self.min_lead_time_samples = min_lead_time_samples
+
+    def _demand_matrix(self, db, product_index: Dict[str, int], end: datetime) -> np.ndarray:
+        start = end - timedelta(days=self.history_days)
+        rows = db.query(Order.product_id, Order.order_date, Order.quantity, Order.status).filter(
+            Order.order_date >= start, Order.order_date < end
+        ).all()
+
+        demand = np.zeros((len(product_index), self.history_days))
+        known = [(product_index[pid], (date - start).days, qty or 1)
+                 for pid, date, qty, status in rows
+                 if pid in product_index and (status or "").lower() != "cancelled"]
+        if known:
+            sku, day, qty = (np.array(column) for column in zip(*known))
+            np.add.at(demand, (sku, np.minimum(day, self.history_days - 1)), qty)
+        return demand
+
+    def _supplier_lead_times(self, db) -> Dict[str, tuple]:
+        """(mean, std) lead time in days per supplier"""
+        lead_times = {s.supplier_id: (float(s.lead_time_days or self.default_lead_time_days), 0.0)
+                      for s in db.query(Supplier).all()}
+
+        samples: Dict[str, List[float]] = {}
+        delivered = db.query(PurchaseOrder.supplier_id, PurchaseOrder.created_at,
+                             PurchaseOrder.sent_at, PurchaseOrder.delivered_at).filter(
+            PurchaseOrder.delivered_at.isnot(None)
+        ).all()
+        for supplier_id, created_at, sent_at, delivered_at in delivered:
+            placed = sent_at or created_at
+            if placed:
+                samples.setdefault(supplier_id, []).append((delivered_at - placed).total_seconds() / 86400)
+
+        for supplier_id, values in samples.items():
+            if len(values) >= self.min_lead_time_samples:
+                lead_times[supplier_id] = (float(np.mean(values)), float(np.std(values, ddof=1)))
+        return lead_times
+
+    def recommend(self, db=None, end: Optional[datetime] = None) -> List[Dict]:
+        """Current and recommended parameters for every inventory item"""
+        own_session = db is None
+        db = db or SessionLocal()
+        try:
+            items = db.query(Inventory).order_by(Inventory.id).all()
+            if not items:
+                return []
+
+            product_index = {item.product_id: i for i, item in enumerate(items)}
+            demand = self._demand_matrix(db, product_index, end or datetime.utcnow())
+            lead_times = self._supplier_lead_times(db)
+            default = (float(self.default_lead_time_days), 0.0)
+            lead = np.array([lead_times.get(item.supplier_id, default) for item in items])
+
+            demand_days = np.count_nonzero(demand, axis=1)
+            # The sample deviation needs two days of history; one day carries no spread
+            demand_std = demand.std(axis=1, ddof=1) if self.history_days > 1 else np.zeros(len(items))
+            unit_cost = np.array([item.unit_cost or 0.0 for item in items])
+            params = optimize_parameters(
+                demand.mean(axis=1), demand_std,
+                lead[:, 0], lead[:, 1], unit_cost,
+                self.service_level, self.ordering_cost, self.holding_cost_rate
+            )
+
+            recommendations = []
+            for i, item in enumerate(items):
+                if demand_days[i] < self.min_demand_days:
+                    skipped = "insufficient_history"
+                elif unit_cost[i] <= 0:
+                    skipped = "missing_unit_cost"
+                else:
+                    skipped = None
+                reorder_point = int(params["reorder_point"][i])
+                recommendations.append({
+                    "id": item.id,
+                    "product_id": item.product_id,
+                    "current": {"reorder_point": item.reorder_point, "max_stock": item.max_stock},
+                    "recommended": {
+                        "reorder_point": reorder_point,
+                        "max_stock": reorder_point + int(np.ceil(round(params["eoq"][i] / ORDER_UP_TO_FRACTION, 6)))
+                    } if skipped is None else None,
+                    "skipped": skipped,
+                    "safety_stock": int(params["safety_stock"][i]),
+                    "eoq": int(params["eoq"][i]),
+                    "mean_daily_demand": round(float(demand[i].mean()), 3),
+                    "lead_time_days": round(float(lead[i, 0]), 2)
+                })
+            return recommendations
+        finally:
+            if own_session:
+                db.close()
+
+    def retune(self, db=None, dry_run: bool = True, end: Optional[datetime] = None) -> Dict:
+        """Recompute parameters for the catalog and apply the changes in one bulk update.
+
+        With ``dry_run`` nothing is written and the returned diff shows what
+        would change.
+        """
+        own_session = db is None
+        db = db or SessionLocal()
+        try:
+            recommendations = self.recommend(db, end)
+            changes = [
+                {
+                    "product_id": rec["product_id"],
+                    "reorder_point": {"old": rec["current"]["reorder_point"], "new": rec["recommended"]["reorder_point"]},
+                    "max_stock": {"old": rec["current"]["max_stock"], "new": rec["recommended"]["max_stock"]},
+                    "safety_stock": rec["safety_stock"],
+                    "eoq": rec["eoq"],
+                    "_id": rec["id"]
+                }
+                for rec in recommendations
+                if rec["recommended"] and rec["recommended"] != rec["current"]
+            ]
+
+            if changes and not dry_run:
+                now = datetime.utcnow()
+                db.execute(update(Inventory), [
+                    {"id": change["_id"], "reorder_point": change["reorder_point"]["new"],
+                     "max_stock": change["max_stock"]["new"], "last_updated": now}
+                    for change in changes
+                ])
+                db.add(AgentLog(
+                    action="inventory_parameters_optimized",
+                    quantity=len(changes),
+                    human_review=False,
+                    details=json.dumps({"service_level": self.service_level, "updated": len(changes)})
+                ))
+                db.commit()
+
+            for change in changes:
+                del change["_id"]
+            return {
+                "dry_run": dry_run,
+                "evaluated": len(recommendations),
+                "skipped_insufficient_history": sum(1 for rec in recommendations
+                                                    if rec["skipped"] == "insufficient_history"),
+                "skipped_missing_unit_cost": [rec["product_id"] for rec in recommendations
+                                              if rec["skipped"] == "missing_unit_cost"],
+                "changed": len(changes),
+                "changes": changes
+            }
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            if own_session:
+                db.close()
+
+
+def run_nightly_retune(dry_run: bool = False) -> Dict:
+    """Entry point for the nightly scheduled retune"""
+    return InventoryOptimizer().retune(dry_run=dry_run)
+
+
+if __name__ == "__main__":
+    import sys
+    result = run_nightly_retune(dry_run="--apply" not in sys.argv)
+    print(json.dumps({k: v for k, v in result.items() if k != "changes"}, indent=2))
@@ -6,10 +6,15 @@ Integrated decision-making capabilities for logistics operations
 
 import json
 import logging
+import os
+import uuid
 from datetime import datetime
 from typing import Dict, Any, List, Optional
 from rl_feedback_system import record_agent_action, record_action_outcome
 from ems_automation import trigger_restock_alert, trigger_purchase_order, trigger_shipment_notification
+from workflow_store import WorkflowStore
+from decision_cache import DecisionCache
+from database.supplier_scorecard import get_scorecards
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -17,7 +22,7 @@ logger = logging.getLogger(__name__)
 class LogisticsDecisionEngine:
     """AI-powered decision engine for logistics operations"""
     
-    def __init__(self):
+    def __init__(self, decision_cache: Optional[DecisionCache] = None):
         self.agent_id = "logistics_ai_decision_engine"
         self.capabilities = [
             "route_optimization",
@@ -26,9 +31,29 @@ class LogisticsDecisionEngine:
             "delay_risk_assessment",
             "supplier_selection"
         ]
+        # Opt-in memoization of repeated contexts
+        self.decision_cache = decision_cache
+    
+    def enable_cache(self, ttl_seconds: Optional[Dict[str, float]] = None, max_entries: int = 1024):
+        """Turn on decision memoization"""
+        self.decision_cache = DecisionCache(ttl_seconds, max_entries)
+    
+    def disable_cache(self):
+        self.decision_cache = None
     
     async def make_decision(self, decision_type: str, context: Dict[str, Any]) -> Dict[str, Any]:
         """Make AI-powered logistics decisions"""
+        if self.decision_cache is not None:
+            cached = self.decision_cache.get(decision_type, context)
+            if cached is not None:
+                return cached
+        
+        decision = await self._compute_decision(decision_type, context)
+        if self.decision_cache is not None:
+            self.decision_cache.put(decision_type, context, decision)
+        return decision
+    
+    async def _compute_decision(self, decision_type: str, context: Dict[str, Any]) -> Dict[str, Any]:
         try:
             if decision_type == "route_optimization":
                 return await self._optimize_routes(context)
@@ -277,13 +302,20 @@ class LogisticsDecisionEngine:
             0.82
         )
         
+        scorecards = self._supplier_scorecards([s.get("id") for s in suppliers if s.get("id")])
         scored_suppliers = []
         
         for supplier in suppliers:
-            # Calculate supplier score
-            reliability = supplier.get("reliability", 0.8)
-            cost_factor = supplier.get("cost_factor", 1.0)
-            lead_time = supplier.get("lead_time_days", 7)
+            # Measured performance wins over the caller's estimates once the supplier has receipts
+            card = scorecards.get(supplier.get("id"))
+            if card and card["received_orders"]:
+                reliability = card["on_time_rate"] * (1 - card["defect_rate"])
+                cost_factor = card["cost_index"]
+                lead_time = card["lead_time_mean_days"]
+            else:
+                reliability = supplier.get("reliability", 0.8)
+                cost_factor = supplier.get("cost_factor", 1.0)
+                lead_time = supplier.get("lead_time_days", 7)
             
             # Scoring algorithm
             reliability_score = reliability * 0.4
@@ -299,6 +331,7 @@ class LogisticsDecisionEngine:
                 "reliability": reliability,
                 "cost_factor": cost_factor,
                 "lead_time_days": lead_time,
+                "metrics_source": "scorecard" if card and card["received_orders"] else "context",
                 "recommendation": "preferred" if total_score > 0.7 else "acceptable" if total_score > 0.5 else "not_recommended"
             })
         
@@ -321,6 +354,16 @@ class LogisticsDecisionEngine:
         
         return decision
     
+    def _supplier_scorecards(self, supplier_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Scorecards for the candidate suppliers in one query; empty if unavailable"""
+        if not supplier_ids:
+            return {}
+        try:
+            return get_scorecards(supplier_ids)
+        except Exception as e:
+            logger.warning(f"Supplier scorecards unavailable: {e}")
+            return {}
+    
     def _default_decision(self, context: Dict[str, Any]) -> Dict[str, Any]:
         """Default decision for unknown types"""
         return {
@@ -333,13 +376,17 @@ class LogisticsDecisionEngine:
 class LogisticsWorkflowManager:
     """Manages logistics decision workflows"""
     
-    def __init__(self):
+    def __init__(self, store: Optional[WorkflowStore] = None):
         self.decision_engine = LogisticsDecisionEngine()
-        self.active_workflows = {}
+        # Set WORKFLOW_DB_PATH to keep workflows across restarts
+        self.workflows = store if store is not None else WorkflowStore(db_path=os.getenv("WORKFLOW_DB_PATH"))
+    
+    def _new_workflow_id(self, kind: str) -> str:
+        return f"{kind}_workflow_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
     
     async def process_order_workflow(self, order_data: Dict[str, Any]) -> Dict[str, Any]:
         """Process complete order workflow with AI decisions"""
-        workflow_id = f"order_workflow_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}"
+        workflow_id = self._new_workflow_id("order")
         
         workflow_results = {
             "workflow_id": workflow_id,
@@ -347,6 +394,7 @@ class LogisticsWorkflowManager:
             "decisions": [],
             "status": "processing"
         }
+        self.workflows.put(workflow_results)
         
         try:
             # Step 1: Route optimization
@@ -384,18 +432,19 @@ class LogisticsWorkflowManager:
             workflow_results["status"] = "failed"
             workflow_results["error"] = str(e)
         
-        self.active_workflows[workflow_id] = workflow_results
+        self.workflows.put(workflow_results)
         return workflow_results
     
     async def process_inventory_workflow(self, inventory_data: Dict[str, Any]) -> Dict[str, Any]:
         """Process inventory management workflow"""
-        workflow_id = f"inventory_workflow_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}"
+        workflow_id = self._new_workflow_id("inventory")
         
         workflow_results = {
             "workflow_id": workflow_id,
             "decisions": [],
             "status": "processing"
         }
+        self.workflows.put(workflow_results)
         
         try:
             # Step 1: Inventory forecasting
@@ -435,16 +484,24 @@ class LogisticsWorkflowManager:
             workflow_results["status"] = "failed"
             workflow_results["error"] = str(e)
         
-        self.active_workflows[workflow_id] = workflow_results
+        self.workflows.put(workflow_results)
         return workflow_results
     
     def get_workflow_status(self, workflow_id: str) -> Optional[Dict[str, Any]]:
         """Get workflow status"""
-        return self.active_workflows.get(workflow_id)
+        return self.workflows.get(workflow_id)
+    
+    def get_active_workflows(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get workflows still held in memory, oldest first"""
+        return self.workflows.recent(limit)
+    
+    def get_workflows_by_status(self, status: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get workflows in a given status, most recent first"""
+        return self.workflows.by_status(status, limit)
     
-    def get_active_workflows(self) -> List[Dict[str, Any]]:
-        """Get all active workflows"""
-        return list(self.active_workflows.values())
+    def get_workflow_counts(self) -> Dict[str, int]:
+        """Number of in-memory workflows per status"""
+        return self.workflows.count_by_status()
 
 # Global instances
 logistics_decision_engine = LogisticsDecisionEngine()
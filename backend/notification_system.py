@@ -10,6 +10,7 @@ from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 from database.service import DatabaseService
 from database.models import Alert, KPIMetric, NotificationLog
+from delivery_risk import DeliveryRiskScorer
 
 class NotificationSystem:
     """Comprehensive notification and alerting system"""
@@ -72,58 +73,44 @@ class NotificationSystem:
         """Check for delivery-related alerts"""
         alerts = []
         
-        with DatabaseService() as db_service:
-            shipments = db_service.get_shipments()
+        for shipment in DeliveryRiskScorer().score_all():
+            hours_elapsed = shipment['hours_since_created']
             
-            for shipment in shipments:
-                if shipment['status'] in ['delivered', 'cancelled']:
-                    continue
-                
-                created_at = shipment.get('created_at')
-                if not created_at:
-                    continue
-                
-                try:
-                    created_time = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-                    hours_elapsed = (datetime.now() - created_time.replace(tzinfo=None)).total_seconds() / 3600
-                    
-                    # Alert for shipments stuck in created status
-                    if shipment['status'] == 'created' and hours_elapsed > self.alert_thresholds['delivery_delay']:
-                        alerts.append({
-                            'type': 'delivery_delay',
-                            'severity': 'medium',
-                            'title': f'SHIPMENT DELAY: {shipment["tracking_number"]}',
-                            'message': f'Shipment for Order #{shipment["order_id"]} has been in created status for {hours_elapsed:.1f} hours.',
-                            'entity_type': 'shipment',
-                            'entity_id': shipment['tracking_number'],
-                            'data': {
-                                'order_id': shipment['order_id'],
-                                'status': shipment['status'],
-                                'hours_elapsed': hours_elapsed
-                            }
-                        })
-                    
-                    # Alert for overdue deliveries
-                    estimated_delivery = shipment.get('estimated_delivery')
-                    if estimated_delivery and shipment['status'] not in ['delivered']:
-                        est_time = datetime.fromisoformat(estimated_delivery.replace('Z', '+00:00'))
-                        if datetime.now() > est_time.replace(tzinfo=None):
-                            alerts.append({
-                                'type': 'delivery_overdue',
-                                'severity': 'high',
-                                'title': f'OVERDUE DELIVERY: {shipment["tracking_number"]}',
-                                'message': f'Shipment for Order #{shipment["order_id"]} is overdue (estimated: {estimated_delivery[:10]}).',
-                                'entity_type': 'shipment',
-                                'entity_id': shipment['tracking_number'],
-                                'data': {
-                                    'order_id': shipment['order_id'],
-                                    'estimated_delivery': estimated_delivery,
-                                    'current_status': shipment['status']
-                                }
-                            })
-                
-                except (ValueError, TypeError) as e:
-                    continue
+            # Alert for shipments stuck in created status
+            if shipment['status'] == 'created' and hours_elapsed is not None \
+                    and hours_elapsed > self.alert_thresholds['delivery_delay']:
+                alerts.append({
+                    'type': 'delivery_delay',
+                    'severity': 'medium',
+                    'title': f'SHIPMENT DELAY: {shipment["tracking_number"]}',
+                    'message': f'Shipment for Order #{shipment["order_id"]} has been in created status for {hours_elapsed:.1f} hours.',
+                    'entity_type': 'shipment',
+                    'entity_id': shipment['tracking_number'],
+                    'data': {
+                        'order_id': shipment['order_id'],
+                        'status': shipment['status'],
+                        'hours_elapsed': hours_elapsed,
+                        'risk_score': shipment['risk_score']
+                    }
+                })
+            
+            # Alert for overdue deliveries
+            if shipment['overdue']:
+                estimated_delivery = shipment['estimated_delivery']
+                alerts.append({
+                    'type': 'delivery_overdue',
+                    'severity': 'high',
+                    'title': f'OVERDUE DELIVERY: {shipment["tracking_number"]}',
+                    'message': f'Shipment for Order #{shipment["order_id"]} is overdue (estimated: {estimated_delivery[:10]}).',
+                    'entity_type': 'shipment',
+                    'entity_id': shipment['tracking_number'],
+                    'data': {
+                        'order_id': shipment['order_id'],
+                        'estimated_delivery': estimated_delivery,
+                        'current_status': shipment['status'],
+                        'risk_score': shipment['risk_score']
+                    }
+                })
         
         return alerts
     
@@ -10,12 +10,43 @@ from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 from database.service import DatabaseService
 from database.models import PurchaseOrder, Supplier, Inventory
+from rfq import run_rfq
+
+# Reorders top stock up to this far from the reorder point towards max stock
+ORDER_UP_TO_FRACTION = 0.6
+
+# Mock supplier data (in production, this would come from database);
+# endpoints are the supplier apps mounted by supplier_api.main_app
+MOCK_SUPPLIERS = {
+    'SUPPLIER_001': {
+        'supplier_id': 'SUPPLIER_001',
+        'name': 'TechParts Supply Co.',
+        'api_endpoint': 'http://localhost:8001/SUPPLIER_001/api',
+        'lead_time_days': 5,
+        'minimum_order': 10
+    },
+    'SUPPLIER_002': {
+        'supplier_id': 'SUPPLIER_002',
+        'name': 'Global Components Ltd.',
+        'api_endpoint': 'http://localhost:8001/SUPPLIER_002/api',
+        'lead_time_days': 7,
+        'minimum_order': 5
+    },
+    'SUPPLIER_003': {
+        'supplier_id': 'SUPPLIER_003',
+        'name': 'FastTrack Logistics',
+        'api_endpoint': 'http://localhost:8001/SUPPLIER_003/api',
+        'lead_time_days': 3,
+        'minimum_order': 20
+    }
+}
 
 class ProcurementAgent:
     """Autonomous procurement agent"""
     
-    def __init__(self):
+    def __init__(self, rfq_timeout: float = 3.0):
         self.confidence_threshold = 0.7
+        self.rfq_timeout = rfq_timeout
         
     def scan_inventory_levels(self) -> List[Dict]:
         """Scan inventory for items that need reordering"""
@@ -26,31 +57,38 @@ class ProcurementAgent:
             low_stock_items = []
             
             for item in inventory_items:
-                current_stock = item['CurrentStock']
-                reorder_point = item['ReorderPoint']
+                reorder_item = self.build_reorder_item(
+                    item['ProductID'], item['CurrentStock'], item['ReorderPoint'], item['MaxStock']
+                )
                 
-                if current_stock <= reorder_point:
-                    # Calculate suggested order quantity (more reasonable amounts)
-                    max_stock = item['MaxStock']
-                    deficit = reorder_point - current_stock
-                    # Order enough to reach optimal stock level (between reorder point and max)
-                    optimal_stock = reorder_point + (max_stock - reorder_point) * 0.6
-                    suggested_qty = max(deficit, int(optimal_stock - current_stock))
-                    
-                    low_stock_items.append({
-                        'product_id': item['ProductID'],
-                        'current_stock': current_stock,
-                        'reorder_point': reorder_point,
-                        'max_stock': max_stock,
-                        'suggested_quantity': suggested_qty,
-                        'urgency': 'critical' if current_stock == 0 else 'high' if current_stock < reorder_point * 0.5 else 'normal'
-                    })
-                    
-                    print(f"📉 Low stock: {item['ProductID']} ({current_stock}/{reorder_point}) - Suggested order: {suggested_qty}")
+                if reorder_item:
+                    low_stock_items.append(reorder_item)
+                    print(f"📉 Low stock: {item['ProductID']} ({item['CurrentStock']}/{item['ReorderPoint']}) - Suggested order: {reorder_item['suggested_quantity']}")
             
             print(f"🎯 Found {len(low_stock_items)} items needing reorder")
             return low_stock_items
     
+    def build_reorder_item(self, product_id: str, current_stock: int, reorder_point: int,
+                           max_stock: int) -> Optional[Dict]:
+        """Reorder suggestion for one item, or None if stock is above the reorder point"""
+        if current_stock > reorder_point:
+            return None
+        
+        # Calculate suggested order quantity (more reasonable amounts)
+        deficit = reorder_point - current_stock
+        # Order enough to reach optimal stock level (between reorder point and max)
+        optimal_stock = reorder_point + (max_stock - reorder_point) * ORDER_UP_TO_FRACTION
+        suggested_qty = max(deficit, int(optimal_stock - current_stock))
+        
+        return {
+            'product_id': product_id,
+            'current_stock': current_stock,
+            'reorder_point': reorder_point,
+            'max_stock': max_stock,
+            'suggested_quantity': suggested_qty,
+            'urgency': 'critical' if current_stock == 0 else 'high' if current_stock < reorder_point * 0.5 else 'normal'
+        }
+    
     def get_supplier_for_product(self, product_id: str) -> Optional[Dict]:
         """Get supplier information for a product"""
         with DatabaseService() as db_service:
@@ -65,32 +103,32 @@ class ProcurementAgent:
             # For now, we'll use the supplier_id from inventory
             supplier_id = getattr(product_inventory, 'supplier_id', 'SUPPLIER_001')
             
-            # Mock supplier data (in production, this would come from database)
-            suppliers = {
-                'SUPPLIER_001': {
-                    'supplier_id': 'SUPPLIER_001',
-                    'name': 'TechParts Supply Co.',
-                    'api_endpoint': 'http://localhost:8001/api',
-                    'lead_time_days': 5,
-                    'minimum_order': 10
-                },
-                'SUPPLIER_002': {
-                    'supplier_id': 'SUPPLIER_002',
-                    'name': 'Global Components Ltd.',
-                    'api_endpoint': 'http://localhost:8001/api',
-                    'lead_time_days': 7,
-                    'minimum_order': 5
-                },
-                'SUPPLIER_003': {
-                    'supplier_id': 'SUPPLIER_003',
-                    'name': 'FastTrack Logistics',
-                    'api_endpoint': 'http://localhost:8001/api',
-                    'lead_time_days': 3,
-                    'minimum_order': 20
-                }
-            }
-            
-            return suppliers.get(supplier_id)
+            return MOCK_SUPPLIERS.get(supplier_id)
+    
+    def get_eligible_suppliers(self) -> List[Dict]:
+        """Active suppliers that can be asked for quotes"""
+        with DatabaseService() as db_service:
+            suppliers = [s for s in db_service.get_suppliers() if s.get('api_endpoint')]
+        return suppliers or list(MOCK_SUPPLIERS.values())
+    
+    def request_quotes(self, items: List[Dict]) -> Dict[str, Dict]:
+        """Best quote per item from all eligible suppliers, queried concurrently"""
+        if not items:
+            return {}
+        
+        suppliers = self.get_eligible_suppliers()
+        try:
+            rfq = run_rfq(items, suppliers, timeout=self.rfq_timeout)
+        except Exception as e:
+            print(f"⚠️  Request for quotes failed, falling back to catalog suppliers and prices: {e}")
+            return {}
+        
+        print(f"💬 Requested quotes from {rfq['suppliers_queried']} suppliers in {rfq['elapsed_ms']:.0f} ms")
+        suppliers_by_id = {s['supplier_id']: s for s in suppliers}
+        for line in rfq['lines'].values():
+            best = line['best_quote']
+            line['supplier'] = suppliers_by_id.get(best['supplier_id']) if best else None
+        return rfq['lines']
     
     def calculate_procurement_confidence(self, product_id: str, quantity: int, urgency: str) -> float:
         """Calculate confidence score for procurement decision"""
@@ -110,21 +148,17 @@ class ProcurementAgent:
         elif quantity > 30:
             base_confidence -= 0.1
         
-        # Check historical procurement success
-        with DatabaseService() as db_service:
-            # In production, we'd check historical PO success rates
-            # For now, we'll use a simple heuristic
-            pass
-        
+        # In production, we'd also factor in historical PO success rates
         return max(0.1, min(1.0, base_confidence))
     
-    def create_purchase_order(self, product_id: str, quantity: int, supplier: Dict, urgency: str = 'normal') -> Optional[str]:
-        """Create purchase order with supplier"""
+    def create_purchase_order(self, product_id: str, quantity: int, supplier: Dict, urgency: str = 'normal',
+                              unit_cost: Optional[float] = None) -> Optional[str]:
+        """Create purchase order with supplier, at the quoted unit cost when there is one"""
         print(f"📋 Creating purchase order: {product_id} x{quantity} from {supplier['name']}")
 
         try:
-            # Get product pricing (mock data for now)
-            unit_cost = self.get_product_cost(product_id, supplier)
+            # Fall back to product pricing (mock data for now) without a quote
+            unit_cost = unit_cost or self.get_product_cost(product_id, supplier)
             total_cost = unit_cost * quantity
 
             # Generate mock PO response (simulating successful supplier API call)
@@ -234,7 +268,10 @@ class ProcurementAgent:
             low_stock_items = self.scan_inventory_levels()
             results['items_needing_reorder'] = len(low_stock_items)
             
-            # Step 2: Process each low stock item
+            # Step 2: Ask all eligible suppliers for quotes at once
+            quotes = self.request_quotes(low_stock_items)
+            
+            # Step 3: Process each low stock item
             for item in low_stock_items:
                 product_id = item['product_id']
                 quantity = item['suggested_quantity']
@@ -260,11 +297,13 @@ class ProcurementAgent:
                     print(f"⚠️  {product_id} submitted for human review (confidence: {confidence:.2f})")
                     
                 else:
-                    # Auto-execute high confidence procurement
-                    supplier = self.get_supplier_for_product(product_id)
+                    # Auto-execute high confidence procurement with the best quote, if any
+                    quote = quotes.get(product_id) or {}
+                    supplier = quote.get('supplier') or self.get_supplier_for_product(product_id)
+                    unit_cost = quote['best_quote']['unit_price'] if quote.get('supplier') else None
                     
                     if supplier:
-                        order_id = self.create_purchase_order(product_id, quantity, supplier, urgency)
+                        order_id = self.create_purchase_order(product_id, quantity, supplier, urgency, unit_cost)
                         
                         if order_id:
                             results['purchase_orders_created'] += 1
@@ -273,7 +312,7 @@ class ProcurementAgent:
                     else:
                         results['errors'].append(f"No supplier found for {product_id}")
             
-            # Step 3: Log completion
+            # Step 4: Log completion
             with DatabaseService() as db_service:
                 db_service.log_agent_action(
                     action="procurement_cycle_completed",
@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+"""
+Offline Replay Simulator for Agent Policies
+Rebuilds inventory, order and return history from the database and re-runs
+the restock, procurement and delivery decision logic against it, so policy
+changes can be compared on real past traffic instead of simulated outcomes.
+"""
+
+import heapq
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from database.models import (
+    SessionLocal, Order, Return, RestockRequest, AgentLog, Inventory, Supplier, PurchaseOrder
+)
+from agent import THRESHOLD
+from human_review import HumanReviewSystem
+from procurement_agent import ProcurementAgent
+from delivery_agent import DeliveryAgent
+
+# Logged agent actions that correspond to a replayable decision
+LOGGED_DECISIONS = {
+    "purchase_order_created": ("procurement", "auto"),
+    "procurement_review_needed": ("procurement", "review"),
+    "shipment_created": ("delivery", "auto"),
+    "delivery_review_needed": ("delivery", "review"),
+}
+
+# Process orders first when events share a timestamp so stock-outs are not hidden
+EVENT_ORDER = {"order": 0, "return": 1}
+
+
+@dataclass
+class ReplayEvent:
+    """One historical event on the replay timeline"""
+    timestamp: datetime
+    kind: str  # order, return
+    product_id: str
+    quantity: int
+    ref: Optional[str] = None
+    data: Dict = field(default_factory=dict)
+
+
+@dataclass
+class ReplayDecision:
+    """A decision made by a policy during replay"""
+    timestamp: datetime
+    agent: str  # restock, procurement, delivery
+    product_id: str
+    quantity: int
+    confidence: float
+    outcome: str  # auto, review
+    details: Dict = field(default_factory=dict)
+
+
+@dataclass
+class ReplayHistory:
+    """Everything the replay needs, loaded once from the database"""
+    events: List[ReplayEvent]
+    logged_decisions: List[Dict]
+    inventory: Dict[str, Dict]
+    start: datetime
+    end: datetime
+
+
+class _ReplayReviewSystem(HumanReviewSystem):
+    """Review rules with product history taken from the replayed timeline"""
+
+    def __init__(self):
+        super().__init__()
+        self.seen_products = set()
+
+    def _has_historical_data(self, product_id: str) -> bool:
+        return product_id in self.seen_products
+
+
+class ReplayPolicy:
+    """Decision logic used during replay.
+
+    The defaults reproduce the production agents: the restock plan and review
+    rules from ``agent.py``/``human_review.py``, the reorder scan and
+    confidence from ``ProcurementAgent`` and courier selection from
+    ``DeliveryAgent``. Candidate policies change the constructor arguments
+    or override the ``decide_*`` methods.
+    """
+
+    def __init__(self, name: str = "baseline", return_threshold: int = THRESHOLD,
+                 confidence_threshold: float = 0.7, procurement_review_quantity: int = 20,
+                 delivery_review_quantity: int = 10):
+        self.name = name
+        self.return_threshold = return_threshold
+        self.confidence_threshold = confidence_threshold
+        self.procurement_review_quantity = procurement_review_quantity
+        self.delivery_review_quantity = delivery_review_quantity
+
+        self.review_system = _ReplayReviewSystem()
+        self.review_system.confidence_threshold = confidence_threshold
+        self.procurement_agent = ProcurementAgent()
+        self.delivery_agent = DeliveryAgent()
+
+    def reset(self):
+        self.review_system.seen_products.clear()
+
+    def decide_restock(self, event: ReplayEvent) -> Optional[ReplayDecision]:
+        # Same rule as agent.plan(): only returns above the threshold are restocked
+        needs_restock = event.quantity > self.return_threshold
+        self.review_system.seen_products.add(event.product_id)
+        if not needs_restock:
+            return None
+
+        data = {"product_id": event.product_id, "quantity": event.quantity}
+        confidence = self.review_system.calculate_confidence("restock", data)
+        outcome = "review" if confidence < self.confidence_threshold else "auto"
+        return ReplayDecision(event.timestamp, "restock", event.product_id, event.quantity, confidence, outcome)
+
+    def decide_procurement(self, timestamp: datetime, product_id: str, stock: int,
+                           item: Dict) -> Optional[ReplayDecision]:
+        reorder = self.procurement_agent.build_reorder_item(
+            product_id, stock, item["reorder_point"], item["max_stock"]
+        )
+        if not reorder:
+            return None
+
+        quantity = reorder["suggested_quantity"]
+        confidence = self.procurement_agent.calculate_procurement_confidence(
+            product_id, quantity, reorder["urgency"]
+        )
+        needs_review = confidence < self.confidence_threshold or quantity > self.procurement_review_quantity
+        return ReplayDecision(timestamp, "procurement", product_id, quantity, confidence,
+                              "review" if needs_review else "auto", {"urgency": reorder["urgency"]})
+
+    def decide_delivery(self, timestamp: datetime, event: ReplayEvent) -> ReplayDecision:
+        order = {
+            "order_id": event.ref,
+            "product_id": event.product_id,
+            "quantity": event.quantity,
+            "urgency": self.delivery_agent.determine_urgency({"Quantity": event.quantity})
+        }
+        courier = self.delivery_agent.select_courier(order, order["urgency"])
+        confidence = self.delivery_agent.calculate_delivery_confidence(order, courier)
+        needs_review = confidence < self.confidence_threshold or event.quantity > self.delivery_review_quantity
+        return ReplayDecision(timestamp, "delivery", event.product_id, event.quantity, confidence,
+                              "review" if needs_review else "auto",
+                              {"order_id": event.ref, "courier_id": courier["courier_id"],
+                               "delivery_days": courier["delivery_days"]})
+
+
+def load_history(db=None, start: Optional[datetime] = None,
+                 end: Optional[datetime] = None) -> ReplayHistory:
+    """Load the replay timeline from the orders, returns, restock_requests and agent_logs tables.
+
+    Opening stock for each product is reconstructed by rolling the current
+    inventory back over the window: units shipped for orders are added back
+    and completed restocks and delivered purchase orders are taken out.
+    """
+    own_session = db is None
+    db = db or SessionLocal()
+    try:
+        def in_window(query, column):
+            if start:
+                query = query.filter(column >= start)
+            if end:
+                query = query.filter(column <= end)
+            return query
+
+        events = []
+        for order in in_window(db.query(Order), Order.order_date).all():
+            if order.order_date and order.product_id and (order.status or "").lower() != "cancelled":
+                events.append(ReplayEvent(order.order_date, "order", order.product_id,
+                                          order.quantity or 1, str(order.order_id)))
+        for ret in in_window(db.query(Return), Return.return_date).all():
+            if ret.return_date:
+                events.append(ReplayEvent(ret.return_date, "return", ret.product_id,
+                                          ret.return_quantity, str(ret.id), {"reason": ret.reason}))
+        events.sort(key=lambda e: (e.timestamp, EVENT_ORDER[e.kind]))
+
+        logged = []
+        for log in in_window(db.query(AgentLog), AgentLog.timestamp).all():
+            if log.action in LOGGED_DECISIONS and log.product_id:
+                agent, outcome = LOGGED_DECISIONS[log.action]
+                logged.append({"timestamp": log.timestamp, "agent": agent, "product_id": log.product_id,
+                               "quantity": log.quantity or 0, "outcome": outcome})
+        replenished = defaultdict(int)
+        for request in in_window(db.query(RestockRequest), RestockRequest.created_at).all():
+            logged.append({"timestamp": request.created_at, "agent": "restock",
+                           "product_id": request.product_id, "quantity": request.restock_quantity,
+                           "outcome": "auto"})
+            if request.completed_at and (not end or request.completed_at <= end):
+                replenished[request.product_id] += request.restock_quantity
+        delivered_pos = in_window(db.query(PurchaseOrder), PurchaseOrder.delivered_at) \
+            .filter(PurchaseOrder.delivered_at.isnot(None)).all()
+        for po in delivered_pos:
+            replenished[po.product_id] += po.quantity
+
+        lead_times = {s.supplier_id: s.lead_time_days for s in db.query(Supplier).all()}
+        ordered_units = defaultdict(int)
+        for event in events:
+            if event.kind == "order":
+                ordered_units[event.product_id] += event.quantity
+
+        inventory = {}
+        for item in db.query(Inventory).all():
+            opening = (item.current_stock or 0) + ordered_units[item.product_id] - replenished[item.product_id]
+            inventory[item.product_id] = {
+                "opening_stock": max(0, opening),
+                "reorder_point": item.reorder_point or 0,
+                "max_stock": item.max_stock or 0,
+                "unit_cost": item.unit_cost or 0.0,
+                "lead_time_days": lead_times.get(item.supplier_id) or 7
+            }
+
+        timestamps = [e.timestamp for e in events]
+        return ReplayHistory(
+            events=events,
+            logged_decisions=logged,
+            inventory=inventory,
+            start=start or (min(timestamps) if timestamps else datetime.now()),
+            end=end or (max(timestamps) if timestamps else datetime.now())
+        )
+    finally:
+        if own_session:
+            db.close()
+
+
+class ReplaySimulator:
+    """Runs a policy over a loaded history in simulated time.
+
+    Events are applied in timestamp order; agents act at cycle boundaries
+    (every ``cycle_interval``) the way the scheduled agents do in
+    production. Only products whose state changed since the last cycle are
+    re-scanned, so quiet stretches of history cost nothing and a year of
+    traffic replays in seconds.
+
+    Modeling assumptions: auto-approved restocks return units to stock at
+    the cycle they are approved, auto-approved purchase orders arrive after
+    the supplier lead time, decisions sent to human review are not executed,
+    and a product with a purchase order in transit is not re-ordered.
+    """
+
+    def __init__(self, history: ReplayHistory, cycle_interval: timedelta = timedelta(hours=1)):
+        self.history = history
+        self.cycle_interval = cycle_interval
+
+    def run(self, policy: Optional[ReplayPolicy] = None) -> Dict:
+        policy = policy or ReplayPolicy()
+        policy.reset()
+        started = time.perf_counter()
+
+        inventory = self.history.inventory
+        stock = {pid: item["opening_stock"] for pid, item in inventory.items()}
+        in_transit: List[Tuple[datetime, str, int]] = []
+        pending_returns: List[ReplayEvent] = []
+        pending_orders: List[ReplayEvent] = []
+        dirty = set(inventory)
+        decisions: List[ReplayDecision] = []
+
+        kpis = defaultdict(float)
+        stock_time = defaultdict(float)
+        last_change = {pid: self.history.start for pid in stock}
+
+        def set_stock(pid: str, value: int, at: datetime):
+            stock_time[pid] += stock[pid] * (at - last_change[pid]).total_seconds()
+            last_change[pid] = at
+            stock[pid] = value
+            dirty.add(pid)
+
+        def run_cycle(at: datetime):
+            # Deliveries from suppliers that are due
+            while in_transit and in_transit[0][0] <= at:
+                _, pid, quantity = heapq.heappop(in_transit)
+                set_stock(pid, stock[pid] + quantity, at)
+
+            for event in pending_returns:
+                decision = policy.decide_restock(event)
+                if decision:
+                    decision.timestamp = at
+                    decisions.append(decision)
+                    if decision.outcome == "auto" and event.product_id in stock:
+                        set_stock(event.product_id, stock[event.product_id] + decision.quantity, at)
+            pending_returns.clear()
+
+            for event in pending_orders:
+                decisions.append(policy.decide_delivery(at, event))
+            pending_orders.clear()
+
+            on_order = {pid for _, pid, _ in in_transit}
+            for pid in sorted(dirty):
+                if pid in on_order or pid not in inventory:
+                    continue
+                decision = policy.decide_procurement(at, pid, stock[pid], inventory[pid])
+                if decision:
+                    decisions.append(decision)
+                    if decision.outcome == "auto":
+                        arrival = at + timedelta(days=inventory[pid]["lead_time_days"])
+                        heapq.heappush(in_transit, (arrival, pid, decision.quantity))
+                        kpis["procurement_spend"] += decision.quantity * inventory[pid]["unit_cost"]
+            dirty.clear()
+
+        next_cycle = self.history.start
+        for event in self.history.events:
+            while next_cycle <= event.timestamp:
+                run_cycle(next_cycle)
+                # Skip idle cycles: nothing happens until the next event or supplier delivery
+                upcoming = min([event.timestamp] + [t for t, _, _ in in_transit[:1]])
+                gap = max(1, int((upcoming - next_cycle) / self.cycle_interval))
+                next_cycle += self.cycle_interval * gap
+
+            if event.kind == "order":
+                kpis["orders"] += 1
+                kpis["units_demanded"] += event.quantity
+                available = stock.get(event.product_id, 0)
+                filled = min(available, event.quantity)
+                kpis["units_fulfilled"] += filled
+                if filled < event.quantity:
+                    kpis["stockouts"] += 1
+                if event.product_id in stock and filled:
+                    set_stock(event.product_id, available - filled, event.timestamp)
+                pending_orders.append(event)
+            else:
+                kpis["returns"] += 1
+                pending_returns.append(event)
+
+        run_cycle(next_cycle)
+        end = max(self.history.end, next_cycle)
+        for pid in stock:
+            set_stock(pid, stock[pid], end)
+
+        elapsed = time.perf_counter() - started
+        simulated_seconds = max((end - self.history.start).total_seconds(), 0.0)
+        return {
+            "policy": policy.name,
+            "window": {"start": self.history.start.isoformat(), "end": end.isoformat()},
+            "events": len(self.history.events),
+            "decisions": len(decisions),
+            "wall_seconds": round(elapsed, 4),
+            "speedup": round(simulated_seconds / elapsed) if elapsed else None,
+            "kpis": self._kpis(kpis, decisions, stock_time, simulated_seconds),
+            "decision_diff": self._diff(decisions),
+            "decision_log": decisions
+        }
+
+    def _kpis(self, kpis: Dict, decisions: List[ReplayDecision], stock_time: Dict,
+              simulated_seconds: float) -> Dict:
+        by_agent = defaultdict(lambda: {"auto": 0, "review": 0, "units": 0})
+        for decision in decisions:
+            counts = by_agent[decision.agent]
+            counts[decision.outcome] += 1
+            if decision.outcome == "auto":
+                counts["units"] += decision.quantity
+
+        total = len(decisions)
+        automated = sum(counts["auto"] for counts in by_agent.values())
+        unit_costs = {pid: item["unit_cost"] for pid, item in self.history.inventory.items()}
+        average_value = sum(stock_time[pid] * unit_costs[pid] for pid in stock_time) / simulated_seconds \
+            if simulated_seconds else 0.0
+        return {
+            "orders": int(kpis["orders"]),
+            "returns": int(kpis["returns"]),
+            "fill_rate": round(kpis["units_fulfilled"] / kpis["units_demanded"], 4) if kpis["units_demanded"] else 1.0,
+            "stockouts": int(kpis["stockouts"]),
+            "automation_rate": round(automated / total, 4) if total else 1.0,
+            "procurement_spend": round(kpis["procurement_spend"], 2),
+            "average_inventory_value": round(average_value, 2),
+            "decisions_by_agent": {agent: dict(counts) for agent, counts in by_agent.items()}
+        }
+
+    def _diff(self, decisions: List[ReplayDecision]) -> List[Dict]:
+        """Per (agent, product) differences between logged and replayed decisions"""
+        def tally(rows):
+            totals = defaultdict(lambda: {"auto": 0, "review": 0, "units": 0})
+            for agent, pid, outcome, quantity in rows:
+                counts = totals[(agent, pid)]
+                counts[outcome] += 1
+                counts["units"] += quantity
+            return totals
+
+        logged = tally((d["agent"], d["product_id"], d["outcome"], d["quantity"])
+                       for d in self.history.logged_decisions)
+        replayed = tally((d.agent, d.product_id, d.outcome, d.quantity) for d in decisions)
+
+        diffs = []
+        for key in sorted(set(logged) | set(replayed)):
+            before, after = logged.get(key), replayed.get(key)
+            if before != after:
+                diffs.append({"agent": key[0], "product_id": key[1], "logged": before, "replayed": after})
+        return diffs
+
+
+def compare_policies(history: ReplayHistory, baseline: ReplayPolicy, candidate: ReplayPolicy,
+                     cycle_interval: timedelta = timedelta(hours=1)) -> Dict:
+    """Replay two policies on the same history and report KPI deltas and changed decisions"""
+    simulator = ReplaySimulator(history, cycle_interval)
+    before = simulator.run(baseline)
+    after = simulator.run(candidate)
+
+    deltas = {
+        key: round(after["kpis"][key] - before["kpis"][key], 4)
+        for key, value in before["kpis"].items() if isinstance(value, (int, float))
+    }
+
+    def keyed(report):
+        return {(d.agent, d.product_id, d.timestamp, d.details.get("order_id")): d
+                for d in report["decision_log"]}
+
+    old, new = keyed(before), keyed(after)
+    changed = []
+    for key in sorted(set(old) | set(new), key=lambda k: (k[2], k[0], k[1], str(k[3]))):
+        a, b = old.get(key), new.get(key)
+        if not a or not b or (a.outcome, a.quantity) != (b.outcome, b.quantity):
+            changed.append({
+                "agent": key[0], "product_id": key[1], "timestamp": key[2].isoformat(),
+                "baseline": {"outcome": a.outcome, "quantity": a.quantity} if a else None,
+                "candidate": {"outcome": b.outcome, "quantity": b.quantity} if b else None
+            })
+
+    return {"baseline": before, "candidate": after, "kpi_deltas": deltas, "changed_decisions": changed}
+
+
+def run_replay(days: int = 30, cycle_hours: float = 1.0) -> Dict:
+    """Replay the last ``days`` of history with the production policy"""
+    end = datetime.utcnow()
+    history = load_history(start=end - timedelta(days=days), end=end)
+    report = ReplaySimulator(history, timedelta(hours=cycle_hours)).run()
+    report.pop("decision_log")
+    return report
+
+
+if __name__ == "__main__":
+    import json
+    print(json.dumps(run_replay(), indent=2, default=str))
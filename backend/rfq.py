@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Request-for-Quote Fan-out
+Asks every eligible supplier for price, availability and lead time at once
+through a pooled async HTTP client, then picks the best quote per order line.
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional
+
+import httpx
+
+# Days of lead time worth one percent of unit price, by urgency; urgent lines
+# trade more money for speed
+LEAD_TIME_WEIGHT = {
+    "normal": 0.01,
+    "high": 0.03,
+    "critical": 0.10,
+}
+
+
+@dataclass
+class Quote:
+    """One supplier's answer for one product"""
+    supplier_id: str
+    product_id: str
+    unit_price: Optional[float] = None
+    available_quantity: int = 0
+    in_stock: bool = False
+    lead_time_days: Optional[float] = None
+    minimum_order: int = 1
+    latency_ms: float = 0.0
+    error: Optional[str] = None
+
+    def can_fill(self, quantity: int) -> bool:
+        return (self.error is None and self.in_stock and self.unit_price is not None
+                and self.available_quantity >= quantity and quantity >= self.minimum_order)
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+def _quote_score(quote: Quote, urgency: str) -> float:
+    """Unit price inflated by lead time; lower is better"""
+    weight = LEAD_TIME_WEIGHT.get(urgency, LEAD_TIME_WEIGHT["normal"])
+    return quote.unit_price * (1 + weight * (quote.lead_time_days or 0))
+
+
+def select_best_quotes(lines: List[Dict], quotes: List[Quote]) -> Dict[str, Dict]:
+    """Best quote per line among suppliers that can fill the whole quantity.
+
+    Each line needs ``product_id`` and ``quantity`` (``suggested_quantity``
+    from the procurement scan is accepted too) and may carry ``urgency``.
+    """
+    by_product: Dict[str, List[Quote]] = {}
+    for quote in quotes:
+        by_product.setdefault(quote.product_id, []).append(quote)
+
+    selections = {}
+    for line in lines:
+        product_id = line["product_id"]
+        quantity = line.get("quantity", line.get("suggested_quantity", 0))
+        urgency = line.get("urgency", "normal")
+        received = by_product.get(product_id, [])
+        eligible = [q for q in received if q.can_fill(quantity)]
+        best = min(eligible, key=lambda q: (_quote_score(q, urgency), q.supplier_id), default=None)
+        selections[product_id] = {
+            "product_id": product_id,
+            "quantity": quantity,
+            "best_quote": best.to_dict() if best else None,
+            "quotes_received": sum(1 for q in received if q.error is None),
+            "eligible_quotes": len(eligible),
+            "errors": {q.supplier_id: q.error for q in received if q.error}
+        }
+    return selections
+
+
+class RFQClient:
+    """Concurrent quote requests over one pooled ``httpx.AsyncClient``.
+
+    Every (supplier, product) request is issued at once and at most
+    ``max_connections`` are in flight, matching the connection pool. Each
+    request's deadline starts once it holds a slot, so time spent queued
+    behind other requests is never counted against a supplier, and a round
+    takes as long as the slowest supplier that answers in time rather than
+    the sum of all of them. Slow or failing suppliers produce a quote with
+    ``error`` set instead of failing the round.
+    """
+
+    def __init__(self, timeout: float = 3.0, max_connections: int = 50,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self):
+        self._slots = asyncio.Semaphore(self.max_connections)
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(self.timeout),
+            limits=httpx.Limits(max_connections=self.max_connections,
+                                max_keepalive_connections=self.max_connections),
+            transport=self.transport
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self._client.aclose()
+        self._client = None
+        self._slots = None
+
+    async def _fetch_quote(self, supplier: Dict, product_id: str) -> Quote:
+        quote = Quote(supplier_id=supplier["supplier_id"], product_id=product_id)
+        url = f"{supplier['api_endpoint'].rstrip('/')}/inventory/{product_id}"
+        async with self._slots:
+            started = time.perf_counter()
+            try:
+                response = await asyncio.wait_for(self._client.get(url), timeout=self.timeout)
+                response.raise_for_status()
+                data = response.json()
+                quote.unit_price = float(data["unit_price"])
+                quote.available_quantity = int(data.get("available_quantity", 0))
+                quote.in_stock = bool(data.get("in_stock", quote.available_quantity > 0))
+                quote.lead_time_days = float(data.get("lead_time_days", supplier.get("lead_time_days", 7)))
+                quote.minimum_order = int(data.get("minimum_order") or supplier.get("minimum_order") or 1)
+            except asyncio.TimeoutError:
+                quote.error = f"timeout after {self.timeout}s"
+            except httpx.HTTPStatusError as e:
+                quote.error = f"HTTP {e.response.status_code}"
+            except (httpx.HTTPError, KeyError, ValueError, TypeError) as e:
+                quote.error = f"{type(e).__name__}: {e}"
+            quote.latency_ms = round((time.perf_counter() - started) * 1000, 1)
+        return quote
+
+    async def request_quotes(self, lines: List[Dict], suppliers: List[Dict]) -> List[Quote]:
+        """Quotes from every supplier with an API endpoint for every line"""
+        if self._client is None:
+            async with self:
+                return await self.request_quotes(lines, suppliers)
+
+        products = list(dict.fromkeys(line["product_id"] for line in lines))
+        tasks = [self._fetch_quote(supplier, product_id)
+                 for supplier in suppliers if supplier.get("api_endpoint")
+                 for product_id in products]
+        return list(await asyncio.gather(*tasks))
+
+    async def run(self, lines: List[Dict], suppliers: List[Dict]) -> Dict:
+        started = time.perf_counter()
+        quotes = await self.request_quotes(lines, suppliers)
+        return {
+            "lines": select_best_quotes(lines, quotes),
+            "quotes": [q.to_dict() for q in quotes],
+            "suppliers_queried": sum(1 for s in suppliers if s.get("api_endpoint")),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+            "slowest_quote_ms": max((q.latency_ms for q in quotes), default=0.0)
+        }
+
+
+async def arun_rfq(lines: List[Dict], suppliers: List[Dict], timeout: float = 3.0,
+                   max_connections: int = 50,
+                   transport: Optional[httpx.AsyncBaseTransport] = None) -> Dict:
+    """Entry point for callers already running in an event loop"""
+    return await RFQClient(timeout, max_connections, transport).run(lines, suppliers)
+
+
+def run_rfq(lines: List[Dict], suppliers: List[Dict], timeout: float = 3.0,
+            max_connections: int = 50,
+            transport: Optional[httpx.AsyncBaseTransport] = None) -> Dict:
+    """Synchronous entry point; async code should await ``arun_rfq`` instead.
+
+    Sync code reached from inside a running event loop cannot use
+    ``asyncio.run`` there, so the round then runs on its own loop in a
+    worker thread while the caller waits.
+    """
+    round_ = arun_rfq(lines, suppliers, timeout, max_connections, transport)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(round_)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, round_).result()
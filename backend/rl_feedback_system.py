@@ -4,14 +4,20 @@ Noopur's Rishabh RL Feedback System
 Reinforcement Learning with reward/penalty loops for AI agent optimization
 """
 
+import copy
 import json
+import threading
+import uuid
 import numpy as np
+from collections import OrderedDict, deque
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional
 from enum import Enum
 from dataclasses import dataclass
 import pickle
 import os
+from rl_learning_store import RLLearningStore
+from rl_bandit_policy import LinUCBPolicy, evaluate_offline
 
 class ActionType(Enum):
     """Types of actions that can be evaluated"""
@@ -64,6 +70,36 @@ class RLReward:
     net_reward: float
     learning_weight: float
 
+@dataclass
+class RLRewardBatch:
+    """Rewards for many action/outcome pairs, held as parallel arrays"""
+    action_ids: List[str]
+    agent_names: np.ndarray
+    reward_score: np.ndarray
+    net_reward: np.ndarray
+    learning_weight: np.ndarray
+    reward_components: Dict[str, np.ndarray]
+    penalty_components: Dict[str, np.ndarray]
+    penalty_present: Dict[str, np.ndarray]
+    
+    def __len__(self) -> int:
+        return len(self.action_ids)
+    
+    def to_rewards(self, start: int = 0) -> List[RLReward]:
+        """Materialize ``RLReward`` objects for rows ``start`` onwards"""
+        rewards = []
+        for i in range(start, len(self.action_ids)):
+            rewards.append(RLReward(
+                action_id=self.action_ids[i],
+                reward_score=float(self.reward_score[i]),
+                reward_components={k: float(v[i]) for k, v in self.reward_components.items()},
+                penalty_components={k: float(v[i]) for k, v in self.penalty_components.items()
+                                    if self.penalty_present[k][i]},
+                net_reward=float(self.net_reward[i]),
+                learning_weight=float(self.learning_weight[i])
+            ))
+        return rewards
+
 class RLRewardCalculator:
     """Calculates rewards and penalties for actions"""
     
@@ -161,6 +197,76 @@ class RLRewardCalculator:
             learning_weight=learning_weight
         )
     
+    def calculate_rewards_batch(self, actions: List[RLAction], outcomes: List[RLOutcome]) -> RLRewardBatch:
+        """Calculate rewards for aligned lists of actions and outcomes in one vectorized pass.
+        
+        Produces the same values as calling ``calculate_reward`` on each pair.
+        """
+        n = len(actions)
+        confidence = np.fromiter((a.confidence_score for a in actions), dtype=float, count=n)
+        outcome_type = [o.outcome_type for o in outcomes]
+        success = np.fromiter((t == OutcomeType.SUCCESS for t in outcome_type), dtype=bool, count=n)
+        partial = np.fromiter((t == OutcomeType.PARTIAL_SUCCESS for t in outcome_type), dtype=bool, count=n)
+        failed = np.fromiter((t == OutcomeType.FAILURE for t in outcome_type), dtype=bool, count=n)
+        failed_or_error = failed | np.fromiter((t == OutcomeType.ERROR for t in outcome_type), dtype=bool, count=n)
+        
+        expected_cost = np.fromiter((a.parameters.get("expected_cost", 1000) for a in actions), dtype=float, count=n)
+        actual_cost = np.fromiter(
+            (o.cost_metrics.get("actual_cost", e) for o, e in zip(outcomes, expected_cost)), dtype=float, count=n)
+        expected_time = np.fromiter((a.parameters.get("expected_time_hours", 24) for a in actions), dtype=float, count=n)
+        actual_time = np.fromiter(
+            (o.time_metrics.get("actual_time_hours", e) for o, e in zip(outcomes, expected_time)), dtype=float, count=n)
+        satisfaction = np.fromiter((o.customer_satisfaction for o in outcomes), dtype=float, count=n)
+        impact = np.fromiter((o.business_impact for o in outcomes), dtype=float, count=n)
+        failure_cost = np.fromiter((o.cost_metrics.get("failure_cost", 0) for o in outcomes), dtype=float, count=n)
+        resource_waste = np.fromiter((o.cost_metrics.get("resource_waste", 0) for o in outcomes), dtype=float, count=n)
+        
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cost_efficiency = np.where(expected_cost != 0, (expected_cost - actual_cost) / expected_cost * 100, 0.0)
+            time_efficiency = np.where(expected_time != 0, (expected_time - actual_time) / expected_time * 100, 0.0)
+        
+        reward_components = {
+            "success_rate": np.where(success, 100 * confidence, np.where(partial, 50 * confidence, 0.0)),
+            "cost_efficiency": np.maximum(0.0, cost_efficiency),
+            "time_efficiency": np.maximum(0.0, time_efficiency),
+            "customer_satisfaction": satisfaction * 20,
+            "business_impact": impact * 10
+        }
+        
+        delayed = actual_time > expected_time
+        dissatisfied = satisfaction < 3.0
+        penalty_present = {
+            "failure_cost": failed_or_error,
+            "delay_penalty": delayed,
+            "resource_waste": np.ones(n, dtype=bool),
+            "customer_dissatisfaction": dissatisfied
+        }
+        penalty_components = {
+            "failure_cost": np.where(failed_or_error, failure_cost * 0.1, 0.0),
+            "delay_penalty": np.where(delayed, (actual_time - expected_time) * 5, 0.0),
+            "resource_waste": resource_waste * 0.05,
+            "customer_dissatisfaction": np.where(dissatisfied, (3.0 - satisfaction) * 20, 0.0)
+        }
+        
+        total_reward = sum(reward_components[c] * w for c, w in self.reward_weights.items())
+        total_penalty = sum(penalty_components[c] * w for c, w in self.penalty_weights.items())
+        
+        learning_weight = np.ones(n)
+        learning_weight[(confidence > 0.8) & failed] *= 2.0
+        learning_weight[(confidence < 0.5) & success] *= 1.5
+        learning_weight[impact > 7.0] *= 1.3
+        
+        return RLRewardBatch(
+            action_ids=[a.action_id for a in actions],
+            agent_names=np.array([a.agent_name for a in actions], dtype=object),
+            reward_score=total_reward,
+            net_reward=total_reward - total_penalty,
+            learning_weight=np.minimum(learning_weight, 3.0),
+            reward_components=reward_components,
+            penalty_components=penalty_components,
+            penalty_present=penalty_present
+        )
+    
     def _calculate_learning_weight(self, action: RLAction, outcome: RLOutcome) -> float:
         """Calculate learning weight for the reward"""
         base_weight = 1.0
@@ -178,41 +284,97 @@ class RLRewardCalculator:
         return min(base_weight, 3.0)  # Cap at 3x weight
 
 class RLAgentOptimizer:
-    """Optimizes agent behavior based on RL feedback"""
+    """Optimizes agent behavior based on RL feedback.
     
-    def __init__(self):
+    Learning state changes and their log appends happen under one lock, as
+    does building a checkpoint, so a checkpoint holds exactly the rewards
+    logged up to the sequence number it is stamped with.
+    """
+    
+    RECENT_WINDOW = 20
+    
+    def __init__(self, store: Optional[RLLearningStore] = None):
         self.agent_performance = {}
         self.action_patterns = {}
         self.optimization_rules = {}
+        self.bandit_policies: Dict[str, LinUCBPolicy] = {}
+        self.store = store or RLLearningStore()
+        self._lock = threading.RLock()
         self.load_learning_data()
     
     def update_agent_performance(self, agent_name: str, reward: RLReward):
-        """Update agent performance metrics"""
+        """Update agent performance metrics and persist the reward"""
+        with self._lock:
+            self._apply_reward(agent_name, reward.net_reward)
+            
+            try:
+                if self.store.append_reward(agent_name, reward.net_reward):
+                    self.save_learning_data()
+            except Exception as e:
+                print(f"[ERROR] Failed to persist reward: {e}")
+    
+    def update_agent_performance_batch(self, batch: RLRewardBatch):
+        """Fold a batch of rewards into per-agent aggregates and persist them"""
+        if not len(batch):
+            return
+        
+        agents, inverse = np.unique(batch.agent_names, return_inverse=True)
+        counts = np.bincount(inverse)
+        means = np.bincount(inverse, weights=batch.net_reward) / counts
+        m2s = np.bincount(inverse, weights=(batch.net_reward - means[inverse]) ** 2)
+        
+        with self._lock:
+            for i, agent_name in enumerate(agents):
+                tail = batch.net_reward[inverse == i][-self.RECENT_WINDOW:]
+                self._merge_rewards(agent_name, int(counts[i]), float(means[i]), float(m2s[i]), tail.tolist())
+            
+            try:
+                if self.store.append_rewards(batch.agent_names.tolist(), batch.net_reward.tolist()):
+                    self.save_learning_data()
+            except Exception as e:
+                print(f"[ERROR] Failed to persist rewards: {e}")
+    
+    def _apply_reward(self, agent_name: str, net_reward: float):
+        """Fold a reward into the in-memory performance metrics"""
+        self._merge_rewards(agent_name, 1, net_reward, 0.0, [net_reward])
+    
+    def _merge_rewards(self, agent_name: str, count: int, mean: float, m2: float,
+                       recent: List[float]):
+        """Merge a group of rewards (count, mean, sum of squared deviations)
+        into an agent's running aggregates (Chan et al. parallel update)"""
         if agent_name not in self.agent_performance:
             self.agent_performance[agent_name] = {
                 "total_actions": 0,
                 "total_reward": 0,
                 "average_reward": 0,
+                "reward_variance": 0,
+                "reward_m2": 0,
                 "success_rate": 0,
                 "recent_rewards": [],
                 "improvement_trend": 0
             }
         
         perf = self.agent_performance[agent_name]
-        perf["total_actions"] += 1
-        perf["total_reward"] += reward.net_reward
-        perf["average_reward"] = perf["total_reward"] / perf["total_actions"]
+        previous = perf["total_actions"]
+        total = previous + count
+        previous_mean = perf["total_reward"] / previous if previous else 0.0
+        delta = mean - previous_mean
+        
+        perf["total_actions"] = total
+        perf["total_reward"] += mean * count
+        perf["average_reward"] = perf["total_reward"] / total
+        perf["reward_m2"] = perf.get("reward_m2", 0) + m2 + delta ** 2 * previous * count / total
+        perf["reward_variance"] = perf["reward_m2"] / total
         
         # Track recent rewards for trend analysis
-        perf["recent_rewards"].append(reward.net_reward)
-        if len(perf["recent_rewards"]) > 20:
-            perf["recent_rewards"].pop(0)
+        perf["recent_rewards"].extend(recent)
+        del perf["recent_rewards"][:-self.RECENT_WINDOW]
         
         # Calculate improvement trend
         if len(perf["recent_rewards"]) >= 10:
             recent_avg = np.mean(perf["recent_rewards"][-10:])
             older_avg = np.mean(perf["recent_rewards"][-20:-10]) if len(perf["recent_rewards"]) >= 20 else recent_avg
-            perf["improvement_trend"] = (recent_avg - older_avg) / max(abs(older_avg), 1)
+            perf["improvement_trend"] = float((recent_avg - older_avg) / max(abs(older_avg), 1))
     
     def generate_optimization_suggestions(self, agent_name: str) -> List[str]:
         """Generate optimization suggestions for an agent"""
@@ -244,6 +406,66 @@ class RLAgentOptimizer:
         
         return suggestions if suggestions else ["Agent performance is stable"]
     
+    def _bandit(self, agent_name: str, action_type: ActionType) -> LinUCBPolicy:
+        key = f"{agent_name}:{action_type.value}"
+        with self._lock:
+            if key not in self.bandit_policies:
+                self.bandit_policies[key] = LinUCBPolicy()
+            return self.bandit_policies[key]
+    
+    def select_parameters(self, agent_name: str, action_type: ActionType, features) -> Dict:
+        """Pick confidence threshold and risk tolerance for a context with the agent's bandit.
+        
+        The returned ``bandit`` entry should be stored in the action context so
+        the eventual reward can be credited to the chosen arm.
+        """
+        choice = self._bandit(agent_name, action_type).select(features)
+        return {
+            "confidence_threshold": choice["confidence_threshold"],
+            "risk_tolerance": choice["risk_tolerance"],
+            "optimization_weight": 1.0,
+            "bandit": {
+                "arm": choice["arm"],
+                "propensity": choice["propensity"],
+                "features": choice["features"]
+            }
+        }
+    
+    def update_bandit(self, action: RLAction, net_reward: float):
+        """Credit a reward to the bandit arm that chose the action's parameters"""
+        bandit = action.context.get("bandit")
+        if not bandit:
+            return
+        self.credit_bandit(action.agent_name, action.action_type, bandit, net_reward)
+    
+    def credit_bandit(self, agent_name: str, action_type: ActionType, bandit: Dict, net_reward: float):
+        """Credit a reward to the arm in a ``select_parameters`` result.
+        
+        Agents call this directly for decisions that led to no action, so arms
+        whose thresholds suppress every action still get feedback.
+        """
+        key = f"{agent_name}:{action_type.value}"
+        with self._lock:
+            self._apply_bandit_update(key, bandit, net_reward)
+            try:
+                if self.store.append({"type": "bandit", "policy": key, "net_reward": net_reward, **bandit}):
+                    self.save_learning_data()
+            except Exception as e:
+                print(f"[ERROR] Failed to persist bandit update: {e}")
+    
+    def _apply_bandit_update(self, key: str, bandit: Dict, net_reward: float):
+        if key not in self.bandit_policies:
+            self.bandit_policies[key] = LinUCBPolicy()
+        self.bandit_policies[key].update(
+            bandit["arm"], bandit["features"], net_reward, bandit.get("propensity", 1.0)
+        )
+    
+    def evaluate_bandit_offline(self, agent_name: str, action_type: ActionType,
+                                candidate: Optional[LinUCBPolicy] = None) -> Dict:
+        """Replay a candidate policy (default: a fresh one) against the agent's logged decisions"""
+        logged = self._bandit(agent_name, action_type)
+        return evaluate_offline(candidate or LinUCBPolicy(arms=logged.arms), list(logged.logged_events))
+    
     def get_recommended_parameters(self, agent_name: str, action_type: ActionType) -> Dict:
         """Get recommended parameters for an action type"""
         base_params = {
@@ -270,36 +492,48 @@ class RLAgentOptimizer:
         return base_params
     
     def save_learning_data(self):
-        """Save learning data to file"""
+        """Write a compacted checkpoint of the learning data"""
         try:
-            os.makedirs("data/rl_learning", exist_ok=True)
-            
-            with open("data/rl_learning/agent_performance.json", "w") as f:
-                # Convert numpy arrays to lists for JSON serialization
-                serializable_data = {}
-                for agent, perf in self.agent_performance.items():
-                    serializable_data[agent] = {
-                        k: v.tolist() if isinstance(v, np.ndarray) else v
-                        for k, v in perf.items()
-                    }
-                json.dump(serializable_data, f, indent=2)
-            
-            with open("data/rl_learning/action_patterns.json", "w") as f:
-                json.dump(self.action_patterns, f, indent=2)
-                
+            # Taken before the store's lock, in the same order as updates take them
+            with self._lock:
+                self.store.checkpoint(self._learning_state)
         except Exception as e:
             print(f"[ERROR] Failed to save learning data: {e}")
     
+    def _learning_state(self) -> Dict:
+        """Deep copy of the learning data, with numpy arrays as lists for JSON"""
+        with self._lock:
+            serializable_data = {}
+            for agent, perf in self.agent_performance.items():
+                serializable_data[agent] = {
+                    k: v.tolist() if isinstance(v, np.ndarray) else copy.deepcopy(v)
+                    for k, v in perf.items()
+                }
+            
+            return {
+                "agent_performance": serializable_data,
+                "action_patterns": copy.deepcopy(self.action_patterns),
+                "bandit_policies": {
+                    key: policy.to_dict() for key, policy in self.bandit_policies.items()
+                }
+            }
+    
     def load_learning_data(self):
-        """Load learning data from file"""
+        """Load the last checkpoint and replay rewards logged since"""
         try:
-            if os.path.exists("data/rl_learning/agent_performance.json"):
-                with open("data/rl_learning/agent_performance.json", "r") as f:
-                    self.agent_performance = json.load(f)
+            snapshot, tail = self.store.load()
+            self.agent_performance = snapshot.get("agent_performance", {})
+            self.action_patterns = snapshot.get("action_patterns", {})
+            self.bandit_policies = {
+                key: LinUCBPolicy.from_dict(data)
+                for key, data in snapshot.get("bandit_policies", {}).items()
+            }
             
-            if os.path.exists("data/rl_learning/action_patterns.json"):
-                with open("data/rl_learning/action_patterns.json", "r") as f:
-                    self.action_patterns = json.load(f)
+            for event in tail:
+                if event.get("type") == "reward":
+                    self._apply_reward(event["agent"], event["net_reward"])
+                elif event.get("type") == "bandit":
+                    self._apply_bandit_update(event["policy"], event, event["net_reward"])
                     
         except Exception as e:
             print(f"[WARNING] Failed to load learning data: {e}")
@@ -307,29 +541,48 @@ class RLAgentOptimizer:
 class RLFeedbackSystem:
     """Main RL feedback system coordinator"""
     
-    def __init__(self):
+    def __init__(self, history_size: int = 1000, max_pending_actions: int = 10000,
+                 optimizer: Optional[RLAgentOptimizer] = None):
         self.reward_calculator = RLRewardCalculator()
-        self.optimizer = RLAgentOptimizer()
-        self.action_history = []
-        self.outcome_history = []
-        self.reward_history = []
+        self.optimizer = optimizer or RLAgentOptimizer()
+        
+        # Recent history is kept in ring buffers; lifetime totals are counters
+        self.action_history = deque(maxlen=history_size)
+        self.outcome_history = deque(maxlen=history_size)
+        self.reward_history = deque(maxlen=history_size)
+        
+        # Actions awaiting an outcome, keyed by id; the oldest are evicted first
+        self.max_pending_actions = max_pending_actions
+        self.pending_actions: "OrderedDict[str, RLAction]" = OrderedDict()
+        
+        self.total_actions = 0
+        self.total_rewards = 0
+        self.total_net_reward = 0.0
+        self.evicted_actions = 0
     
     def record_action(self, agent_name: str, action_type: ActionType, parameters: Dict, 
                      confidence_score: float, context: Dict = None) -> str:
         """Record an action taken by an agent"""
-        action_id = f"{agent_name}_{action_type.value}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        now = datetime.now()
+        action_id = f"{agent_name}_{action_type.value}_{now.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:12]}"
         
         action = RLAction(
             action_id=action_id,
             agent_name=agent_name,
             action_type=action_type,
             parameters=parameters,
-            timestamp=datetime.now(),
+            timestamp=now,
             confidence_score=confidence_score,
             context=context or {}
         )
         
         self.action_history.append(action)
+        self.pending_actions[action_id] = action
+        if len(self.pending_actions) > self.max_pending_actions:
+            self.pending_actions.popitem(last=False)
+            self.evicted_actions += 1
+        self.total_actions += 1
+        
         print(f"[RL] Recorded action: {action_id}")
         return action_id
     
@@ -350,12 +603,15 @@ class RLFeedbackSystem:
         
         self.outcome_history.append(outcome)
         
-        # Find corresponding action and calculate reward
-        action = next((a for a in self.action_history if a.action_id == action_id), None)
+        # Find corresponding action and calculate reward (each action is rewarded once)
+        action = self.pending_actions.pop(action_id, None)
         if action:
             reward = self.reward_calculator.calculate_reward(action, outcome)
             self.reward_history.append(reward)
+            self.total_rewards += 1
+            self.total_net_reward += reward.net_reward
             self.optimizer.update_agent_performance(action.agent_name, reward)
+            self.optimizer.update_bandit(action, reward.net_reward)
             
             print(f"[RL] Calculated reward for {action_id}: {reward.net_reward:.2f}")
             return reward
@@ -363,6 +619,47 @@ class RLFeedbackSystem:
             print(f"[RL] Warning: No action found for outcome {action_id}")
             return None
     
+    def record_outcomes_batch(self, outcomes: List[RLOutcome]) -> RLRewardBatch:
+        """Record many outcomes at once and reward them in one vectorized pass.
+        
+        Outcomes whose action is unknown (or already rewarded) are skipped.
+        """
+        matched_actions, matched_outcomes = [], []
+        for outcome in outcomes:
+            action = self.pending_actions.pop(outcome.action_id, None)
+            if action:
+                matched_actions.append(action)
+                matched_outcomes.append(outcome)
+        self.outcome_history.extend(outcomes)
+        
+        batch = self.reward_calculator.calculate_rewards_batch(matched_actions, matched_outcomes)
+        if len(batch):
+            # Only the newest rewards fit in the bounded history
+            self.reward_history.extend(batch.to_rewards(max(0, len(batch) - self.reward_history.maxlen)))
+            self.total_rewards += len(batch)
+            self.total_net_reward += float(batch.net_reward.sum())
+            self.optimizer.update_agent_performance_batch(batch)
+            for action, net_reward in zip(matched_actions, batch.net_reward):
+                if action.context.get("bandit"):
+                    self.optimizer.update_bandit(action, float(net_reward))
+        
+        skipped = len(outcomes) - len(batch)
+        print(f"[RL] Calculated {len(batch)} rewards in batch" + (f" ({skipped} unmatched)" if skipped else ""))
+        return batch
+    
+    def reset(self):
+        """Clear history, pending actions, counters and agent performance"""
+        self.action_history.clear()
+        self.outcome_history.clear()
+        self.reward_history.clear()
+        self.pending_actions.clear()
+        self.total_actions = 0
+        self.total_rewards = 0
+        self.total_net_reward = 0.0
+        self.evicted_actions = 0
+        self.optimizer.agent_performance.clear()
+        self.optimizer.bandit_policies.clear()
+    
     def get_agent_insights(self, agent_name: str) -> Dict:
         """Get insights and recommendations for an agent"""
         performance = self.optimizer.agent_performance.get(agent_name, {})
@@ -376,8 +673,8 @@ class RLFeedbackSystem:
     
     def get_system_analytics(self) -> Dict:
         """Get system-wide RL analytics"""
-        total_actions = len(self.action_history)
-        total_rewards = sum(r.net_reward for r in self.reward_history)
+        total_actions = self.total_actions
+        total_rewards = self.total_net_reward
         avg_reward = total_rewards / max(total_actions, 1)
         
         # Agent rankings
@@ -405,8 +702,9 @@ class RLFeedbackSystem:
         if len(self.reward_history) < 10:
             return {"status": "insufficient_data", "progress": 0}
         
-        recent_rewards = [r.net_reward for r in self.reward_history[-20:]]
-        older_rewards = [r.net_reward for r in self.reward_history[-40:-20]] if len(self.reward_history) >= 40 else recent_rewards
+        rewards = [r.net_reward for r in list(self.reward_history)[-40:]]
+        recent_rewards = rewards[-20:]
+        older_rewards = rewards[-40:-20] if len(rewards) >= 40 else recent_rewards
         
         recent_avg = np.mean(recent_rewards)
         older_avg = np.mean(older_rewards)
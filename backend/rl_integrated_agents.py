@@ -14,6 +14,10 @@ from rl_feedback_system import (
     record_agent_action, record_action_outcome, get_agent_recommendations,
     ActionType, rl_feedback_system
 )
+from rl_bandit_policy import build_inventory_context
+
+# Cost charged per unit of forecast demand left uncovered when a restock is held back
+STOCKOUT_COST_PER_UNIT = 2.0
 
 class RLEnhancedRestockAgent:
     """Restock agent enhanced with RL feedback"""
@@ -27,16 +31,6 @@ class RLEnhancedRestockAgent:
         """Analyze inventory with RL-enhanced decision making"""
         print(f"[{self.agent_name}] Starting RL-enhanced inventory analysis...")
         
-        # Get RL recommendations
-        recommendations = get_agent_recommendations(self.agent_name)
-        recommended_params = recommendations.get("recommended_parameters", {})
-        
-        # Adjust confidence threshold based on RL feedback
-        confidence_threshold = recommended_params.get("confidence_threshold", self.base_confidence)
-        risk_tolerance = recommended_params.get("risk_tolerance", 0.5)
-        
-        print(f"[{self.agent_name}] Using RL-adjusted confidence threshold: {confidence_threshold:.2f}")
-        
         # Simulate inventory analysis
         low_stock_items = [
             {"product_id": "A101", "name": "Wireless Mouse", "current_stock": 5, "reorder_point": 15, "demand_forecast": 25},
@@ -47,6 +41,14 @@ class RLEnhancedRestockAgent:
         restock_decisions = []
         
         for item in low_stock_items:
+            # Contextual bandit picks threshold and risk tolerance for this item's inventory state
+            params = rl_feedback_system.optimizer.select_parameters(
+                self.agent_name, ActionType.RESTOCK_DECISION, build_inventory_context(item)
+            )
+            confidence_threshold = params["confidence_threshold"]
+            risk_tolerance = params["risk_tolerance"]
+            print(f"[{self.agent_name}] {item['product_id']}: RL-selected confidence threshold {confidence_threshold:.2f}")
+            
             # Calculate confidence based on multiple factors
             stock_urgency = (item["reorder_point"] - item["current_stock"]) / item["reorder_point"]
             demand_confidence = min(1.0, item["demand_forecast"] / (item["reorder_point"] * 2))
@@ -64,7 +66,8 @@ class RLEnhancedRestockAgent:
                 action_context = {
                     "current_stock": item["current_stock"],
                     "reorder_point": item["reorder_point"],
-                    "demand_forecast": item["demand_forecast"]
+                    "demand_forecast": item["demand_forecast"],
+                    "bandit": params["bandit"]
                 }
                 
                 action_id = record_agent_action(
@@ -101,9 +104,19 @@ class RLEnhancedRestockAgent:
                 )
                 
                 print(f"[{self.agent_name}] RL Decision: Restock {item['name']} - Qty: {restock_quantity}, Confidence: {rl_adjusted_confidence:.2f}")
+            else:
+                # Holding off is a decision too: charge the chosen arm the stock-out
+                # it leaves uncovered, or an arm that never acts never learns
+                rl_feedback_system.optimizer.credit_bandit(
+                    self.agent_name, ActionType.RESTOCK_DECISION, params["bandit"], -self._stockout_cost(item)
+                )
         
         return restock_decisions
     
+    def _stockout_cost(self, item: Dict) -> float:
+        """Cost of the forecast demand that current stock cannot cover"""
+        return max(0, item["demand_forecast"] - item["current_stock"]) * STOCKOUT_COST_PER_UNIT
+    
     def simulate_restock_outcomes(self, decisions: List[Dict]):
         """Simulate outcomes and provide RL feedback"""
         print(f"[{self.agent_name}] Simulating restock outcomes for RL feedback...")
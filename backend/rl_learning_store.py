@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Append-only Learning Store for the RL Feedback System
+Rewards are appended to a JSON-lines event log; state is periodically
+compacted into an atomically written checkpoint.
+"""
+
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Tuple
+
+class RLLearningStore:
+    """Durable store for RL agent learning state.
+
+    Each persisted reward is one small line appended to ``reward_log.jsonl``.
+    Every ``checkpoint_interval`` appends the caller is asked to compact: the
+    full state is written to ``learning_checkpoint.json`` via a temporary
+    file and ``os.replace`` (atomic on POSIX and Windows), stamped with the
+    last log sequence number it covers, and the log is truncated. On
+    startup the checkpoint is loaded and only log entries newer than it are
+    replayed, so a crash between checkpoint and truncation never double
+    counts a reward.
+    """
+
+    CHECKPOINT_FILE = "learning_checkpoint.json"
+    LOG_FILE = "reward_log.jsonl"
+    LEGACY_PERFORMANCE_FILE = "agent_performance.json"
+    LEGACY_PATTERNS_FILE = "action_patterns.json"
+
+    def __init__(self, data_dir: str = "data/rl_learning", checkpoint_interval: int = 500,
+                 fsync: bool = False):
+        self.data_dir = data_dir
+        self.checkpoint_interval = checkpoint_interval
+        self.fsync = fsync
+        self.checkpoint_path = os.path.join(data_dir, self.CHECKPOINT_FILE)
+        self.log_path = os.path.join(data_dir, self.LOG_FILE)
+
+        self.last_seq = 0
+        self.appends_since_checkpoint = 0
+        self._log_file = None
+        self._lock = threading.Lock()
+
+    # === Loading ===
+
+    def load(self) -> Tuple[Dict, List[Dict]]:
+        """Return ``(snapshot, tail_events)`` for rebuilding in-memory state"""
+        snapshot, checkpoint_seq = self._load_checkpoint()
+        # Number new entries past the checkpoint even if reading the log fails,
+        # or a later replay would skip them as already checkpointed
+        self.last_seq = max(self.last_seq, checkpoint_seq)
+        tail = [event for event in self._recover_log() if event.get("seq", 0) > checkpoint_seq]
+
+        self.last_seq = max([self.last_seq] + [event["seq"] for event in tail])
+        self.appends_since_checkpoint = len(tail)
+        return snapshot, tail
+
+    def _load_checkpoint(self) -> Tuple[Dict, int]:
+        if os.path.exists(self.checkpoint_path):
+            try:
+                with open(self.checkpoint_path, "r") as f:
+                    checkpoint = json.load(f)
+                return checkpoint.get("state", {}), int(checkpoint.get("last_seq", 0))
+            except (ValueError, TypeError, AttributeError) as e:
+                # Set it aside so its sequence number cannot hide entries logged from now on
+                print(f"[WARNING] Unreadable learning checkpoint, replaying the log only: {e}")
+                os.replace(self.checkpoint_path, self.checkpoint_path + ".corrupt")
+                return {}, 0
+
+        # Seed from the pre-checkpoint JSON files if they are present
+        snapshot = {}
+        for key, filename in (("agent_performance", self.LEGACY_PERFORMANCE_FILE),
+                              ("action_patterns", self.LEGACY_PATTERNS_FILE)):
+            path = os.path.join(self.data_dir, filename)
+            if os.path.exists(path):
+                with open(path, "r") as f:
+                    snapshot[key] = json.load(f)
+        return snapshot, 0
+
+    def _recover_log(self) -> List[Dict]:
+        """Read the log, skipping bad lines, and cut off a torn tail.
+
+        A crash mid-append leaves a partial last line; appends reopen the
+        log in append mode, so it is truncated back to the end of the last
+        valid line before anything new is written after it.
+        """
+        if not os.path.exists(self.log_path):
+            return []
+
+        events = []
+        valid_end = 0
+        terminated = True
+        with open(self.log_path, "rb") as f:
+            data = f.read()
+        offset = 0
+        for line in data.splitlines(keepends=True):
+            offset += len(line)
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(event, dict):
+                events.append(event)
+                valid_end, terminated = offset, line.endswith(b"\n")
+
+        if valid_end < len(data) or not terminated:
+            with self._lock:
+                if self._log_file is not None:
+                    self._log_file.close()
+                    self._log_file = None
+                with open(self.log_path, "r+b") as f:
+                    f.truncate(valid_end)
+                    if not terminated:
+                        f.seek(valid_end)
+                        f.write(b"\n")
+        return events
+
+    # === Writing ===
+
+    def append(self, event: Dict) -> bool:
+        """Append one event to the log.
+
+        Returns True when a checkpoint is due.
+        """
+        return self.append_many([event])
+
+    def append_many(self, events: List[Dict]) -> bool:
+        """Append several events with a single write; returns True when a checkpoint is due"""
+        with self._lock:
+            if self._log_file is None:
+                os.makedirs(self.data_dir, exist_ok=True)
+                self._log_file = open(self.log_path, "a")
+
+            lines = []
+            for event in events:
+                self.last_seq += 1
+                lines.append(json.dumps(dict(event, seq=self.last_seq), separators=(",", ":")))
+            self._log_file.write("\n".join(lines) + "\n")
+            self._log_file.flush()
+            if self.fsync:
+                os.fsync(self._log_file.fileno())
+
+            self.appends_since_checkpoint += len(events)
+            return self.appends_since_checkpoint >= self.checkpoint_interval
+
+    def append_reward(self, agent_name: str, net_reward: float) -> bool:
+        """Persist a single reward; returns True when a checkpoint is due"""
+        return self.append({
+            "type": "reward",
+            "agent": agent_name,
+            "net_reward": net_reward,
+            "timestamp": datetime.now().isoformat()
+        })
+
+    def append_rewards(self, agent_names: List[str], net_rewards: List[float]) -> bool:
+        """Persist a batch of rewards; returns True when a checkpoint is due"""
+        if not agent_names:
+            return False
+        timestamp = datetime.now().isoformat()
+        return self.append_many([
+            {"type": "reward", "agent": agent, "net_reward": reward, "timestamp": timestamp}
+            for agent, reward in zip(agent_names, net_rewards)
+        ])
+
+    def checkpoint(self, build_state: Callable[[], Dict]):
+        """Atomically write a compacted snapshot and truncate the log.
+
+        ``build_state`` is called with appends held off, so the state it
+        returns and the sequence number stamped on it cover the same
+        rewards; it should return a copy the caller will not mutate.
+        """
+        with self._lock:
+            os.makedirs(self.data_dir, exist_ok=True)
+            payload = {
+                "last_seq": self.last_seq,
+                "saved_at": datetime.now().isoformat(),
+                "state": build_state()
+            }
+
+            fd, tmp_path = tempfile.mkstemp(dir=self.data_dir, prefix=".checkpoint-", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(payload, f, separators=(",", ":"))
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.checkpoint_path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+            # Everything up to last_seq is now in the checkpoint
+            if self._log_file is not None:
+                self._log_file.close()
+            self._log_file = open(self.log_path, "w")
+            self.appends_since_checkpoint = 0
+
+    def close(self):
+        with self._lock:
+            if self._log_file is not None:
+                self._log_file.close()
+                self._log_file = None
@@ -237,6 +237,11 @@ main_app = FastAPI(
     version="1.0.0"
 )
 
+# Each supplier's API is served under its id, e.g. /SUPPLIER_001/api/inventory/{product_id}
+main_app.mount("/SUPPLIER_001", supplier_001_app)
+main_app.mount("/SUPPLIER_002", supplier_002_app)
+main_app.mount("/SUPPLIER_003", supplier_003_app)
+
 @main_app.get("/")
 def network_info():
     return {
@@ -6,6 +6,7 @@ Handle supplier messages, procurement requests, and contact management
 
 from database.models import SessionLocal, Supplier, PurchaseOrder, AgentLog
 from user_product_models import get_user_product_by_id
+from database.supplier_scorecard import get_scorecards
 from datetime import datetime, timedelta
 import json
 import uuid
@@ -328,16 +329,52 @@ Procurement Team
             'notes': notes
         }
     
-    def get_supplier_performance_report(self, supplier_id, days=30):
-        """Generate supplier performance report"""
+    def get_supplier_performance_report(self, supplier_id, days=None):
+        """Generate supplier performance report
+
+        Reads the supplier's scorecard, a single row covering its whole
+        history. Pass ``days`` to scan the purchase orders created in that
+        many recent days instead.
+        """
         supplier = self.get_supplier_by_id(supplier_id)
         if not supplier:
             return {'success': False, 'error': 'Supplier not found'}
         
-        # Get POs from last N days
+        if days is not None:
+            return self._windowed_performance_report(supplier, days)
+        
+        card = get_scorecards([supplier_id], db=self.db).get(supplier_id)
+        if not card:
+            card = {'total_orders': 0, 'open_orders': 0, 'delivered_orders': 0, 'cancelled_orders': 0,
+                    'total_value': 0.0, 'on_time_rate': None, 'lead_time_mean_days': 0.0,
+                    'lead_time_std_days': 0.0, 'cost_index': 1.0, 'defect_rate': 0.0}
+        
+        total_orders = card['total_orders']
+        delivered_orders = card['delivered_orders']
+        avg_delivery_days = card['lead_time_mean_days']
+        
+        return {
+            'success': True,
+            'supplier': supplier,
+            'period_days': None,
+            'total_orders': total_orders,
+            'total_value': card['total_value'],
+            'delivered_orders': delivered_orders,
+            'pending_orders': card['open_orders'],
+            'delivery_rate': (delivered_orders / total_orders * 100) if total_orders > 0 else 0,
+            'avg_delivery_days': round(avg_delivery_days, 1),
+            'performance_score': min(100, (delivered_orders / max(1, total_orders)) * 100 + (100 - min(100, avg_delivery_days * 5))),
+            'on_time_rate': card['on_time_rate'],
+            'lead_time_std_days': card['lead_time_std_days'],
+            'cost_index': card['cost_index'],
+            'defect_rate': card['defect_rate']
+        }
+    
+    def _windowed_performance_report(self, supplier, days):
+        """Performance over purchase orders created in the last ``days`` days"""
         since_date = datetime.utcnow() - timedelta(days=days)
         pos = self.db.query(PurchaseOrder).filter(
-            PurchaseOrder.supplier_id == supplier_id,
+            PurchaseOrder.supplier_id == supplier['supplier_id'],
             PurchaseOrder.created_at >= since_date
         ).all()
         
@@ -397,7 +434,7 @@ def demo_supplier_communication():
         
         # Get supplier performance
         print("\n📊 Supplier Performance Report...")
-        perf = scs.get_supplier_performance_report("SUPPLIER_001", days=30)
+        perf = scs.get_supplier_performance_report("SUPPLIER_001")
         if perf['success']:
             print(f"  - Total Orders: {perf['total_orders']}")
             print(f"  - Delivery Rate: {perf['delivery_rate']:.1f}%")
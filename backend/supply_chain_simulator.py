@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Discrete-Event Supply Chain Simulator
+Simulates months of demand, supplier lead times, courier transit and returns
+entirely in memory, running the agents' decision rules so reorder policies
+can be evaluated before they are deployed.
+"""
+
+import heapq
+import random
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from database.models import SessionLocal, Inventory, Supplier, Order
+from replay_simulator import ReplayEvent, ReplayPolicy
+
+# Event kinds for the dynamic queue; lower values win timestamp ties
+PO_ARRIVAL = 0
+RESTOCK = 1
+AGENT_CYCLE = 2
+SHIPMENT_DELIVERED = 3
+RETURN = 4
+
+
+def build_catalog(n_skus: int, seed: Optional[int] = None) -> List[Dict]:
+    """Synthetic SKU catalog for scale tests and what-ifs without a database"""
+    rng = np.random.default_rng(seed)
+    daily_demand = rng.lognormal(-1.0, 1.0, n_skus)
+    reorder_point = np.maximum(5, np.round(daily_demand * 2.5 * 7)).astype(int)
+    max_stock = reorder_point * 4
+    return [
+        {
+            "product_id": f"SKU{i:05d}",
+            "opening_stock": int(max_stock[i] * 0.6),
+            "reorder_point": int(reorder_point[i]),
+            "max_stock": int(max_stock[i]),
+            "unit_cost": float(np.round(rng.uniform(2, 80), 2)),
+            "lead_time_days": int(rng.choice([3, 5, 7])),
+            "daily_demand": float(daily_demand[i])
+        }
+        for i in range(n_skus)
+    ]
+
+
+def load_catalog(db=None, demand_days: int = 90) -> List[Dict]:
+    """SKU catalog from the inventory and suppliers tables.
+
+    Daily demand is the average order rate over the last ``demand_days``.
+    """
+    own_session = db is None
+    db = db or SessionLocal()
+    try:
+        lead_times = {s.supplier_id: s.lead_time_days for s in db.query(Supplier).all()}
+        since = datetime.utcnow() - timedelta(days=demand_days)
+        order_counts = defaultdict(int)
+        for (product_id,) in db.query(Order.product_id).filter(Order.order_date >= since).all():
+            order_counts[product_id] += 1
+
+        return [
+            {
+                "product_id": item.product_id,
+                "opening_stock": item.current_stock or 0,
+                "reorder_point": item.reorder_point or 0,
+                "max_stock": item.max_stock or 0,
+                "unit_cost": item.unit_cost or 0.0,
+                "lead_time_days": lead_times.get(item.supplier_id) or 7,
+                "daily_demand": order_counts[item.product_id] / demand_days
+            }
+            for item in db.query(Inventory).all()
+        ]
+    finally:
+        if own_session:
+            db.close()
+
+
+class SupplyChainSimulator:
+    """Discrete-event simulation over a SKU catalog.
+
+    Customer orders are generated up front as one sorted stream (Poisson
+    arrivals per SKU); supplier deliveries, courier deliveries, returns,
+    approved restocks and agent cycles go through a heap. The main loop merges
+    the two, so the heap only holds in-flight work and stays small even with
+    millions of orders. Time is in days from the start of the run.
+
+    Each agent cycle runs procurement on the SKUs whose stock changed since
+    the previous cycle, delivery on the orders received since then, and the
+    restock rule on new returns, all through a ``ReplayPolicy``. Orders that
+    cannot be filled from stock are lost. Decisions sent to human review are
+    executed after ``review_delay_days`` unless ``execute_reviewed`` is off.
+    """
+
+    def __init__(self, catalog: List[Dict], days: int = 365, cycle_days: float = 1.0,
+                 mean_order_size: float = 2.0, lead_time_cv: float = 0.2, transit_cv: float = 0.25,
+                 return_rate: float = 0.03, execute_reviewed: bool = True,
+                 review_delay_days: float = 1.0, seed: Optional[int] = None):
+        self.catalog = catalog
+        self.days = days
+        self.cycle_days = cycle_days
+        self.mean_order_size = mean_order_size
+        self.lead_time_cv = lead_time_cv
+        self.transit_cv = transit_cv
+        self.return_rate = return_rate
+        self.execute_reviewed = execute_reviewed
+        self.review_delay_days = review_delay_days
+        self.seed = seed
+
+    def _generate_demand(self, rng: np.random.Generator):
+        rates = np.array([sku["daily_demand"] for sku in self.catalog], dtype=float)
+        counts = rng.poisson(rates * self.days)
+        sku_index = np.repeat(np.arange(len(self.catalog)), counts)
+        times = rng.uniform(0.0, self.days, len(sku_index))
+        sizes = 1 + rng.poisson(max(self.mean_order_size - 1.0, 0.0), len(sku_index))
+
+        order = np.argsort(times, kind="stable")
+        return times[order].tolist(), sku_index[order].tolist(), sizes[order].tolist()
+
+    def run(self, policy: Optional[ReplayPolicy] = None) -> Dict:
+        policy = policy or ReplayPolicy()
+        policy.reset()
+        rng = np.random.default_rng(self.seed)
+        # Scalar draws in the event loop are much cheaper from the stdlib generator
+        draw = random.Random(self.seed)
+        started = time.perf_counter()
+
+        n = len(self.catalog)
+        product_ids = [sku["product_id"] for sku in self.catalog]
+        specs = {sku["product_id"]: sku for sku in self.catalog}
+        stock = [int(sku["opening_stock"]) for sku in self.catalog]
+        unit_cost = [float(sku["unit_cost"]) for sku in self.catalog]
+        index = {pid: i for i, pid in enumerate(product_ids)}
+
+        # Integral of stock value over time, for average inventory value
+        value_time = 0.0
+        last_change = [0.0] * n
+        on_order = [False] * n
+        dirty = set(range(n))
+        pending_orders: List[ReplayEvent] = []
+        pending_returns: List[ReplayEvent] = []
+
+        kpis = defaultdict(float)
+        decisions = defaultdict(lambda: {"auto": 0, "review": 0, "units": 0})
+        transit_days: List[float] = []
+
+        queue: List = []
+        sequence = 0
+
+        def schedule(at: float, kind: int, payload):
+            nonlocal sequence
+            sequence += 1
+            heapq.heappush(queue, (at, kind, sequence, payload))
+
+        def change_stock(i: int, delta: int, at: float):
+            nonlocal value_time
+            value_time += stock[i] * unit_cost[i] * (at - last_change[i])
+            last_change[i] = at
+            stock[i] += delta
+            dirty.add(i)
+
+        def jitter(mean: float, cv: float) -> float:
+            return max(0.1, draw.gauss(mean, mean * cv)) if cv else mean
+
+        def execute(decision, at: float):
+            counts = decisions[decision.agent]
+            counts[decision.outcome] += 1
+            if decision.outcome == "review":
+                if not self.execute_reviewed:
+                    return
+                at += self.review_delay_days
+            counts["units"] += decision.quantity
+
+            i = index.get(decision.product_id)
+            if decision.agent == "procurement":
+                on_order[i] = True
+                kpis["procurement_spend"] += decision.quantity * unit_cost[i]
+                kpis["purchase_orders"] += 1
+                lead_time = jitter(specs[decision.product_id]["lead_time_days"], self.lead_time_cv)
+                schedule(at + lead_time, PO_ARRIVAL, (i, decision.quantity))
+            elif decision.agent == "restock" and i is not None:
+                schedule(at, RESTOCK, (i, decision.quantity))
+            elif decision.agent == "delivery":
+                promised = decision.details["delivery_days"]
+                schedule(at + jitter(promised, self.transit_cv), SHIPMENT_DELIVERED, (decision, at, promised))
+
+        def agent_cycle(at: float):
+            timestamp = base_time + timedelta(days=at)
+            for event in pending_returns:
+                decision = policy.decide_restock(event)
+                if decision:
+                    execute(decision, at)
+            pending_returns.clear()
+
+            for event in pending_orders:
+                execute(policy.decide_delivery(timestamp, event), at)
+            pending_orders.clear()
+
+            for i in dirty:
+                if on_order[i]:
+                    continue
+                pid = product_ids[i]
+                decision = policy.decide_procurement(timestamp, pid, stock[i], specs[pid])
+                if decision:
+                    execute(decision, at)
+            dirty.clear()
+
+            if at + self.cycle_days <= self.days:
+                schedule(at + self.cycle_days, AGENT_CYCLE, None)
+
+        def handle(at: float, kind: int, payload):
+            if kind == AGENT_CYCLE:
+                agent_cycle(at)
+            elif kind == PO_ARRIVAL:
+                i, quantity = payload
+                on_order[i] = False
+                change_stock(i, quantity, at)
+            elif kind == RESTOCK:
+                i, quantity = payload
+                change_stock(i, quantity, at)
+            elif kind == SHIPMENT_DELIVERED:
+                decision, shipped_at, promised = payload
+                kpis["deliveries"] += 1
+                transit_days.append(at - shipped_at)
+                if at - shipped_at <= promised:
+                    kpis["on_time_deliveries"] += 1
+                if draw.random() < self.return_rate:
+                    schedule(at + draw.uniform(2, 14), RETURN, decision)
+            elif kind == RETURN:
+                kpis["returns"] += 1
+                pending_returns.append(ReplayEvent(base_time + timedelta(days=at), "return",
+                                                   payload.product_id, payload.quantity))
+
+        base_time = datetime(2000, 1, 1)
+        schedule(0.0, AGENT_CYCLE, None)
+        times, skus, sizes = self._generate_demand(rng)
+
+        for at, i, quantity in zip(times, skus, sizes):
+            while queue and queue[0][0] <= at:
+                event_at, kind, _, payload = heapq.heappop(queue)
+                handle(event_at, kind, payload)
+
+            kpis["orders"] += 1
+            kpis["units_demanded"] += quantity
+            filled = min(stock[i], quantity)
+            if filled < quantity:
+                kpis["stockouts"] += 1
+            if filled:
+                kpis["units_fulfilled"] += filled
+                change_stock(i, -filled, at)
+                pending_orders.append(ReplayEvent(None, "order", product_ids[i], filled, str(int(kpis["orders"]))))
+
+        while queue and queue[0][0] <= self.days:
+            event_at, kind, _, payload = heapq.heappop(queue)
+            handle(event_at, kind, payload)
+
+        for i in range(n):
+            change_stock(i, 0, float(self.days))
+
+        elapsed = time.perf_counter() - started
+        total_decisions = sum(c["auto"] + c["review"] for c in decisions.values())
+        automated = sum(c["auto"] for c in decisions.values())
+        return {
+            "policy": policy.name,
+            "skus": n,
+            "days": self.days,
+            "wall_seconds": round(elapsed, 3),
+            "kpis": {
+                "orders": int(kpis["orders"]),
+                "fill_rate": round(kpis["units_fulfilled"] / kpis["units_demanded"], 4) if kpis["units_demanded"] else 1.0,
+                "stockouts": int(kpis["stockouts"]),
+                "purchase_orders": int(kpis["purchase_orders"]),
+                "procurement_spend": round(kpis["procurement_spend"], 2),
+                "average_inventory_value": round(value_time / self.days, 2) if self.days else 0.0,
+                "on_time_delivery_rate": round(kpis["on_time_deliveries"] / kpis["deliveries"], 4) if kpis["deliveries"] else 1.0,
+                "average_transit_days": round(float(np.mean(transit_days)), 2) if transit_days else 0.0,
+                "returns": int(kpis["returns"]),
+                "automation_rate": round(automated / total_decisions, 4) if total_decisions else 1.0,
+                "decisions_by_agent": {agent: dict(counts) for agent, counts in decisions.items()}
+            }
+        }
+
+
+def compare_policies(simulator: SupplyChainSimulator, policies: List[ReplayPolicy]) -> Dict:
+    """Run several policies against identical demand (same seed) and collect their KPIs"""
+    return {policy.name: simulator.run(policy)["kpis"] for policy in policies}
+
+
+if __name__ == "__main__":
+    import json
+    result = SupplyChainSimulator(build_catalog(10000, seed=1), days=365, seed=1).run()
+    print(json.dumps(result, indent=2))
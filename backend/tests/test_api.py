@@ -174,5 +174,36 @@ class TestAPIIntegration:
         assert len(results) == 5
         assert all(status == 200 for status in results)
 
+def test_account_index_build_is_recorded_even_when_it_fails(monkeypatch):
+    """A failed or empty build must not be retried on every request"""
+    import api_app
+
+    calls = []
+
+    def failing_index(accounts):
+        calls.append(len(accounts))
+        raise RuntimeError("geocoder unavailable")
+
+    monkeypatch.setattr(api_app.location_analytics, "index_accounts", failing_index)
+    api_app.account_index_built.clear()
+    api_app.build_account_index()
+
+    assert api_app.account_index_built.is_set()
+    assert len(calls) == 1
+    assert len(api_app.location_analytics.account_index) == 0
+
+def test_inventory_optimize_requires_write_permission_to_apply():
+    from api_app import auth_system
+    from auth_system import UserLogin
+
+    client = TestClient(app)
+    assert client.post("/inventory/optimize?dry_run=false").status_code in (401, 403)
+
+    token = auth_system.login(UserLogin(username="viewer", password="viewer123")).access_token
+    response = client.post("/inventory/optimize?dry_run=false",
+                           headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 403
+    assert "write:inventory" in response.json()["detail"]
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
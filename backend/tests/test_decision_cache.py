@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Tests for the logistics decision cache
+"""
+
+import asyncio
+import sys
+import time
+sys.path.append('..')
+
+import logistics_ai_decisions
+from decision_cache import DecisionCache, context_key
+from logistics_ai_decisions import LogisticsDecisionEngine
+
+SUPPLIERS = [
+    {"id": "SUP_1", "name": "A", "reliability": 0.9, "cost_factor": 1.0, "lead_time_days": 5},
+    {"id": "SUP_2", "name": "B", "reliability": 0.7, "cost_factor": 0.8, "lead_time_days": 9},
+]
+
+
+class TestDecisionCache:
+    """Test keys, expiry, eviction and metrics"""
+
+    def test_key_ignores_dict_order_and_supplier_order(self):
+        a = {"suppliers": SUPPLIERS, "requirements": {"reliability": 0.8, "max_lead_time": 7}}
+        b = {"requirements": {"max_lead_time": 7, "reliability": 0.8}, "suppliers": SUPPLIERS[::-1]}
+
+        assert context_key("supplier_selection", a) == context_key("supplier_selection", b)
+        assert context_key("route_optimization", {"orders": [1, 2]}) != \
+            context_key("route_optimization", {"orders": [2, 1]})
+
+    def test_hit_is_flagged_copy(self):
+        cache = DecisionCache()
+        cache.put("delay_assessment", {"x": 1}, {"decision": "delay_risk_assessed", "action_id": "a1", "risk": [1]})
+
+        hit = cache.get("delay_assessment", {"x": 1})
+        hit["risk"].append(2)
+
+        assert hit["cached"] is True
+        assert hit["action_id"] is None and hit["source_action_id"] == "a1"
+        assert cache.get("delay_assessment", {"x": 1})["risk"] == [1]
+
+    def test_ttl_and_uncached_types(self):
+        cache = DecisionCache({"delay_assessment": 0.01, "supplier_selection": 60})
+        cache.put("delay_assessment", {}, {"decision": "ok"})
+        time.sleep(0.02)
+        cache.put("procurement_decision", {}, {"decision": "ok"})
+        cache.put("supplier_selection", {}, {"decision": "error"})
+
+        assert cache.get("delay_assessment", {}) is None
+        assert cache.get("procurement_decision", {}) is None
+        assert cache.get("supplier_selection", {}) is None
+        assert cache.get_stats()["by_type"]["delay_assessment"]["expired"] == 1
+
+    def test_lru_eviction_and_hit_rate(self):
+        cache = DecisionCache(max_entries=2)
+        for i in range(3):
+            cache.put("route_optimization", {"i": i}, {"decision": "ok"})
+            if i == 1:
+                cache.get("route_optimization", {"i": 0})
+
+        assert cache.get("route_optimization", {"i": 0}) is not None
+        assert cache.get("route_optimization", {"i": 1}) is None
+        stats = cache.get_stats()
+        assert stats["evictions"] == 1
+        assert stats["hit_rate"] == round(2 / 3, 4)
+
+
+class TestEngineCaching:
+    """Test opt-in caching in the decision engine"""
+
+    def test_cached_decisions_skip_rl_bookkeeping(self, monkeypatch):
+        calls = []
+        monkeypatch.setattr(logistics_ai_decisions, "record_agent_action",
+                            lambda *args, **kwargs: calls.append(args) or f"action_{len(calls)}")
+        monkeypatch.setattr(logistics_ai_decisions, "record_action_outcome", lambda *args, **kwargs: None)
+        context = {"suppliers": SUPPLIERS, "requirements": {"reliability": 0.8}}
+
+        uncached = LogisticsDecisionEngine()
+        for _ in range(3):
+            asyncio.run(uncached.make_decision("supplier_selection", context))
+        assert len(calls) == 3
+
+        engine = LogisticsDecisionEngine()
+        engine.enable_cache()
+        first = asyncio.run(engine.make_decision("supplier_selection", context))
+        again = asyncio.run(engine.make_decision("supplier_selection", dict(context, suppliers=SUPPLIERS[::-1])))
+
+        assert len(calls) == 4
+        assert "cached" not in first
+        assert again["cached"] is True
+        assert again["recommended_supplier"] == first["recommended_supplier"]
+        assert again["source_action_id"] == first["action_id"]
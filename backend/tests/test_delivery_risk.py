@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Tests for batch delivery delay-risk scoring
+"""
+
+import pytest
+import sys
+import time
+from datetime import datetime, timedelta
+sys.path.append('..')
+
+import numpy as np
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from database.models import Base, Shipment, Courier, DeliveryEvent
+from delivery_risk import DeliveryRiskScorer
+
+NOW = datetime(2024, 3, 1, 12, 0)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add(Courier(courier_id="FAST", name="Fast", avg_delivery_days=2))
+    session.add(Courier(courier_id="SLOW", name="Slow", avg_delivery_days=5))
+    yield session
+    session.close()
+
+
+def add_shipment(db, shipment_id, courier_id="FAST", status="in_transit", due_hours=48.0,
+                 created_hours_ago=10.0, **fields):
+    db.add(Shipment(shipment_id=shipment_id, order_id=len(shipment_id), courier_id=courier_id,
+                    tracking_number=f"TRK_{shipment_id}", status=status,
+                    estimated_delivery=NOW + timedelta(hours=due_hours),
+                    created_at=NOW - timedelta(hours=created_hours_ago), **fields))
+
+
+def history(db, courier_id, delivered, late):
+    for i in range(delivered):
+        due = NOW - timedelta(days=10)
+        add_shipment(db, f"H_{courier_id}_{i}", courier_id, status="delivered", due_hours=-240,
+                     actual_delivery=due + timedelta(hours=12 if i < late else -12))
+
+
+class TestDeliveryRiskScorer:
+    """Test risk components and ranking"""
+
+    def test_overdue_and_failed_rank_first(self, db):
+        add_shipment(db, "ON_TIME")
+        add_shipment(db, "OVERDUE", due_hours=-30)
+        add_shipment(db, "FAILED", status="failed")
+        db.commit()
+
+        scored = DeliveryRiskScorer().score_all(db, now=NOW)
+
+        assert [s["shipment_id"] for s in scored] == ["FAILED", "OVERDUE", "ON_TIME"]
+        assert scored[0]["risk_score"] == 1.0
+        assert "overdue" in scored[1]["risk_factors"] and scored[1]["risk_level"] == "medium"
+        assert scored[2]["risk_level"] == "low"
+
+    def test_courier_history_and_events(self, db):
+        history(db, "FAST", delivered=40, late=2)
+        history(db, "SLOW", delivered=40, late=30)
+        add_shipment(db, "A", "FAST")
+        add_shipment(db, "B", "SLOW")
+        add_shipment(db, "C", "FAST")
+        for hours in (5, 3):
+            db.add(DeliveryEvent(shipment_id="C", event_type="delivery_attempt",
+                                 event_description="Delivery failed - customer absent",
+                                 timestamp=NOW - timedelta(hours=hours)))
+        db.commit()
+
+        scored = {s["shipment_id"]: s for s in DeliveryRiskScorer().score_all(db, now=NOW)}
+
+        assert scored["B"]["courier_late_rate"] > scored["A"]["courier_late_rate"]
+        assert scored["B"]["risk_score"] > scored["A"]["risk_score"]
+        assert "failed_attempts" in scored["C"]["risk_factors"]
+        assert scored["C"]["risk_score"] > scored["A"]["risk_score"]
+        assert "H_FAST_0" not in scored
+
+    def test_tight_schedule_and_stale_updates(self, db):
+        add_shipment(db, "EARLY_STAGE", "SLOW", status="created", due_hours=24)
+        add_shipment(db, "NEARLY_THERE", "SLOW", status="out_for_delivery", due_hours=24)
+        add_shipment(db, "QUIET", status="in_transit", created_hours_ago=100)
+        db.commit()
+
+        scored = {s["shipment_id"]: s for s in DeliveryRiskScorer().score_all(db, now=NOW)}
+
+        assert "tight_schedule" in scored["EARLY_STAGE"]["risk_factors"]
+        assert scored["EARLY_STAGE"]["risk_score"] > scored["NEARLY_THERE"]["risk_score"]
+        assert "no_recent_update" in scored["QUIET"]["risk_factors"]
+
+    def test_rank_at_risk_scales_to_thousands(self, db):
+        rng = np.random.default_rng(1)
+        statuses = ["created", "picked_up", "in_transit", "out_for_delivery"]
+        db.execute(insert(Shipment), [
+            {"shipment_id": f"S{i}", "order_id": i, "courier_id": ["FAST", "SLOW"][i % 2],
+             "tracking_number": f"T{i}", "status": statuses[i % 4],
+             "estimated_delivery": NOW + timedelta(hours=float(rng.uniform(-72, 120))),
+             "created_at": NOW - timedelta(hours=float(rng.uniform(0, 96)))}
+            for i in range(5000)
+        ])
+        db.commit()
+
+        started = time.perf_counter()
+        result = DeliveryRiskScorer().rank_at_risk(min_score=0.3, limit=50, db=db, now=NOW)
+        elapsed = time.perf_counter() - started
+
+        assert result["active_shipments"] == 5000
+        assert sum(result["by_level"].values()) == 5000
+        assert len(result["shipments"]) == 50
+        scores = [s["risk_score"] for s in result["shipments"]]
+        assert scores == sorted(scores, reverse=True) and min(scores) >= 0.3
+        assert elapsed < 2.0
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Tests for the persistent geocoding cache
+"""
+
+import pytest
+import os
+import tempfile
+import shutil
+import sys
+sys.path.append('..')
+
+from integrations.geocode_cache import (
+    GeocodeCache, GeocodingNotFound, OfflineGeocoder, normalize_address
+)
+from integrations.google_maps_integration import GoogleMapsIntegration, LocationAnalytics
+
+
+class TestGeocodeCache:
+    """Test the SQLite geocode cache and its use by GoogleMapsIntegration"""
+
+    def setup_method(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.cache = GeocodeCache(db_path=os.path.join(self.test_dir, 'geocode.db'))
+        self.geocoder = OfflineGeocoder({
+            '123 Tech Street, Palo Alto, CA': (37.4419, -122.1430),
+            '456 Innovation Dr, San Francisco, CA': (37.7749, -122.4194)
+        })
+        self.maps = GoogleMapsIntegration(geocoder=self.geocoder, cache=self.cache)
+
+    def teardown_method(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_normalize_address(self):
+        """Equivalent spellings share one cache key"""
+        assert normalize_address('  123 Tech Street,  Palo Alto, CA ') == \
+            normalize_address('123 tech street palo alto ca')
+
+    def test_geocode_is_cached(self):
+        """A repeated lookup is served without calling the geocoder"""
+        first = self.maps.geocode_address('123 Tech Street, Palo Alto, CA')
+        second = self.maps.geocode_address('123 TECH STREET PALO ALTO CA')
+
+        assert first['latitude'] == second['latitude']
+        assert self.geocoder.calls == 1
+        assert self.cache.get_stats()['hits'] == 1
+
+    def test_negative_caching(self):
+        """Unknown addresses are remembered as misses"""
+        with pytest.raises(GeocodingNotFound):
+            self.maps.geocode_address('Nowhere Lane')
+        with pytest.raises(GeocodingNotFound):
+            self.maps.geocode_address('Nowhere Lane')
+
+        assert self.geocoder.calls == 1
+
+    def test_expired_entries_are_refetched(self):
+        """Entries past their TTL are not served"""
+        self.cache.set('geocode', 'old address', {'latitude': 1.0, 'longitude': 2.0}, ttl_seconds=-1)
+
+        found, _ = self.cache.get('geocode', 'old address')
+        assert not found
+        assert self.cache.purge_expired() == 1
+
+    def test_bulk_geocode(self):
+        """Bulk lookups only hit the geocoder for uncached addresses"""
+        self.maps.geocode_address('123 Tech Street, Palo Alto, CA')
+        results = self.maps.bulk_geocode([
+            '123 Tech Street, Palo Alto, CA',
+            '456 Innovation Dr, San Francisco, CA',
+            '456 innovation dr san francisco ca',
+            'Unknown Road'
+        ])
+
+        assert results['Unknown Road'] is None
+        assert results['456 Innovation Dr, San Francisco, CA']['latitude'] == 37.7749
+        assert self.geocoder.calls == 3
+
+    def test_territory_coverage_uses_cache(self):
+        """Territory analytics reads cached locations on later runs"""
+        accounts = [
+            {'account_id': 'ACC_001', 'name': 'TechCorp', 'territory': 'West Coast',
+             'annual_revenue': 5000000, 'billing_address': '123 Tech Street, Palo Alto, CA'},
+            {'account_id': 'ACC_002', 'name': 'StartupCo', 'territory': 'West Coast',
+             'annual_revenue': 1000000, 'billing_address': '456 Innovation Dr, San Francisco, CA'}
+        ]
+        analytics = LocationAnalytics(self.maps)
+
+        first = analytics.analyze_territory_coverage(accounts, 'West Coast')
+        second = analytics.analyze_territory_coverage(accounts, 'West Coast')
+
+        assert first['account_count'] == 2
+        assert second['total_revenue'] == first['total_revenue']
+        assert self.geocoder.calls == 2
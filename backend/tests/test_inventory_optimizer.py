@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Tests for the safety stock and reorder point optimizer
+"""
+
+import pytest
+import sys
+from datetime import datetime, timedelta
+from statistics import NormalDist
+sys.path.append('..')
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database.models import Base, Inventory, Order, PurchaseOrder, Supplier, AgentLog
+from inventory_optimizer import InventoryOptimizer, optimize_parameters
+from procurement_agent import ProcurementAgent
+
+END = datetime(2024, 6, 1)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+
+    rng = np.random.default_rng(5)
+    session.add(Supplier(supplier_id="SUP_A", name="A", lead_time_days=10))
+    session.add(Supplier(supplier_id="SUP_B", name="B", lead_time_days=4))
+    session.add(Inventory(product_id="FAST", current_stock=50, supplier_id="SUP_A", unit_cost=5.0))
+    session.add(Inventory(product_id="SLOW", current_stock=50, supplier_id="SUP_B", unit_cost=40.0))
+    session.add(Inventory(product_id="NEW", current_stock=50, supplier_id="SUP_B", unit_cost=10.0))
+
+    order_id = 1
+    for day in range(90):
+        for pid, rate in (("FAST", 6), ("SLOW", 0.5)):
+            for _ in range(rng.poisson(rate)):
+                session.add(Order(order_id=order_id, status="Delivered", product_id=pid,
+                                  quantity=int(rng.integers(1, 4)),
+                                  order_date=END - timedelta(days=day, hours=3)))
+                order_id += 1
+    # SUP_B actually delivers in about 6 days
+    for i, days in enumerate([5.5, 6.0, 6.5]):
+        session.add(PurchaseOrder(po_number=f"PO{i}", supplier_id="SUP_B", product_id="SLOW",
+                                  quantity=10, unit_cost=40.0, total_cost=400.0, status="delivered",
+                                  created_at=END - timedelta(days=30),
+                                  delivered_at=END - timedelta(days=30 - days)))
+    session.commit()
+    yield session
+    session.close()
+
+
+class TestInventoryOptimizer:
+    """Test parameter computation, diffs and bulk updates"""
+
+    def test_formulas(self):
+        params = optimize_parameters(np.array([10.0]), np.array([3.0]), np.array([4.0]),
+                                     np.array([1.0]), np.array([20.0]), service_level=0.95,
+                                     ordering_cost=50.0, holding_cost_rate=0.25)
+
+        z = NormalDist().inv_cdf(0.95)
+        safety = z * np.sqrt(4 * 9 + 100 * 1)
+        assert params["safety_stock"][0] == int(np.ceil(safety))
+        assert params["reorder_point"][0] == int(np.ceil(40 + safety))
+        assert params["eoq"][0] == int(np.ceil(np.sqrt(2 * 3650 * 50 / 5)))
+
+    def test_recommendations_follow_demand_and_lead_time(self, db):
+        recs = {r["product_id"]: r for r in InventoryOptimizer().recommend(db, end=END)}
+
+        assert recs["FAST"]["recommended"]["reorder_point"] > recs["SLOW"]["recommended"]["reorder_point"]
+        assert recs["SLOW"]["lead_time_days"] == pytest.approx(6.0)
+        assert recs["NEW"]["recommended"] is None
+
+    def test_dry_run_does_not_write(self, db):
+        result = InventoryOptimizer().retune(db, dry_run=True, end=END)
+
+        assert result["changed"] == 2
+        assert result["skipped_insufficient_history"] == 1
+        assert {c["product_id"] for c in result["changes"]} == {"FAST", "SLOW"}
+        assert db.query(Inventory).filter_by(product_id="FAST").one().reorder_point == 10
+
+    def test_apply_bulk_updates(self, db):
+        preview = InventoryOptimizer().retune(db, dry_run=True, end=END)
+
+        InventoryOptimizer().retune(db, dry_run=False, end=END)
+
+        for change in preview["changes"]:
+            item = db.query(Inventory).filter_by(product_id=change["product_id"]).one()
+            assert item.reorder_point == change["reorder_point"]["new"]
+            assert item.max_stock == change["max_stock"]["new"]
+        assert db.query(AgentLog).filter_by(action="inventory_parameters_optimized").count() == 1
+        assert InventoryOptimizer().retune(db, dry_run=True, end=END)["changed"] == 0
+
+    def test_single_day_history_has_no_nan(self, db):
+        recs = InventoryOptimizer(history_days=1, min_demand_days=1).recommend(db, end=END)
+
+        # NaN deviations used to come out of the int cast as huge negative numbers
+        assert all(r["safety_stock"] >= 0 for r in recs)
+        assert recs[0]["recommended"]["reorder_point"] >= 0
+
+    def test_procurement_orders_one_eoq_at_the_reorder_point(self, db):
+        agent = ProcurementAgent()
+        for rec in InventoryOptimizer().recommend(db, end=END):
+            if rec["recommended"]:
+                params = rec["recommended"]
+                item = agent.build_reorder_item(rec["product_id"], params["reorder_point"],
+                                                params["reorder_point"], params["max_stock"])
+                assert item["suggested_quantity"] == rec["eoq"]
+
+    def test_items_without_unit_cost_are_reported_not_retuned(self, db):
+        db.query(Inventory).filter_by(product_id="SLOW").one().unit_cost = 0.0
+        db.commit()
+
+        result = InventoryOptimizer().retune(db, dry_run=True, end=END)
+
+        assert result["skipped_missing_unit_cost"] == ["SLOW"]
+        assert {c["product_id"] for c in result["changes"]} == {"FAST"}
+        assert optimize_parameters(np.array([5.0]), np.array([1.0]), np.array([3.0]), np.array([0.0]),
+                                   np.array([0.0]))["eoq"][0] == 0
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Tests for concurrent request-for-quote fan-out
+"""
+
+import pytest
+import sys
+import time
+import asyncio
+sys.path.append('..')
+
+import httpx
+
+from rfq import RFQClient, Quote, arun_rfq, run_rfq, select_best_quotes
+from supplier_api import main_app
+
+SUPPLIERS = [
+    {"supplier_id": "CHEAP_SLOW", "api_endpoint": "http://cheap/api", "lead_time_days": 10},
+    {"supplier_id": "FAST", "api_endpoint": "http://fast/api", "lead_time_days": 2},
+    {"supplier_id": "SMALL", "api_endpoint": "http://small/api", "lead_time_days": 3},
+    {"supplier_id": "NO_API", "api_endpoint": None},
+]
+
+CATALOG = {
+    "cheap": {"unit_price": 10.0, "available_quantity": 500, "lead_time_days": 10, "delay": 0.2},
+    "fast": {"unit_price": 11.5, "available_quantity": 500, "lead_time_days": 2, "delay": 0.2},
+    "small": {"unit_price": 9.0, "available_quantity": 5, "lead_time_days": 3, "delay": 0.2},
+}
+
+
+def make_transport(catalog):
+    async def handler(request):
+        offer = catalog[request.url.host]
+        await asyncio.sleep(offer["delay"])
+        if offer.get("status"):
+            return httpx.Response(offer["status"])
+        product_id = request.url.path.rsplit("/", 1)[-1]
+        return httpx.Response(200, json={
+            "product_id": product_id, "in_stock": True,
+            "available_quantity": offer["available_quantity"], "unit_price": offer["unit_price"],
+            "minimum_order": 1, "lead_time_days": offer["lead_time_days"]
+        })
+    return httpx.MockTransport(handler)
+
+
+def run(client, lines, suppliers=SUPPLIERS):
+    return asyncio.run(client.run(lines, suppliers))
+
+
+class TestRFQ:
+    """Test quote collection and selection"""
+
+    def test_latency_is_slowest_supplier_not_sum(self):
+        lines = [{"product_id": f"P{i}", "quantity": 20} for i in range(5)]
+        started = time.perf_counter()
+        result = run(RFQClient(timeout=2.0, transport=make_transport(CATALOG)), lines)
+        elapsed = time.perf_counter() - started
+
+        assert len(result["quotes"]) == 15
+        assert result["suppliers_queried"] == 3
+        assert elapsed < 1.0  # 15 sequential requests would take 3s
+
+    def test_best_quote_per_line_depends_on_quantity_and_urgency(self):
+        lines = [
+            {"product_id": "BULK", "quantity": 50, "urgency": "normal"},
+            {"product_id": "RUSH", "suggested_quantity": 50, "urgency": "critical"},
+            {"product_id": "FEW", "quantity": 3},
+        ]
+        result = run(RFQClient(transport=make_transport(CATALOG)), lines)["lines"]
+
+        assert result["BULK"]["best_quote"]["supplier_id"] == "CHEAP_SLOW"
+        assert result["BULK"]["eligible_quotes"] == 2
+        assert result["RUSH"]["best_quote"]["supplier_id"] == "FAST"
+        assert result["FEW"]["best_quote"]["supplier_id"] == "SMALL"
+
+    def test_slow_and_failing_suppliers_do_not_block_the_round(self):
+        catalog = dict(CATALOG, cheap=dict(CATALOG["cheap"], delay=5.0),
+                       small=dict(CATALOG["small"], status=503))
+        started = time.perf_counter()
+        result = run(RFQClient(timeout=0.3, transport=make_transport(catalog)),
+                     [{"product_id": "P1", "quantity": 10}])
+        elapsed = time.perf_counter() - started
+
+        line = result["lines"]["P1"]
+        assert elapsed < 1.0
+        assert line["best_quote"]["supplier_id"] == "FAST"
+        assert line["errors"]["CHEAP_SLOW"].startswith("timeout")
+        assert line["errors"]["SMALL"] == "HTTP 503"
+
+    def test_queued_requests_are_not_timed_out(self):
+        in_flight, peak = 0, 0
+
+        async def handler(request):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.02)
+            in_flight -= 1
+            return httpx.Response(200, json={"in_stock": True, "available_quantity": 100,
+                                             "unit_price": 10.0, "lead_time_days": 2})
+
+        # 900 requests through 50 slots take ~18 rounds of 20ms, well past the 0.1s deadline
+        lines = [{"product_id": f"P{i}", "quantity": 10} for i in range(300)]
+        result = run(RFQClient(timeout=0.1, max_connections=50, transport=httpx.MockTransport(handler)),
+                     lines, SUPPLIERS[:3])
+
+        assert len(result["quotes"]) == 900
+        assert all(q["error"] is None for q in result["quotes"])
+        assert all(line["best_quote"] for line in result["lines"].values())
+        assert peak <= 50
+
+    def test_no_eligible_quote(self):
+        quotes = [Quote("A", "P1", unit_price=5.0, available_quantity=2, in_stock=True),
+                  Quote("B", "P1", error="HTTP 500")]
+        line = select_best_quotes([{"product_id": "P1", "quantity": 10}], quotes)["P1"]
+        assert line["best_quote"] is None
+        assert line["quotes_received"] == 1
+
+    def test_against_mock_supplier_network(self):
+        suppliers = [{"supplier_id": sid, "api_endpoint": f"http://suppliers/{sid}/api"}
+                     for sid in ("SUPPLIER_001", "SUPPLIER_002", "SUPPLIER_003")]
+        client = RFQClient(transport=httpx.ASGITransport(app=main_app))
+        result = run(client, [{"product_id": "A101", "quantity": 1}], suppliers)
+
+        assert all(q["error"] is None for q in result["quotes"])
+        assert {q["lead_time_days"] for q in result["quotes"]} == {5.0, 7.0, 3.0}
+
+    def test_entry_points_work_inside_a_running_loop(self):
+        lines = [{"product_id": "P1", "quantity": 10}]
+        catalog = {host: dict(offer, delay=0.0) for host, offer in CATALOG.items()}
+
+        async def from_async_code():
+            awaited = await arun_rfq(lines, SUPPLIERS, transport=make_transport(catalog))
+            # Sync helpers reached from async code must not hit asyncio.run's loop check
+            blocking = run_rfq(lines, SUPPLIERS, transport=make_transport(catalog))
+            return awaited, blocking
+
+        awaited, blocking = asyncio.run(from_async_code())
+        assert awaited["lines"]["P1"]["best_quote"]["supplier_id"] == "CHEAP_SLOW"
+        assert blocking["lines"] == awaited["lines"]
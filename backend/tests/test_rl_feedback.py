@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Tests for the RL feedback system
+"""
+
+import pytest
+import os
+import tempfile
+import shutil
+import sys
+import threading
+from datetime import datetime
+from types import SimpleNamespace
+sys.path.append('..')
+
+import numpy as np
+
+from rl_feedback_system import (
+    RLFeedbackSystem, RLAgentOptimizer, RLOutcome, ActionType, OutcomeType
+)
+from rl_learning_store import RLLearningStore
+
+
+def record_success(system, action_id):
+    return system.record_outcome(
+        action_id, OutcomeType.SUCCESS, {"success": True},
+        {"actual_cost": 900, "expected_cost": 1000},
+        {"actual_time_hours": 20, "expected_time_hours": 24},
+        4.5, 6.0
+    )
+
+
+class TestRLFeedbackHistory:
+    """Test action indexing and bounded history"""
+
+    def setup_method(self):
+        self.test_dir = tempfile.mkdtemp()
+        optimizer = RLAgentOptimizer(store=RLLearningStore(data_dir=self.test_dir))
+        self.system = RLFeedbackSystem(history_size=50, max_pending_actions=100, optimizer=optimizer)
+
+    def teardown_method(self):
+        self.system.optimizer.store.close()
+        shutil.rmtree(self.test_dir)
+
+    def test_action_ids_are_unique(self):
+        ids = {
+            self.system.record_action("restock_agent", ActionType.RESTOCK_DECISION, {}, 0.8)
+            for _ in range(500)
+        }
+        assert len(ids) == 500
+
+    def test_outcome_matches_action(self):
+        action_id = self.system.record_action(
+            "restock_agent", ActionType.RESTOCK_DECISION, {"expected_cost": 1000}, 0.8
+        )
+
+        reward = record_success(self.system, action_id)
+
+        assert reward is not None
+        assert reward.action_id == action_id
+        assert action_id not in self.system.pending_actions
+        assert record_success(self.system, action_id) is None
+
+    def test_history_is_bounded(self):
+        for _ in range(300):
+            action_id = self.system.record_action("restock_agent", ActionType.RESTOCK_DECISION, {}, 0.8)
+            record_success(self.system, action_id)
+
+        assert len(self.system.action_history) == 50
+        assert len(self.system.reward_history) == 50
+        assert self.system.total_actions == 300
+        assert self.system.total_rewards == 300
+        assert self.system.get_system_analytics()["total_actions"] == 300
+
+    def test_pending_actions_are_evicted(self):
+        first = self.system.record_action("restock_agent", ActionType.RESTOCK_DECISION, {}, 0.8)
+        for _ in range(100):
+            self.system.record_action("restock_agent", ActionType.RESTOCK_DECISION, {}, 0.8)
+
+        assert len(self.system.pending_actions) == 100
+        assert self.system.evicted_actions == 1
+        assert record_success(self.system, first) is None
+
+
+class TestRLLearningStore:
+    """Test the append-only reward log and checkpoints"""
+
+    def setup_method(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def teardown_method(self):
+        shutil.rmtree(self.test_dir)
+
+    def make_optimizer(self, checkpoint_interval=500):
+        return RLAgentOptimizer(store=RLLearningStore(
+            data_dir=self.test_dir, checkpoint_interval=checkpoint_interval
+        ))
+
+    def record_rewards(self, optimizer, count):
+        system = RLFeedbackSystem(optimizer=optimizer)
+        for _ in range(count):
+            action_id = system.record_action("restock_agent", ActionType.RESTOCK_DECISION, {}, 0.8)
+            record_success(system, action_id)
+        return system
+
+    def test_rewards_survive_restart_without_checkpoint(self):
+        optimizer = self.make_optimizer()
+        self.record_rewards(optimizer, 5)
+        optimizer.store.close()
+
+        reloaded = self.make_optimizer()
+
+        assert reloaded.agent_performance == optimizer.agent_performance
+        assert reloaded.agent_performance["restock_agent"]["total_actions"] == 5
+
+    def test_checkpoint_compacts_log(self):
+        optimizer = self.make_optimizer(checkpoint_interval=4)
+        self.record_rewards(optimizer, 10)
+        optimizer.store.close()
+
+        with open(os.path.join(self.test_dir, "reward_log.jsonl")) as f:
+            assert len(f.readlines()) == 2
+
+        reloaded = self.make_optimizer()
+        assert reloaded.agent_performance["restock_agent"]["total_actions"] == 10
+
+    def test_replay_skips_entries_already_checkpointed(self):
+        optimizer = self.make_optimizer()
+        self.record_rewards(optimizer, 3)
+        with open(os.path.join(self.test_dir, "reward_log.jsonl")) as f:
+            log_before = f.read()
+        optimizer.save_learning_data()
+        optimizer.store.close()
+
+        # Simulate a crash after the checkpoint was written but before truncation
+        with open(os.path.join(self.test_dir, "reward_log.jsonl"), "w") as f:
+            f.write(log_before)
+
+        reloaded = self.make_optimizer()
+        assert reloaded.agent_performance["restock_agent"]["total_actions"] == 3
+
+    def test_torn_final_line_is_ignored(self):
+        optimizer = self.make_optimizer()
+        self.record_rewards(optimizer, 2)
+        optimizer.store.close()
+        with open(os.path.join(self.test_dir, "reward_log.jsonl"), "a") as f:
+            f.write('{"type":"reward","agent":"rest')
+
+        reloaded = self.make_optimizer()
+        assert reloaded.agent_performance["restock_agent"]["total_actions"] == 2
+
+    def test_rewards_appended_after_a_torn_tail_survive_restart(self):
+        optimizer = self.make_optimizer()
+        self.record_rewards(optimizer, 2)
+        optimizer.store.close()
+        with open(os.path.join(self.test_dir, "reward_log.jsonl"), "a") as f:
+            f.write('{"type":"reward","agent":"rest')
+
+        recovered = self.make_optimizer()
+        self.record_rewards(recovered, 5)
+        recovered.store.close()
+
+        reloaded = self.make_optimizer()
+        assert reloaded.agent_performance["restock_agent"]["total_actions"] == 7
+
+    def test_unreadable_checkpoint_does_not_hide_new_rewards(self):
+        optimizer = self.make_optimizer(checkpoint_interval=4)
+        self.record_rewards(optimizer, 4)
+        optimizer.store.close()
+        with open(os.path.join(self.test_dir, "learning_checkpoint.json"), "w") as f:
+            f.write('{"last_seq": 4, "state": {')
+
+        recovered = self.make_optimizer()
+        self.record_rewards(recovered, 3)
+        recovered.store.close()
+
+        reloaded = self.make_optimizer()
+        assert reloaded.agent_performance["restock_agent"]["total_actions"] == 3
+
+
+    def test_checkpoints_taken_during_concurrent_updates_lose_nothing(self):
+        optimizer = self.make_optimizer(checkpoint_interval=40)
+
+        def record(agent_name):
+            for i in range(200):
+                optimizer.update_agent_performance(agent_name, SimpleNamespace(net_reward=1.0))
+                if i % 40 == 20:
+                    optimizer.save_learning_data()
+
+        threads = [threading.Thread(target=record, args=(f"agent_{n}",)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        optimizer.store.close()
+
+        reloaded = self.make_optimizer()
+        assert {agent: perf["total_actions"] for agent, perf in reloaded.agent_performance.items()} == \
+            {f"agent_{n}": 200 for n in range(4)}
+
+
+class TestBatchRewards:
+    """Test vectorized reward computation and running aggregates"""
+
+    def setup_method(self):
+        self.test_dir = tempfile.mkdtemp()
+        optimizer = RLAgentOptimizer(store=RLLearningStore(data_dir=self.test_dir))
+        self.system = RLFeedbackSystem(history_size=100, optimizer=optimizer)
+
+    def teardown_method(self):
+        self.system.optimizer.store.close()
+        shutil.rmtree(self.test_dir)
+
+    def make_pairs(self, count):
+        rng = np.random.default_rng(11)
+        outcome_types = list(OutcomeType)
+        actions, outcomes = [], []
+        for i in range(count):
+            agent = ["restock_agent", "procurement_agent", "delivery_agent"][i % 3]
+            action_id = self.system.record_action(
+                agent, ActionType.RESTOCK_DECISION,
+                {"expected_cost": float(rng.uniform(100, 2000)), "expected_time_hours": 24},
+                float(rng.uniform(0.2, 1.0))
+            )
+            actions.append(self.system.pending_actions[action_id])
+            outcomes.append(RLOutcome(
+                action_id=action_id,
+                outcome_type=outcome_types[i % len(outcome_types)],
+                success_metrics={},
+                cost_metrics={"actual_cost": float(rng.uniform(100, 2000)),
+                              "failure_cost": float(rng.uniform(0, 500)),
+                              "resource_waste": float(rng.uniform(0, 100))},
+                time_metrics={"actual_time_hours": float(rng.uniform(10, 40))},
+                customer_satisfaction=float(rng.uniform(1, 5)),
+                business_impact=float(rng.uniform(0, 10)),
+                timestamp=datetime.now()
+            ))
+        return actions, outcomes
+
+    def test_batch_matches_scalar(self):
+        actions, outcomes = self.make_pairs(200)
+        calculator = self.system.reward_calculator
+
+        batch = calculator.calculate_rewards_batch(actions, outcomes)
+        expected = [calculator.calculate_reward(a, o) for a, o in zip(actions, outcomes)]
+
+        for reward, scalar in zip(batch.to_rewards(), expected):
+            assert reward.net_reward == pytest.approx(scalar.net_reward)
+            assert reward.learning_weight == pytest.approx(scalar.learning_weight)
+            assert reward.penalty_components == pytest.approx(scalar.penalty_components)
+
+    def test_running_aggregates(self):
+        _, outcomes = self.make_pairs(300)
+
+        batch = self.system.record_outcomes_batch(outcomes)
+
+        perf = self.system.optimizer.agent_performance["restock_agent"]
+        rewards = batch.net_reward[batch.agent_names == "restock_agent"]
+        assert perf["total_actions"] == 100
+        assert perf["average_reward"] == pytest.approx(rewards.mean())
+        assert perf["reward_variance"] == pytest.approx(rewards.var())
+        assert len(self.system.reward_history) == 100
+        assert self.system.total_rewards == 300
+
+    def test_batch_then_single_updates_agree(self):
+        _, outcomes = self.make_pairs(30)
+        batch = self.system.record_outcomes_batch(outcomes[:15])
+        singles = [self.system.record_outcome(
+            o.action_id, o.outcome_type, o.success_metrics, o.cost_metrics, o.time_metrics,
+            o.customer_satisfaction, o.business_impact
+        ) for o in outcomes[15:]]
+
+        rewards = np.concatenate((batch.net_reward, [r.net_reward for r in singles]))
+        agents = list(batch.agent_names) + [o.action_id for o in outcomes[15:]]
+        delivery = rewards[[agent.startswith("delivery_agent") for agent in agents]]
+        perf = self.system.optimizer.agent_performance["delivery_agent"]
+        assert perf["total_actions"] == 10
+        assert perf["reward_variance"] == pytest.approx(delivery.var())
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Tests for the spatial proximity index
+"""
+
+import pytest
+import random
+import sys
+import threading
+sys.path.append('..')
+
+import numpy as np
+
+from integrations.spatial_index import SpatialIndex, haversine_distances
+
+
+class TestSpatialIndex:
+    """Test radius and nearest-neighbour queries against brute force"""
+
+    def setup_method(self):
+        rng = random.Random(42)
+        self.points = {
+            f"ACC_{i:04d}": (rng.uniform(12.0, 14.0), rng.uniform(77.0, 79.0))
+            for i in range(2000)
+        }
+        self.index = SpatialIndex(cell_size_degrees=0.1)
+        self.index.add_many((pid, lat, lon, None) for pid, (lat, lon) in self.points.items())
+
+    def brute_force(self, lat, lon):
+        ids = list(self.points)
+        distances = haversine_distances(
+            lat, lon, [self.points[i][0] for i in ids], [self.points[i][1] for i in ids]
+        )
+        return ids, distances
+
+    def test_haversine_known_distance(self):
+        """Bangalore to Chennai is roughly 290 km"""
+        distance = haversine_distances(12.9716, 77.5946, [13.0827], [80.2707])[0]
+        assert 285 < distance < 295
+
+    def test_within_radius_matches_brute_force(self):
+        ids, distances = self.brute_force(13.0, 78.0)
+        expected = {ids[i] for i in np.nonzero(distances <= 20)[0]}
+
+        results = self.index.within_radius(13.0, 78.0, 20)
+
+        assert {r['id'] for r in results} == expected
+        assert all(a['distance_km'] <= b['distance_km'] for a, b in zip(results, results[1:]))
+
+    def test_nearest_matches_brute_force(self):
+        ids, distances = self.brute_force(12.5, 77.5)
+        expected = [ids[i] for i in np.argsort(distances)[:7]]
+
+        results = self.index.nearest(12.5, 77.5, k=7)
+
+        assert [r['id'] for r in results] == expected
+
+    def test_nearest_from_far_away(self):
+        """Queries far outside the data still find the closest points"""
+        results = self.index.nearest(40.0, -74.0, k=3)
+        assert len(results) == 3
+
+    def test_move_and_remove(self):
+        self.index.add('ACC_0000', 51.5, -0.12)
+        assert self.index.nearest(51.5, -0.12, k=1)[0]['id'] == 'ACC_0000'
+
+        assert self.index.remove('ACC_0000')
+        assert 'ACC_0000' not in self.index
+        assert not self.index.within_radius(51.5, -0.12, 50)
+
+    def test_antimeridian(self):
+        index = SpatialIndex()
+        index.add('FIJI', -17.7, 179.95)
+        results = index.within_radius(-17.7, -179.95, 20)
+        assert [r['id'] for r in results] == ['FIJI']
+
+    def test_queries_while_another_thread_writes(self):
+        """Handlers query while the startup build and account edits write"""
+        errors = []
+        done = threading.Event()
+
+        def writer():
+            rng = random.Random(1)
+            try:
+                for i in range(20000):
+                    # Spread writes over many new cells so the cell map keeps resizing
+                    self.index.add(f"NEW_{i}", rng.uniform(-60, 60), rng.uniform(-170, 170))
+                    if i % 3 == 0:
+                        self.index.remove(f"NEW_{i // 2}")
+            except Exception as e:
+                errors.append(e)
+            finally:
+                done.set()
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        try:
+            while not done.is_set():
+                self.index.within_radius(13.0, 78.0, 20000)
+                self.index.nearest(0.0, 0.0, k=50)
+        except Exception as e:
+            errors.append(e)
+        thread.join()
+
+        assert errors == []
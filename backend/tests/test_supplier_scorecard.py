@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Tests for incrementally maintained supplier scorecards
+"""
+
+import pytest
+import sys
+import asyncio
+from datetime import datetime, timedelta
+sys.path.append('..')
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import logistics_ai_decisions
+from database.models import Base, PurchaseOrder, Supplier, Inventory, SupplierScorecard
+from database.supplier_scorecard import get_scorecards, rebuild_scorecards
+
+START = datetime(2024, 1, 1)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add(Supplier(supplier_id="SUP_A", name="A", lead_time_days=5))
+    session.add(Inventory(product_id="P1", current_stock=10, unit_cost=10.0))
+    session.commit()
+    yield session
+    session.close()
+
+
+def create_po(db, number, unit_cost=10.0, quantity=10, supplier_id="SUP_A", expected_days=5):
+    po = PurchaseOrder(po_number=number, supplier_id=supplier_id, product_id="P1", quantity=quantity,
+                       unit_cost=unit_cost, total_cost=unit_cost * quantity, status="pending",
+                       created_at=START, expected_delivery=START + timedelta(days=expected_days))
+    db.add(po)
+    db.commit()
+    return po
+
+
+def deliver(db, po, days):
+    po.status = "delivered"
+    po.delivered_at = START + timedelta(days=days)
+    db.commit()
+
+
+class TestSupplierScorecard:
+    """Test scorecard maintenance on purchase order changes"""
+
+    def test_updates_on_each_status_change(self, db):
+        first = create_po(db, "PO1", unit_cost=12.0)
+        second = create_po(db, "PO2", unit_cost=8.0)
+        third = create_po(db, "PO3")
+
+        card = get_scorecards(db=db)["SUP_A"]
+        assert card["total_orders"] == 3 and card["open_orders"] == 3
+        assert card["total_value"] == 300.0
+        assert card["cost_index"] == pytest.approx(1.0)
+
+        deliver(db, first, 4)
+        deliver(db, second, 8)
+        third.status = "cancelled"
+        db.commit()
+
+        card = get_scorecards(["SUP_A"], db=db)["SUP_A"]
+        assert card["open_orders"] == 0
+        assert card["delivered_orders"] == 2 and card["cancelled_orders"] == 1
+        assert card["on_time_rate"] == 0.5
+        assert card["lead_time_mean_days"] == 6.0
+        assert card["lead_time_std_days"] == pytest.approx(2.83, abs=0.01)
+
+        second.status = "returned"
+        db.commit()
+        card = get_scorecards(db=db)["SUP_A"]
+        assert card["delivered_orders"] == 1 and card["defective_orders"] == 1
+        assert card["defect_rate"] == 0.5
+        assert card["on_time_rate"] == 0.5 and card["lead_time_mean_days"] == 6.0
+
+    def test_unchanged_status_is_not_counted_twice(self, db):
+        po = create_po(db, "PO1")
+        po.notes = "called supplier"
+        db.commit()
+        po.status = "sent"
+        db.commit()
+        po.status = "sent"
+        db.commit()
+
+        card = db.query(SupplierScorecard).filter_by(supplier_id="SUP_A").one()
+        assert card.total_orders == 1 and card.open_orders == 1
+
+    def test_order_created_without_status_counts_as_pending(self, db):
+        po = PurchaseOrder(po_number="PO1", supplier_id="SUP_A", product_id="P1", quantity=10,
+                           unit_cost=10.0, total_cost=100.0, created_at=START)
+        db.add(po)
+        db.commit()
+        assert po.status == "pending"
+
+        card = get_scorecards(db=db)["SUP_A"]
+        assert card["total_orders"] == 1 and card["open_orders"] == 1
+
+        deliver(db, po, 4)
+        card = get_scorecards(db=db)["SUP_A"]
+        assert card["total_orders"] == 1 and card["open_orders"] == 0
+        assert card["delivered_orders"] == 1
+
+    def test_deleted_and_reassigned_orders_leave_the_scorecard(self, db):
+        db.add(Supplier(supplier_id="SUP_B", name="B", lead_time_days=5))
+        kept = create_po(db, "PO1", unit_cost=12.0)
+        moved = create_po(db, "PO2", unit_cost=8.0)
+        dropped = create_po(db, "PO3", unit_cost=20.0)
+        deliver(db, kept, 4)
+        deliver(db, moved, 8)
+        deliver(db, dropped, 10)
+
+        moved.supplier_id = "SUP_B"
+        db.delete(dropped)
+        db.commit()
+
+        cards = get_scorecards(db=db)
+        assert cards["SUP_A"]["total_orders"] == 1 and cards["SUP_A"]["delivered_orders"] == 1
+        assert cards["SUP_A"]["total_value"] == 120.0
+        assert cards["SUP_A"]["lead_time_mean_days"] == 4.0 and cards["SUP_A"]["lead_time_std_days"] == 0.0
+        assert cards["SUP_A"]["cost_index"] == pytest.approx(1.2)
+        assert cards["SUP_B"]["delivered_orders"] == 1 and cards["SUP_B"]["on_time_rate"] == 0.0
+        assert cards["SUP_B"]["cost_index"] == pytest.approx(0.8)
+
+        rebuilt = {card["supplier_id"]: card for card in rebuild_scorecards(db)}
+        for supplier_id in ("SUP_A", "SUP_B"):
+            for field in ("total_orders", "delivered_orders", "on_time_rate", "lead_time_mean_days",
+                          "lead_time_std_days", "cost_index", "total_value"):
+                assert rebuilt[supplier_id][field] == pytest.approx(cards[supplier_id][field])
+
+    def test_rebuild_matches_incremental(self, db):
+        for i in range(20):
+            po = create_po(db, f"PO{i}", unit_cost=8.0 + i % 5)
+            if i % 3 == 0:
+                deliver(db, po, 3 + i % 4)
+                if i % 2 == 0:
+                    po.status = "rejected"
+                    db.commit()
+            elif i % 7 == 0:
+                po.status = "cancelled"
+                db.commit()
+
+        incremental = get_scorecards(db=db)["SUP_A"]
+        rebuilt = {card["supplier_id"]: card for card in rebuild_scorecards(db)}["SUP_A"]
+        for field in ("total_orders", "open_orders", "delivered_orders", "defective_orders", "cancelled_orders",
+                      "on_time_rate", "lead_time_mean_days", "lead_time_std_days", "cost_index"):
+            assert rebuilt[field] == incremental[field]
+        assert db.query(SupplierScorecard).count() == 1
+
+    def test_supplier_selection_uses_scorecards(self, db, monkeypatch):
+        monkeypatch.setattr(logistics_ai_decisions, "record_agent_action", lambda *args: "action")
+        monkeypatch.setattr(logistics_ai_decisions, "record_action_outcome", lambda *args: None)
+        for i in range(4):
+            deliver(db, create_po(db, f"PO{i}"), 9)
+        monkeypatch.setattr(logistics_ai_decisions, "get_scorecards", lambda ids: get_scorecards(ids, db=db))
+
+        engine = logistics_ai_decisions.LogisticsDecisionEngine()
+        decision = asyncio.run(engine.make_decision("supplier_selection", {"suppliers": [
+            {"id": "SUP_A", "name": "A", "reliability": 0.95, "cost_factor": 1.0, "lead_time_days": 5},
+            {"id": "SUP_B", "name": "B", "reliability": 0.9, "cost_factor": 1.0, "lead_time_days": 6},
+        ]}))
+
+        by_id = {s["supplier_id"]: s for s in decision["all_suppliers"]}
+        assert by_id["SUP_A"]["metrics_source"] == "scorecard"
+        assert by_id["SUP_A"]["reliability"] == 0.0 and by_id["SUP_A"]["lead_time_days"] == 9.0
+        assert by_id["SUP_B"]["metrics_source"] == "context"
+        assert decision["recommended_supplier"]["supplier_id"] == "SUP_B"
+
+    def test_performance_report_reads_the_scorecard_by_default(self, db, monkeypatch):
+        import supplier_communication
+        monkeypatch.setattr(supplier_communication, "SessionLocal", lambda: db)
+        now = datetime.utcnow()
+        for i in range(3):
+            po = create_po(db, f"PO{i}")
+            po.created_at = now
+            deliver(db, po, 4)
+        po.status = "returned"
+        db.commit()
+
+        scs = supplier_communication.SupplierCommunicationSystem()
+        report = scs.get_supplier_performance_report("SUP_A")
+        windowed = scs.get_supplier_performance_report("SUP_A", days=30)
+
+        assert report["period_days"] is None and report["defect_rate"] == pytest.approx(1 / 3, abs=1e-4)
+        for field in ("total_orders", "delivered_orders", "pending_orders", "delivery_rate"):
+            assert report[field] == windowed[field]
+        assert report["delivered_orders"] == 2
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Tests for the territory clustering engine
+"""
+
+import pytest
+import sys
+sys.path.append('..')
+
+import numpy as np
+
+from integrations.territory_clustering import TerritoryClusteringEngine
+
+
+def make_accounts(count, seed=7):
+    rng = np.random.default_rng(seed)
+    # Three dense cities with uneven account counts plus rural accounts
+    cities = [(12.97, 77.59, 0.6), (13.08, 80.27, 0.25), (17.38, 78.48, 0.15)]
+    accounts = []
+    for i in range(count):
+        lat, lon, _ = cities[rng.choice(3, p=[c[2] for c in cities])]
+        accounts.append({
+            'account_id': f"ACC_{i:05d}",
+            'latitude': lat + rng.normal(0, 0.3),
+            'longitude': lon + rng.normal(0, 0.3),
+            'annual_revenue': float(rng.lognormal(13, 1)),
+            'visit_count': int(rng.poisson(4)),
+            'territory': 'South' if lat < 15 else 'Central'
+        })
+    return accounts
+
+
+class TestTerritoryClustering:
+    """Test balanced territory proposals"""
+
+    @pytest.mark.parametrize('count,territories', [(3000, 6), (3000, 10), (10000, 8)])
+    @pytest.mark.parametrize('seed', [1, 2, 3])
+    def test_territories_are_balanced(self, count, territories, seed):
+        accounts = make_accounts(count)
+        engine = TerritoryClusteringEngine(territories, random_state=seed)
+
+        result = engine.fit(accounts)
+
+        assert result['territory_count'] == territories
+        assert len(result['assignments']) == count
+        assert result['balance']['max_load_ratio'] <= 1.15
+        assert result['balance']['min_load_ratio'] >= 0.85
+        assert result['iterations'] < engine.max_iterations
+        assert sum(t['account_count'] for t in result['territories']) == count
+
+    def test_existing_names_are_reused(self):
+        accounts = make_accounts(500)
+        current = {acc['account_id']: acc['territory'] for acc in accounts}
+        engine = TerritoryClusteringEngine(2, random_state=3)
+
+        result = engine.fit(accounts, current_assignments=current)
+
+        names = {t['territory'] for t in result['territories']}
+        assert names & {'South', 'Central'}
+        assert all(change['from'] != change['to'] for change in result['changes'])
+
+    def test_incremental_assignment(self):
+        accounts = make_accounts(1000)
+        engine = TerritoryClusteringEngine(4, random_state=5)
+        engine.fit(accounts[:900])
+
+        placed = engine.assign_incremental(accounts[900:])
+
+        assert len(placed) == 100
+        assert set(placed.values()) <= set(engine.territory_names)
+        assert engine.report()['account_count'] == 1000
+
+    def test_requires_accounts(self):
+        with pytest.raises(ValueError):
+            TerritoryClusteringEngine(3).fit([])
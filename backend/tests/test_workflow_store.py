@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Tests for the bounded workflow store
+"""
+
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+sys.path.append('..')
+
+from workflow_store import WorkflowStore
+
+
+def make_workflow(i, status="processing"):
+    return {"workflow_id": f"wf_{i}", "status": status, "decisions": []}
+
+
+class TestWorkflowStore:
+    """Test indexing, eviction and persistence"""
+
+    def setup_method(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def teardown_method(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_status_index_follows_in_place_updates(self):
+        store = WorkflowStore()
+        workflow = make_workflow(1)
+        store.put(workflow)
+
+        workflow["status"] = "completed"
+        store.put(workflow)
+
+        assert store.count_by_status() == {"completed": 1}
+        assert store.by_status("processing") == []
+        assert store.get("wf_1")["status"] == "completed"
+
+    def test_memory_stays_bounded(self):
+        store = WorkflowStore(max_workflows=100)
+        for i in range(5000):
+            workflow = make_workflow(i)
+            store.put(workflow)
+            workflow["status"] = "completed" if i % 10 else "failed"
+            store.put(workflow)
+
+        assert len(store) == 100
+        assert sum(store.count_by_status().values()) == 100
+        assert store.evicted_completed == 4900
+        assert "wf_4999" in store and "wf_0" not in store
+
+    def test_completed_evicted_before_running(self):
+        store = WorkflowStore(max_workflows=3)
+        store.put(make_workflow(1))
+        store.put(make_workflow(2, "completed"))
+        store.put(make_workflow(3))
+        store.put(make_workflow(4))
+
+        assert "wf_1" in store and "wf_2" not in store
+        assert store.evicted_active == 0
+
+    def test_finished_workflows_expire(self):
+        store = WorkflowStore(completed_ttl_seconds=0)
+        store.put(make_workflow(1, "completed"))
+        store.put(make_workflow(2))
+
+        assert "wf_1" not in store
+        assert store.by_status("processing")[0]["workflow_id"] == "wf_2"
+
+    def test_recent_and_age_queries(self):
+        store = WorkflowStore()
+        for i in range(20):
+            store.put(make_workflow(i))
+
+        assert [w["workflow_id"] for w in store.recent(3)] == ["wf_17", "wf_18", "wf_19"]
+        assert len(store.older_than(-1)) == 20
+        assert store.older_than(3600) == []
+
+    def test_evicted_workflows_are_persisted(self):
+        db_path = os.path.join(self.test_dir, "workflows.db")
+        store = WorkflowStore(max_workflows=2, db_path=db_path)
+        for i in range(5):
+            store.put(make_workflow(i, "completed"))
+
+        assert "wf_0" not in store
+        assert store.get("wf_0")["status"] == "completed"
+        assert store.set_status("wf_0", "failed", error="late")
+        store.close()
+
+        reopened = WorkflowStore(db_path=db_path)
+        assert reopened.get("wf_0")["error"] == "late"
+        reopened.close()
+
+    def test_workflow_manager_uses_store(self):
+        from logistics_ai_decisions import LogisticsWorkflowManager
+
+        manager = LogisticsWorkflowManager(store=WorkflowStore(max_workflows=5))
+        results = [asyncio.run(manager.process_order_workflow({"id": f"ORD_{i}"})) for i in range(8)]
+
+        assert len({r["workflow_id"] for r in results}) == 8
+        assert len(manager.get_active_workflows()) == 5
+        assert manager.get_workflow_status(results[-1]["workflow_id"])["status"] == results[-1]["status"]
+        assert "processing" not in manager.get_workflow_counts()
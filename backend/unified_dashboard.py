@@ -215,11 +215,11 @@ def show_overview_page():
         st.metric("Emails Sent", "47", "+12 today")
     
     with col6:
-        rl_actions = len(rl_feedback_system.action_history)
+        rl_actions = rl_feedback_system.total_actions
         st.metric("RL Actions", rl_actions, "+8 today")
     
     with col7:
-        ai_workflows = len(logistics_workflow_manager.get_active_workflows())
+        ai_workflows = sum(logistics_workflow_manager.get_workflow_counts().values())
         st.metric("AI Workflows", ai_workflows, "+3 today")
     
     # Quick charts
@@ -873,7 +873,7 @@ def show_rl_page():
             # Learning progress chart
             st.subheader("📈 Learning Progress")
             if len(rl_feedback_system.reward_history) > 0:
-                rewards_data = [(i, r.net_reward) for i, r in enumerate(rl_feedback_system.reward_history[-50:])]
+                rewards_data = [(i, r.net_reward) for i, r in enumerate(list(rl_feedback_system.reward_history)[-50:])]
                 if rewards_data:
                     rewards_df = pd.DataFrame(rewards_data, columns=['Action', 'Reward'])
                     fig = px.line(rewards_df, x='Action', y='Reward', title="Recent Reward Trends")
@@ -1026,14 +1026,14 @@ def show_rl_page():
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            total_actions = len(rl_feedback_system.action_history)
+            total_actions = rl_feedback_system.total_actions
             if total_actions > 0:
                 st.success(f"✅ {total_actions} actions recorded")
             else:
                 st.warning("⚠️ No actions recorded yet")
         
         with col2:
-            total_rewards = len(rl_feedback_system.reward_history)
+            total_rewards = rl_feedback_system.total_rewards
             if total_rewards > 0:
                 st.success(f"✅ {total_rewards} rewards calculated")
             else:
@@ -1053,7 +1053,7 @@ def show_rl_page():
             st.info("• Run more agent actions to improve learning accuracy")
         
         if total_rewards > 0:
-            avg_reward = sum(r.net_reward for r in rl_feedback_system.reward_history) / total_rewards
+            avg_reward = rl_feedback_system.total_net_reward / total_rewards
             if avg_reward < 0:
                 st.warning("• Average reward is negative - review agent parameters")
             elif avg_reward > 50:
@@ -1075,10 +1075,7 @@ def show_rl_page():
             if st.button("🔄 Reset Learning Data"):
                 if st.checkbox("Confirm reset (this cannot be undone)"):
                     try:
-                        rl_feedback_system.action_history.clear()
-                        rl_feedback_system.outcome_history.clear()
-                        rl_feedback_system.reward_history.clear()
-                        rl_feedback_system.optimizer.agent_performance.clear()
+                        rl_feedback_system.reset()
                         st.success("✅ Learning data reset")
                         st.rerun()
                     except Exception as e:
@@ -1341,22 +1338,21 @@ def show_ai_decisions_page():
         st.subheader("📈 Decision Analytics")
         
         # Active workflows
-        active_workflows = logistics_workflow_manager.get_active_workflows()
+        workflow_counts = logistics_workflow_manager.get_workflow_counts()
+        active_workflows = logistics_workflow_manager.get_active_workflows(limit=10)
         
         col1, col2, col3 = st.columns(3)
         with col1:
-            st.metric("Active Workflows", len(active_workflows))
+            st.metric("Active Workflows", sum(workflow_counts.values()))
         with col2:
-            completed = sum(1 for w in active_workflows if w.get("status") == "completed")
-            st.metric("Completed", completed)
+            st.metric("Completed", workflow_counts.get("completed", 0))
         with col3:
-            failed = sum(1 for w in active_workflows if w.get("status") == "failed")
-            st.metric("Failed", failed)
+            st.metric("Failed", workflow_counts.get("failed", 0))
         
         if active_workflows:
             st.subheader("Recent Workflows")
             workflows_data = []
-            for workflow in active_workflows[-10:]:  # Last 10 workflows
+            for workflow in active_workflows:  # Last 10 workflows
                 workflows_data.append({
                     "Workflow ID": workflow.get("workflow_id", "Unknown"),
                     "Order ID": workflow.get("order_id", "N/A"),
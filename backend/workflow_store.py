@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Bounded Workflow Store for Logistics Workflows
+Keeps recent workflows in memory with status and age indexes, evicts finished
+workflows first, and optionally writes every workflow through to SQLite.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+class WorkflowStore:
+    """In-memory workflow store with bounded size.
+
+    ``_workflows`` keeps insertion order, so it doubles as the age index
+    (oldest first). ``_by_status`` maps each status to an ordered set of
+    workflow ids, ordered by when they were last updated. Lookups by id,
+    status counts and moving a workflow between statuses are all O(1).
+
+    Finished workflows (``completed``/``failed``) are dropped from memory once
+    they are older than ``completed_ttl_seconds`` or when the store is over
+    ``max_workflows``, oldest first. Running workflows are only evicted if
+    the store is full of them. With ``db_path`` set, every write is also
+    stored in SQLite, and workflows evicted from memory can still be
+    looked up by id.
+    """
+
+    def __init__(self, max_workflows: int = 10000, completed_ttl_seconds: float = 3600,
+                 db_path: Optional[str] = None):
+        self.max_workflows = max_workflows
+        self.completed_ttl_seconds = completed_ttl_seconds
+        self._workflows: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._by_status: Dict[str, "OrderedDict[str, None]"] = {}
+        # Status each id is indexed under; callers may mutate and re-put the same dict
+        self._indexed_status: Dict[str, str] = {}
+        self._lock = threading.RLock()
+
+        self.evicted_completed = 0
+        self.evicted_active = 0
+
+        self._conn = None
+        if db_path:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._init_database()
+
+    def _init_database(self):
+        """Initialize the workflows table"""
+        with self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS workflows (
+                    workflow_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    payload TEXT NOT NULL
+                )
+            ''')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_workflows_status ON workflows (status, updated_at)')
+
+    # === Writes ===
+
+    def put(self, workflow: Dict[str, Any]):
+        """Insert or update a workflow (keyed by ``workflow_id``)"""
+        workflow_id = workflow["workflow_id"]
+        now = time.time()
+
+        with self._lock:
+            previous = self._workflows.get(workflow_id)
+            workflow.setdefault("created_at", previous["created_at"] if previous else now)
+            workflow["updated_at"] = now
+
+            old_status = self._indexed_status.get(workflow_id)
+            if old_status is not None and old_status != workflow["status"]:
+                self._by_status[old_status].pop(workflow_id, None)
+            self._workflows[workflow_id] = workflow
+            self._indexed_status[workflow_id] = workflow["status"]
+            index = self._by_status.setdefault(workflow["status"], OrderedDict())
+            index[workflow_id] = None
+            index.move_to_end(workflow_id)
+
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute(
+                        'INSERT OR REPLACE INTO workflows (workflow_id, status, created_at, updated_at, payload) '
+                        'VALUES (?, ?, ?, ?, ?)',
+                        (workflow_id, workflow["status"], workflow["created_at"], now,
+                         json.dumps(workflow, default=str))
+                    )
+
+            self._evict(now)
+
+    def set_status(self, workflow_id: str, status: str, **fields) -> bool:
+        """Move a workflow to a new status, optionally updating fields"""
+        with self._lock:
+            workflow = self.get(workflow_id)
+            if workflow is None:
+                return False
+            self.put(dict(workflow, status=status, **fields))
+            return True
+
+    def _remove(self, workflow_id: str):
+        self._workflows.pop(workflow_id)
+        self._by_status[self._indexed_status.pop(workflow_id)].pop(workflow_id, None)
+
+    def _oldest_terminal(self) -> Optional[str]:
+        heads = [next(iter(self._by_status[status])) for status in TERMINAL_STATUSES
+                 if self._by_status.get(status)]
+        return min(heads, key=lambda wid: self._workflows[wid]["updated_at"], default=None)
+
+    def _evict(self, now: float):
+        # Expire finished workflows; each status index is ordered by update time
+        cutoff = now - self.completed_ttl_seconds
+        for status in TERMINAL_STATUSES:
+            index = self._by_status.get(status)
+            while index:
+                oldest = next(iter(index))
+                if self._workflows[oldest]["updated_at"] > cutoff:
+                    break
+                self._remove(oldest)
+                self.evicted_completed += 1
+
+        while len(self._workflows) > self.max_workflows:
+            oldest = self._oldest_terminal()
+            if oldest is not None:
+                self.evicted_completed += 1
+            else:
+                oldest = next(iter(self._workflows))
+                self.evicted_active += 1
+            self._remove(oldest)
+
+    # === Reads ===
+
+    def get(self, workflow_id: str) -> Optional[Dict[str, Any]]:
+        """Workflow by id, falling back to the persisted copy once evicted"""
+        workflow = self._workflows.get(workflow_id)
+        if workflow is not None or self._conn is None:
+            return workflow
+
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT payload FROM workflows WHERE workflow_id = ?', (workflow_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def by_status(self, status: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Workflows currently in ``status``, most recently updated first"""
+        with self._lock:
+            ids = reversed(self._by_status.get(status, {}))
+            result = []
+            for workflow_id in ids:
+                if limit is not None and len(result) >= limit:
+                    break
+                result.append(self._workflows[workflow_id])
+            return result
+
+    def older_than(self, seconds: float) -> List[Dict[str, Any]]:
+        """Workflows created more than ``seconds`` ago, oldest first"""
+        cutoff = time.time() - seconds
+        with self._lock:
+            result = []
+            for workflow in self._workflows.values():
+                if workflow["created_at"] > cutoff:
+                    break
+                result.append(workflow)
+            return result
+
+    def recent(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Workflows in creation order, limited to the newest ``limit``"""
+        with self._lock:
+            if not limit:
+                return list(self._workflows.values())
+            newest = []
+            for workflow_id in reversed(self._workflows):
+                if len(newest) >= limit:
+                    break
+                newest.append(self._workflows[workflow_id])
+            return newest[::-1]
+
+    def count_by_status(self) -> Dict[str, int]:
+        with self._lock:
+            return {status: len(ids) for status, ids in self._by_status.items() if ids}
+
+    def __len__(self) -> int:
+        return len(self._workflows)
+
+    def __contains__(self, workflow_id: str) -> bool:
+        return workflow_id in self._workflows
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "in_memory": len(self._workflows),
+            "max_workflows": self.max_workflows,
+            "by_status": self.count_by_status(),
+            "evicted_completed": self.evicted_completed,
+            "evicted_active": self.evicted_active,
+            "persistent": self._conn is not None
+        }
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None